@@ -0,0 +1,168 @@
+# bench_corpus.py
+"""
+Точность и скорость парсера на эталонном корпусе OCR текстов: для каждого
+поля - precision/recall, для всего корпуса - разборов/сек.
+
+Корпус - corpus/passport_ocr_v<N>.jsonl, одна запись на строку:
+    {"id": ..., "tags": [...], "text": "<сырой вывод OCR>",
+     "expected": {"full_name": ..., ..., "gender": ...}}
+null в expected - поля в тексте нет, парсер должен вернуть "не распознано".
+Корпус версионируется: новые записи - новый файл v<N+1>, старые не меняются,
+чтобы цифры разных версий парсера оставались сравнимыми.
+
+Запуск:
+    python bench_corpus.py                        # текущее дерево
+    python bench_corpus.py --compare HEAD~1       # рядом с парсером из коммита
+    python bench_corpus.py --errors               # расхождения по записям
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(ROOT, 'corpus', 'passport_ocr_v1.jsonl')
+FIELDS = ('full_name', 'birth_date', 'birth_place', 'series_number',
+          'code', 'issue_date', 'authority', 'gender')
+NOT_RECOGNIZED = "не распознано"
+
+_SPACES_RE = re.compile(r'\s+')
+_PUNCT_SPACE_RE = re.compile(r'\s*([.,()\-])\s*')
+
+# Код, который выполняется в дереве другого коммита: тот же замер, результат - JSON
+_REMOTE_SCRIPT = """
+import json, sys
+sys.path.insert(0, sys.argv[1])
+from bench_corpus import evaluate, load_corpus
+from src.parsers.passport_parser import RussianPassportParser
+print(json.dumps(evaluate(RussianPassportParser(), load_corpus(sys.argv[2]), int(sys.argv[3]))))
+"""
+
+
+def normalize(value) -> str:
+    """Сравнение без учета регистра, Ё/Е и пробелов вокруг знаков препинания"""
+    if value is None:
+        return ''
+    value = _SPACES_RE.sub(' ', str(value).upper().replace('Ё', 'Е')).strip()
+    value = _PUNCT_SPACE_RE.sub(r'\1', value)
+    return '' if value == NOT_RECOGNIZED.upper() else value
+
+
+def load_corpus(path: str) -> list:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(parser, corpus: list, repeats: int = 3) -> dict:
+    """Прогон корпуса: счетчики по полям, лучшее время из repeats и ошибки по записям"""
+    results = [parser.parse(entry['text']) for entry in corpus]
+
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for entry in corpus:
+            parser.parse(entry['text'])
+        best = min(best, time.perf_counter() - started)
+
+    fields = {field: {'tp': 0, 'recognized': 0, 'expected': 0} for field in FIELDS}
+    errors = []
+    for entry, result in zip(corpus, results):
+        for field in FIELDS:
+            expected = normalize(entry['expected'].get(field))
+            actual = normalize(result.get(field))
+            counts = fields[field]
+            counts['recognized'] += bool(actual)
+            counts['expected'] += bool(expected)
+            if actual and actual == expected:
+                counts['tp'] += 1
+            elif actual or expected:
+                errors.append({'id': entry['id'], 'field': field,
+                               'expected': entry['expected'].get(field), 'actual': result.get(field)})
+
+    return {'size': len(corpus), 'parses_per_sec': len(corpus) / best if best else 0.0,
+            'fields': fields, 'errors': errors}
+
+
+def evaluate_revision(rev: str, corpus_path: str, repeats: int) -> dict:
+    """Тот же замер для парсера из коммита rev (git archive во временный каталог)"""
+    with tempfile.TemporaryDirectory(prefix='bench_corpus_') as tmp:
+        archive = subprocess.run(
+            ['git', 'archive', '--format=tar', rev, 'src', 'config.py'],
+            cwd=ROOT, capture_output=True, check=True
+        ).stdout
+        subprocess.run(['tar', '-x', '-C', tmp], input=archive, check=True)
+        # bench_corpus берется из текущего дерева, чтобы метрики считались одинаково
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        output = subprocess.run(
+            [sys.executable, '-c', _REMOTE_SCRIPT, tmp, corpus_path, str(repeats)],
+            cwd=tmp, env=env, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _ratio(numerator: int, denominator: int) -> str:
+    return f"{numerator / denominator:6.1%}" if denominator else "     -"
+
+
+def report(columns: dict):
+    """columns: название версии -> результат evaluate"""
+    names = list(columns)
+    print("=" * (16 + 20 * len(names)))
+    print(f"{'поле':<16}" + ''.join(f"{name[:18]:>20}" for name in names))
+    print(f"{'':<16}" + ''.join(f"{'precision  recall':>20}" for _ in names))
+    print("-" * (16 + 20 * len(names)))
+    for field in FIELDS:
+        row = f"{field:<16}"
+        for name in names:
+            counts = columns[name]['fields'][field]
+            row += f"{_ratio(counts['tp'], counts['recognized']):>12}{_ratio(counts['tp'], counts['expected']):>8}"
+        print(row)
+    print("-" * (16 + 20 * len(names)))
+    totals = f"{'всего':<16}"
+    speed = f"{'разборов/сек':<16}"
+    for name in names:
+        fields = columns[name]['fields'].values()
+        tp = sum(counts['tp'] for counts in fields)
+        totals += (f"{_ratio(tp, sum(c['recognized'] for c in fields)):>12}"
+                   f"{_ratio(tp, sum(c['expected'] for c in fields)):>8}")
+        speed += f"{columns[name]['parses_per_sec']:>20,.0f}"
+    print(totals)
+    print(speed)
+    print("=" * (16 + 20 * len(names)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Точность и скорость парсера на эталонном корпусе")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--compare', metavar='REV', help="сравнить с парсером из git ревизии")
+    parser.add_argument('--repeats', type=int, default=20, help="повторов для замера скорости")
+    parser.add_argument('--errors', action='store_true', help="показать расхождения по записям")
+    args = parser.parse_args()
+
+    from src.parsers.passport_parser import RussianPassportParser
+
+    corpus_path = os.path.abspath(args.corpus)
+    corpus = load_corpus(corpus_path)
+    print(f"📄 Корпус: {os.path.relpath(corpus_path, ROOT)}, записей: {len(corpus)}")
+
+    columns = {}
+    if args.compare:
+        try:
+            columns[args.compare] = evaluate_revision(args.compare, corpus_path, args.repeats)
+        except subprocess.CalledProcessError as e:
+            raise SystemExit(f"❌ Не удалось замерить {args.compare}: {(e.stderr or b'')[-500:]}")
+    current = evaluate(RussianPassportParser(), corpus, args.repeats)
+    columns['рабочее дерево'] = current
+    report(columns)
+
+    if args.errors:
+        for error in current['errors']:
+            print(f"❌ {error['id']} {error['field']}: ожидалось {error['expected']!r}, получено {error['actual']!r}")
+
+
+if __name__ == "__main__":
+    main()
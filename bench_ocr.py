@@ -0,0 +1,453 @@
+# bench_ocr.py
+"""
+Офлайн бенчмарк OCR конвейера на синтетических паспортах.
+
+Страницы рисуются PIL с известными значениями полей (и верной MRZ),
+затем портятся: шум, размытие, поворот, JPEG. Каждый вариант движка
+и предобработки прогоняется целиком через DocumentProcessor в отдельном
+процессе. Отчет: задержка по стадиям, фото/сек на ядро, пиковый RSS
+и точность по полям. Сеть не нужна (EasyOCR - только с уже скачанными моделями).
+
+Запуск: python bench_ocr.py [--photos 10] [--sizes 1200,2000,3000] [--variants tesseract-zones,cascade]
+Нужен шрифт с кириллицей: DejaVu (fonts-dejavu-core) находится сам, иначе --font путь.
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from bench_parser import AUTHORITIES, NAMES, PATRONYMICS, PLACES, SURNAMES
+from src.parsers.mrz import MRZ_TO_CYRILLIC, check_digit
+
+FIELDS = ['full_name', 'birth_date', 'birth_place', 'series_number', 'code', 'issue_date', 'authority', 'gender']
+
+# Вариант -> настройки Config; движок выбирается через OCR_ENGINE и OCR_CASCADE
+VARIANTS = {
+    'tesseract-zones': {'OCR_ENGINE': 'auto', 'OCR_ZONES': True, 'MRZ_FAST_PATH': False, 'OCR_CASCADE': False},
+    'tesseract-page': {'OCR_ENGINE': 'auto', 'OCR_ZONES': False, 'MRZ_FAST_PATH': False, 'OCR_CASCADE': False},
+    'tesseract-mrz': {'OCR_ENGINE': 'auto', 'OCR_ZONES': True, 'MRZ_FAST_PATH': True, 'OCR_CASCADE': False},
+    'cascade': {'OCR_ENGINE': 'auto', 'OCR_ZONES': True, 'MRZ_FAST_PATH': False, 'OCR_CASCADE': True},
+    'easyocr': {'OCR_ENGINE': 'easyocr', 'OCR_ZONES': False, 'MRZ_FAST_PATH': False, 'OCR_CASCADE': False},
+}
+
+FONT_CANDIDATES = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans.ttf',
+    '/Library/Fonts/Arial Unicode.ttf',
+    '/System/Library/Fonts/Supplemental/Arial.ttf',
+    'C:/Windows/Fonts/arial.ttf',
+]
+MONO_FONT_CANDIDATES = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSansMono.ttf',
+    '/usr/share/fonts/TTF/DejaVuSansMono.ttf',
+    '/System/Library/Fonts/Supplemental/Courier New.ttf',
+    'C:/Windows/Fonts/cour.ttf',
+]
+
+_CYRILLIC_TO_MRZ = {cyrillic: latin for latin, cyrillic in MRZ_TO_CYRILLIC.items()}
+
+
+# --- Генерация синтетических паспортов ---
+
+def find_font(candidates: list, override: str = None) -> str:
+    for path in ([override] if override else []) + candidates:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def load_font(path: str, size: int):
+    if path:
+        return ImageFont.truetype(path, size)
+    # Без TrueType шрифта кириллица не отрисуется - точность будет нулевой
+    return ImageFont.load_default(size)
+
+
+def random_passport(rng: random.Random) -> dict:
+    """Значения полей в том виде, в каком их возвращает парсер"""
+    birth = date(1950, 1, 1) + timedelta(days=rng.randint(0, 365 * 55))
+    issue = min(birth + timedelta(days=365 * rng.choice([14, 20, 45]) + rng.randint(0, 300)),
+                date(2024, 12, 31))
+    digits = f"{rng.randint(1, 99):02d}{rng.randint(0, 99):02d}{rng.randint(0, 999999):06d}"
+    return {
+        'surname': rng.choice(SURNAMES),
+        'name': rng.choice(NAMES),
+        'patronymic': rng.choice(PATRONYMICS),
+        'full_name': None,  # заполняется ниже
+        'birth_date': birth.strftime('%d.%m.%Y'),
+        'birth_place': rng.choice(PLACES),
+        'series_number': f"{digits[:2]} {digits[2:4]} {digits[4:]}",
+        'code': f"{rng.randint(100, 999)}-{rng.randint(100, 999)}",
+        'issue_date': issue.strftime('%d.%m.%Y'),
+        'authority': rng.choice(AUTHORITIES),
+        'gender': rng.choice(['МУЖ', 'ЖЕН']),
+    }
+
+
+def build_mrz(fields: dict) -> list:
+    """Две строки MRZ (ICAO 9303 TD3) паспорта РФ с верными контрольными цифрами"""
+    names = "<".join(
+        "".join(_CYRILLIC_TO_MRZ.get(char, '') for char in part)
+        for part in (fields['surname'], '', fields['name'], fields['patronymic'])
+    )
+    line1 = f"PNRUS{names}".ljust(44, '<')[:44]
+
+    digits = fields['series_number'].replace(' ', '')
+    document = digits[:3] + digits[4:]
+    birth = date.fromisoformat('-'.join(reversed(fields['birth_date'].split('.')))).strftime('%y%m%d')
+    issue = date.fromisoformat('-'.join(reversed(fields['issue_date'].split('.')))).strftime('%y%m%d')
+    optional = f"{digits[3]}{issue}{fields['code'].replace('-', '')}<"
+    sex = 'F' if fields['gender'] == 'ЖЕН' else 'M'
+
+    line2 = (
+        f"{document}{check_digit(document)}RUS{birth}{check_digit(birth)}{sex}"
+        f"<<<<<<<{optional}{check_digit(optional)}"
+    )
+    composite = line2[0:10] + line2[13:20] + line2[21:43]
+    return [line1, line2 + str(check_digit(composite))]
+
+
+def _draw_wrapped(draw, xy, text: str, font, max_width: int, line_height: int) -> int:
+    x, y = xy
+    line = ""
+    for word in text.split():
+        candidate = f"{line} {word}".strip()
+        if line and draw.textlength(candidate, font=font) > max_width:
+            draw.text((x, y), line, font=font, fill=20)
+            y += line_height
+            line = word
+        else:
+            line = candidate
+    if line:
+        draw.text((x, y), line, font=font, fill=20)
+        y += line_height
+    return y
+
+
+def render_passport(fields: dict, height: int, font_path: str, mono_path: str) -> Image.Image:
+    """Разворот паспорта с раскладкой как в PASSPORT_ZONES (доли ширины/высоты)"""
+    width = int(height / 1.42)
+    page = Image.new('L', (width, height), 238)
+    draw = ImageDraw.Draw(page)
+    size = max(10, height // 55)
+    font = load_font(font_path, size)
+    small = load_font(font_path, max(8, size * 2 // 3))
+    mono = load_font(mono_path or font_path, max(8, int(width * 0.86 / 44 / 0.6)))
+    line = int(size * 1.5)
+
+    # Верхняя страница: кем и когда выдан
+    x, y = int(width * 0.06), int(height * 0.04)
+    draw.text((x, y), "Паспорт выдан", font=small, fill=90)
+    y = _draw_wrapped(draw, (x, y + line), fields['authority'], font, int(width * 0.80), line)
+    draw.text((x, y + line // 2), "Дата выдачи", font=small, fill=90)
+    draw.text((x + int(width * 0.25), y + line // 2), fields['issue_date'], font=font, fill=20)
+    draw.text((x + int(width * 0.50), y + line // 2), "Код подразделения", font=small, fill=90)
+    draw.text((x + int(width * 0.50), y + line * 3 // 2), fields['code'], font=font, fill=20)
+    draw.line((0, height // 2, width, height // 2), fill=170, width=2)
+
+    # Нижняя страница: фото и личные данные
+    draw.rectangle((int(width * 0.05), int(height * 0.55), int(width * 0.27), int(height * 0.80)), fill=180)
+    x, y = int(width * 0.32), int(height * 0.54)
+    gender = 'МУЖ.' if fields['gender'] == 'МУЖ' else 'ЖЕН.'
+    for label, value in [('Фамилия', fields['surname']), ('Имя', fields['name']),
+                         ('Отчество', fields['patronymic']),
+                         ('Пол', f"{gender}   {fields['birth_date']}")]:
+        draw.text((x, y), label, font=small, fill=90)
+        draw.text((x + int(width * 0.18), y), value, font=font, fill=20)
+        y += line
+    draw.text((x, y), "Место рождения", font=small, fill=90)
+    _draw_wrapped(draw, (x + int(width * 0.18), y), fields['birth_place'], font, int(width * 0.40), line)
+
+    # Серия и номер вертикально вдоль правого края
+    series = Image.new('L', (int(height * 0.5), int(size * 1.6)), 238)
+    ImageDraw.Draw(series).text((0, 0), fields['series_number'], font=font, fill=60)
+    series = series.rotate(-90, expand=True)
+    page.paste(series, (int(width * 0.93), int(height * 0.06)))
+    page.paste(series, (int(width * 0.93), int(height * 0.54)))
+
+    # MRZ
+    y = int(height * 0.88)
+    for mrz_line in build_mrz(fields):
+        draw.text((int(width * 0.04), y), mrz_line, font=mono, fill=20)
+        y += int(mono.size * 1.4)
+    return page
+
+
+def photograph(page: Image.Image, rng: random.Random, level: float) -> bytes:
+    """Имитация фото на телефон: фон, поворот, размытие, шум, JPEG. level 0..1"""
+    margin = page.height // 12
+    canvas = Image.new('L', (page.width + 2 * margin, page.height + 2 * margin), 70)
+    canvas.paste(page, (margin, margin))
+    canvas = canvas.rotate(rng.uniform(-4, 4) * level, resample=Image.BICUBIC, fillcolor=70)
+    if level:
+        canvas = canvas.filter(ImageFilter.GaussianBlur(rng.uniform(0, 1.5) * level))
+        array = np.asarray(canvas, dtype=np.float32)
+        noise = np.random.default_rng(rng.randrange(2 ** 32)).normal(0, 12 * level, array.shape)
+        canvas = Image.fromarray(np.clip(array + noise, 0, 255).astype(np.uint8))
+    buffer = io.BytesIO()
+    canvas.convert('RGB').save(buffer, 'JPEG', quality=int(92 - 50 * level))
+    return buffer.getvalue()
+
+
+def synthetic_photo(seed: int = 0, height: int = 2000, level: float = 0.3) -> tuple:
+    """Одно синтетическое фото паспорта: (значения полей, JPEG байты) - для отладочных скриптов"""
+    rng = random.Random(seed)
+    fields = random_passport(rng)
+    fields['full_name'] = f"{fields['surname']} {fields['name']} {fields['patronymic']}"
+    page = render_passport(fields, height, find_font(FONT_CANDIDATES), find_font(MONO_FONT_CANDIDATES))
+    return {field: fields[field] for field in FIELDS}, photograph(page, rng, level)
+
+
+def build_samples(count: int, heights: list, seed: int, font_path: str, mono_path: str) -> list:
+    """[(высота, значения полей, JPEG байты)]: одинаковые паспорта во всех разрешениях"""
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(count):
+        fields = random_passport(rng)
+        fields['full_name'] = f"{fields['surname']} {fields['name']} {fields['patronymic']}"
+        level = rng.choice([0.0, 0.3, 0.6, 1.0])
+        page_seed = rng.randrange(2 ** 32)
+        for height in heights:
+            page = render_passport(fields, height, font_path, mono_path)
+            photo = photograph(page, random.Random(page_seed), level)
+            samples.append((height, {field: fields[field] for field in FIELDS}, photo))
+    return samples
+
+
+def zone_report(count: int, heights: list, seed: int, font_path: str, mono_path: str):
+    """Какую долю страницы распознают зоны и сколько текста полей в них попадает (без OCR)"""
+    from src.utils.passport_layout import PASSPORT_ZONES
+
+    area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in (spec['box'] for spec in PASSPORT_ZONES.values()))
+    rng = random.Random(seed)
+    coverage = []
+    for _ in range(count):
+        fields = random_passport(rng)
+        for height in heights:
+            page = np.asarray(render_passport(fields, height, font_path, mono_path))
+            ink = page <= 60  # значения полей; подписи бланка светлее
+            inside = np.zeros_like(ink)
+            for spec in PASSPORT_ZONES.values():
+                x0, y0, x1, y1 = spec['box']
+                inside[int(y0 * page.shape[0]):int(y1 * page.shape[0]), int(x0 * page.shape[1]):int(x1 * page.shape[1])] = True
+            coverage.append((ink & inside).sum() / ink.sum())
+    print(f"📐 Зоны OCR: {area:.0%} площади документа; текст полей в зонах: "
+          f"мин {min(coverage):.1%}, среднее {statistics.mean(coverage):.1%} "
+          f"(нижняя копия серии и номера не читается намеренно)")
+
+
+# --- Замеры (в отдельном процессе на каждый вариант) ---
+
+class StageTimer:
+    """Оборачивает функции конвейера и суммирует время по стадиям (вложенные вызовы не дублируются)"""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self._depth = defaultdict(int)
+
+    def wrap(self, owner, name: str, stage: str):
+        original = getattr(owner, name, None)
+        if original is None:
+            return
+
+        def timed(*args, **kwargs):
+            self._depth[stage] += 1
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self._depth[stage] -= 1
+                if not self._depth[stage]:
+                    self.totals[stage] += time.perf_counter() - started
+
+        setattr(owner, name, timed)
+
+    def take(self) -> dict:
+        totals = dict(self.totals)
+        self.totals.clear()
+        return totals
+
+
+def _instrument(timer: StageTimer):
+    from src.utils import document_processor, ocr_processor, tesseract_processor
+    from src.parsers.passport_parser import RussianPassportParser
+
+    timer.wrap(document_processor, 'load_image', 'decode')
+    for module in (ocr_processor, tesseract_processor):
+        for name in ('downscale_gray', 'enhance', 'preprocess_for_ocr'):
+            timer.wrap(module, name, 'preprocess')
+    timer.wrap(ocr_processor.OCRProcessor, 'extract_zones_with_confidence', 'ocr')
+    timer.wrap(ocr_processor.OCRProcessor, 'extract_text_from_image', 'ocr')
+    timer.wrap(tesseract_processor.TesseractOCRProcessor, 'extract_text_from_image', 'ocr')
+    try:
+        from src.utils import easyocr_processor
+        timer.wrap(easyocr_processor, 'preprocess_for_ocr', 'preprocess')
+        timer.wrap(easyocr_processor.EasyOCRProcessor, 'extract_text_from_image', 'ocr')
+    except ImportError:
+        pass
+    for name in ('parse', 'parse_zones', 'parse_mrz_only'):
+        timer.wrap(RussianPassportParser, name, 'parse')
+
+
+def _engine_missing(variant: dict):
+    """Причина пропуска варианта или None"""
+    from src.utils import document_processor
+    if variant['OCR_ENGINE'] == 'easyocr':
+        processor = document_processor.get_ocr_processor()
+        if not getattr(processor, 'reader', None):
+            return "EasyOCR не установлен или нет моделей"
+        return None
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+    except Exception:
+        return "нет бинарника tesseract"
+    if variant['OCR_CASCADE'] and not document_processor.get_fallback_processor():
+        return "каскаду нужен EasyOCR"
+    return None
+
+
+def _peak_rss_mb(who) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux - килобайты, macOS - байты
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _normalize(value) -> str:
+    return ' '.join(str(value or '').upper().replace('Ё', 'Е').replace('.', '. ').split())
+
+
+def run_variant(name: str, samples: list) -> dict:
+    # Один поток Tesseract - честный замер "на ядро"
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    from config import Config
+    for key, value in VARIANTS[name].items():
+        setattr(Config, key, value)
+
+    reason = _engine_missing(VARIANTS[name])
+    if reason:
+        return {'variant': name, 'skipped': reason}
+
+    from src.utils.document_processor import DocumentProcessor
+    processor = DocumentProcessor()
+    # Прогрев (загрузка движков) не входит в замер
+    processor.process_passport_image(samples[0][2])
+
+    timer = StageTimer()
+    _instrument(timer)
+    per_height = defaultdict(lambda: {'latencies': [], 'stages': defaultdict(float), 'hits': defaultdict(int)})
+    cpu_before = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    for height, truth, photo in samples:
+        started = time.perf_counter()
+        result = processor.process_passport_image(photo)
+        bucket = per_height[height]
+        bucket['latencies'].append(time.perf_counter() - started)
+        for stage, seconds in timer.take().items():
+            bucket['stages'][stage] += seconds
+        for field in FIELDS:
+            if _normalize(result.get(field)) == _normalize(truth[field]):
+                bucket['hits'][field] += 1
+
+    cpu_after = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_seconds = sum(
+        (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+        for before, after in zip(cpu_before, cpu_after)
+    )
+    return {
+        'variant': name,
+        'per_height': {height: {**bucket, 'stages': dict(bucket['stages']), 'hits': dict(bucket['hits'])}
+                       for height, bucket in per_height.items()},
+        'cpu_seconds': cpu_seconds,
+        'photos': len(samples),
+        'rss_mb': _peak_rss_mb(resource.RUSAGE_SELF),
+        'child_rss_mb': _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+# --- Отчет ---
+
+def report(result: dict):
+    name = result['variant']
+    if 'skipped' in result:
+        print(f"\n⏭  {name}: пропущен ({result['skipped']})")
+        return
+
+    wall = sum(sum(bucket['latencies']) for bucket in result['per_height'].values())
+    per_core = result['photos'] / result['cpu_seconds'] if result['cpu_seconds'] else 0.0
+    print(f"\n▶ {name}: {result['photos'] / wall:.2f} фото/сек, {per_core:.2f} фото/сек/ядро, "
+          f"пиковый RSS {result['rss_mb']:.0f} МБ (+ tesseract {result['child_rss_mb']:.0f} МБ)")
+    print(f"  {'высота':>6} | {'p50 мс':>8} | {'p95 мс':>8} | {'decode':>6} | {'preproc':>7} | "
+          f"{'ocr':>7} | {'parse':>6} | точность")
+
+    hits_total = defaultdict(int)
+    for height, bucket in sorted(result['per_height'].items()):
+        latencies = sorted(bucket['latencies'])
+        count = len(latencies)
+        stages = {stage: seconds / count * 1000 for stage, seconds in bucket['stages'].items()}
+        # Время OCR включает предобработку внутри движка
+        ocr_only = stages.get('ocr', 0.0) - stages.get('preprocess', 0.0)
+        accuracy = sum(bucket['hits'].values()) / (count * len(FIELDS))
+        for field, hits in bucket['hits'].items():
+            hits_total[field] += hits
+        print(
+            f"  {height:>6} | {statistics.median(latencies) * 1000:8.0f} | "
+            f"{latencies[min(count - 1, int(count * 0.95))] * 1000:8.0f} | "
+            f"{stages.get('decode', 0):6.1f} | {stages.get('preprocess', 0):7.1f} | "
+            f"{ocr_only:7.1f} | {stages.get('parse', 0):6.2f} | {accuracy:.0%}"
+        )
+    print("  поля: " + ", ".join(
+        f"{field} {hits_total[field] / result['photos']:.0%}" for field in FIELDS
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн бенчмарк OCR на синтетических паспортах")
+    parser.add_argument("--photos", type=int, default=10, help="паспортов на каждое разрешение")
+    parser.add_argument("--sizes", default="1200,2000,3000", help="высота страницы в пикселях")
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--font", help="TTF шрифт с кириллицей")
+    parser.add_argument("--save-samples", metavar="DIR", help="сохранить сгенерированные фото")
+    args = parser.parse_args()
+
+    font_path = find_font(FONT_CANDIDATES, args.font)
+    mono_path = find_font(MONO_FONT_CANDIDATES)
+    if not font_path:
+        print("⚠️ Шрифт с кириллицей не найден (--font): текст не отрисуется, точность будет нулевой")
+
+    heights = [int(size) for size in args.sizes.split(",")]
+    started = time.perf_counter()
+    samples = build_samples(args.photos, heights, args.seed, font_path, mono_path)
+    print(f"🖼 Сгенерировано фото: {len(samples)} за {time.perf_counter() - started:.1f} сек "
+          f"(шрифт: {font_path or 'встроенный'})")
+
+    zone_report(args.photos, heights, args.seed, font_path, mono_path)
+
+    if args.save_samples:
+        os.makedirs(args.save_samples, exist_ok=True)
+        for i, (height, _, photo) in enumerate(samples):
+            with open(os.path.join(args.save_samples, f"passport_{i:03d}_{height}.jpg"), 'wb') as file:
+                file.write(photo)
+
+    # Каждый вариант - в свежем процессе: честный пиковый RSS и холодные глобальные движки
+    context = multiprocessing.get_context('spawn')
+    for name in args.variants.split(","):
+        with context.Pool(1) as pool:
+            report(pool.apply(run_variant, (name, samples)))
+
+
+if __name__ == "__main__":
+    main()
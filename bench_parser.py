@@ -0,0 +1,83 @@
+# bench_parser.py
+"""
+Микробенчмарк парсера: сколько OCR текстов в секунду разбирает
+RussianPassportParser. Корпус синтетический, с типичными ошибками OCR.
+
+Запуск: python bench_parser.py [размер_корпуса] [число_повторов]
+"""
+import random
+import sys
+import time
+
+from src.parsers.passport_parser import RussianPassportParser
+
+TEMPLATE = """РОССИЙСКАЯ ФЕДЕРАЦИЯ
+{authority}
+{issue_date}   {code}
+{surname}
+{name} {patronymic}
+{sex}  {birth_date}
+{birth_place}
+{series} {number}
+"""
+
+SURNAMES = ['ИВАНОВ', 'ПЕТРОВА', 'СМИРНОВ', 'КУЗНЕЦОВА', 'ВОЛКОВ', 'СОКОЛОВА']
+NAMES = ['ПЕТР', 'АННА', 'СЕРГЕЙ', 'ЕЛЕНА', 'ДМИТРИЙ', 'ОЛЬГА']
+PATRONYMICS = ['ИВАНОВИЧ', 'СЕРГЕЕВНА', 'ПЕТРОВИЧ', 'ДМИТРИЕВНА']
+AUTHORITIES = [
+    'ОТДЕЛОМ УФМС РОССИИ ПО Г. МОСКВЕ',
+    'ГУ МВД РОССИИ ПО САНКТ-ПЕТЕРБУРГУ И ЛЕНИНГРАДСКОЙ ОБЛ.',
+    'ОВД РАЙОНА ХАМОВНИКИ Г. МОСКВЫ',
+]
+PLACES = ['ГОР. МОСКВА', 'ГОР. КАЗАНЬ РЕСПУБЛИКИ ТАТАРСТАН', 'С. ИВАНОВКА ТУЛЬСКОЙ ОБЛ.']
+# Типичные замены OCR: буквы <-> похожие цифры
+OCR_NOISE = {'О': '0', 'З': '3', 'Б': '6', 'В': '8'}
+
+
+def add_ocr_noise(text: str, rng: random.Random, rate: float = 0.03) -> str:
+    return ''.join(
+        OCR_NOISE[char] if char in OCR_NOISE and rng.random() < rate else char
+        for char in text
+    )
+
+
+def build_corpus(size: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        text = TEMPLATE.format(
+            authority=rng.choice(AUTHORITIES),
+            issue_date=f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(2005, 2024)}",
+            code=f"{rng.randint(100, 999)}-{rng.randint(100, 999)}",
+            surname=rng.choice(SURNAMES),
+            name=rng.choice(NAMES),
+            patronymic=rng.choice(PATRONYMICS),
+            sex=rng.choice(['МУЖ.', 'ЖЕН.']),
+            birth_date=f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1950, 2005)}",
+            birth_place=rng.choice(PLACES),
+            series=f"{rng.randint(10, 99)} {rng.randint(10, 99)}",
+            number=f"{rng.randint(0, 999999):06d}",
+        )
+        corpus.append(add_ocr_noise(text, rng))
+    return corpus
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    corpus = build_corpus(size)
+    parser = RussianPassportParser()
+
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for text in corpus:
+            parser.parse(text)
+        best = min(best, time.perf_counter() - started)
+
+    print(f"📄 Корпус: {size} текстов, повторов: {repeats}")
+    print(f"⚡ {size / best:,.0f} разборов/сек ({best / size * 1e6:.1f} мкс на текст)")
+
+
+if __name__ == "__main__":
+    main()
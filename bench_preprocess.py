@@ -0,0 +1,67 @@
+# bench_preprocess.py
+"""
+Сравнение предобработки изображений: старая цепочка PIL на полном
+разрешении против нового конвейера OpenCV с уменьшением до OCR_MAX_SIDE.
+
+Запуск: python bench_preprocess.py [путь_к_фото] [число_повторов]
+Без фото используется синтетический кадр 4000x3000 (12 Мп телефон).
+"""
+import io
+import sys
+import time
+import numpy as np
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
+
+from src.utils.image_preprocessor import preprocess_for_ocr
+
+
+def legacy_preprocess(image: Image.Image) -> Image.Image:
+    """Прежняя цепочка OCRProcessor._preprocess_image"""
+    if image.mode != 'L':
+        image = image.convert('L')
+    image = ImageEnhance.Contrast(image).enhance(2.0)
+    image = ImageEnhance.Sharpness(image).enhance(2.0)
+    return image.filter(ImageFilter.MedianFilter())
+
+
+def synthetic_photo(width: int = 4000, height: int = 3000) -> bytes:
+    rng = np.random.default_rng(0)
+    noise = rng.normal(180, 25, (height, width, 3)).clip(0, 255).astype(np.uint8)
+    image = Image.fromarray(noise)
+    draw = ImageDraw.Draw(image)
+    for row in range(40, height, 120):
+        draw.text((200, row), "PASSPORT 03 11 339404 22.11.1994 230-040", fill=(20, 20, 20))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def bench(name: str, func, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        output = func()
+        timings.append(time.perf_counter() - started)
+    size = output.size if isinstance(output, Image.Image) else output.shape[::-1]
+    best = min(timings)
+    print(f"{name:<32} {best * 1000:8.1f} мс  выход {size[0]}x{size[1]}")
+    return best
+
+
+def main():
+    data = open(sys.argv[1], 'rb').read() if len(sys.argv) > 1 else synthetic_photo()
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    print(f"📷 Исходное изображение: {image.size[0]}x{image.size[1]}, повторов: {repeats}")
+    print("=" * 64)
+
+    legacy = bench("PIL (старая цепочка)", lambda: legacy_preprocess(image), repeats)
+    vectorized = bench("OpenCV + уменьшение", lambda: preprocess_for_ocr(image), repeats)
+
+    print("=" * 64)
+    print(f"Ускорение: x{legacy / vectorized:.1f}")
+
+
+if __name__ == "__main__":
+    main()
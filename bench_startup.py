@@ -0,0 +1,58 @@
+# bench_startup.py
+"""
+Замер времени старта бота: импорт обработчиков (до run_polling)
+и отдельно прогрев OCR движка, который теперь идет в фоне.
+
+Запуск: python bench_startup.py [число_повторов]
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import src.bot.handlers
+print(time.perf_counter() - started)
+"""
+
+WARM_UP_SNIPPET = """
+import time
+from src.utils.document_processor import warm_up
+started = time.perf_counter()
+warm_up()
+print(time.perf_counter() - started)
+"""
+
+
+def run_snippet(snippet: str) -> float:
+    # Каждый замер в свежем интерпретаторе, чтобы не мешал кеш модулей
+    output = subprocess.run(
+        [sys.executable, "-c", snippet],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure(name: str, snippet: str, repeats: int):
+    timings = [run_snippet(snippet) for _ in range(repeats)]
+    print(
+        f"{name:<28} медиана {statistics.median(timings) * 1000:8.1f} мс | "
+        f"мин {min(timings) * 1000:8.1f} мс | макс {max(timings) * 1000:8.1f} мс"
+    )
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"⏱ Замер старта бота ({repeats} повторов)")
+    print("=" * 70)
+    started = time.perf_counter()
+    measure("Импорт src.bot.handlers", IMPORT_SNIPPET, repeats)
+    measure("Прогрев OCR движка (фон)", WARM_UP_SNIPPET, repeats)
+    print("=" * 70)
+    print(f"Всего: {time.perf_counter() - started:.1f} сек")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# bench_webhook.py
+"""
+Нагрузочный замер webhook режима без обращения к Telegram: POST запросы
+с синтетическими Update JSON, отчет - обновлений/сек и задержки p50/p99.
+
+Обновления - обычные текстовые сообщения из разных чатов: ни один
+обработчик бота на них не отвечает, поэтому запросов к Bot API нет.
+
+Запуск:
+    python bench_webhook.py --serve                 # локальный сервер PTB без сети
+    python bench_webhook.py --url http://127.0.0.1:8443/telegram --secret XXX
+                                                    # уже запущенный бот (BOT_MODE=webhook)
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import statistics
+import time
+
+import httpx
+
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8899
+SERVE_PATH = "telegram"
+
+
+def build_update(update_id: int, chat_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": "Bench"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+            "text": f"нагрузочное сообщение {update_id}",
+        },
+    }
+
+
+def percentile(values: list, share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def run_load(url: str, secret: str, total: int, concurrency: int, chats: int) -> dict:
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    latencies = []
+    errors = 0
+    next_id = iter(range(1, total + 1))
+
+    async def client_loop(client: httpx.AsyncClient):
+        nonlocal errors
+        for update_id in next_id:
+            payload = build_update(update_id, 100000 + update_id % chats)
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=payload, headers=headers)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {"elapsed": elapsed, "latencies": latencies, "errors": errors}
+
+
+def serve(port: int, secret: str, concurrent_updates: int, handler_delay: float, ready):
+    """Webhook сервер PTB с ботом без сети и обработчиком-заглушкой"""
+    from telegram import User
+    from telegram.ext import Application, ExtBot, MessageHandler, filters
+    from src.bot.update_processor import ChatOrderedUpdateProcessor
+
+    class OfflineBot(ExtBot):
+        async def get_me(self, *args, **kwargs):
+            self._bot_user = User(id=1, first_name="Bench", is_bot=True, username="bench_bot")
+            return self._bot_user
+
+        async def set_webhook(self, *args, **kwargs):
+            return True
+
+        async def delete_webhook(self, *args, **kwargs):
+            return True
+
+    processed = 0
+
+    async def on_message(update, context):
+        nonlocal processed
+        # Имитация работы обработчика (ожидание I/O)
+        await asyncio.sleep(handler_delay)
+        processed += 1
+
+    async def main():
+        application = (
+            Application.builder()
+            .bot(OfflineBot("0:bench"))
+            .concurrent_updates(ChatOrderedUpdateProcessor(concurrent_updates))
+            .build()
+        )
+        application.add_handler(MessageHandler(filters.TEXT, on_message))
+        async with application:
+            await application.updater.start_webhook(
+                listen=SERVE_HOST, port=port, url_path=SERVE_PATH,
+                secret_token=secret or None
+            )
+            await application.start()
+            ready.set()
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await application.updater.stop()
+                await application.stop()
+                print(f"🖥 Сервер обработал обновлений: {processed}")
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+def report(result: dict, total: int):
+    latencies = result["latencies"]
+    print("=" * 70)
+    print(f"Обновлений: {total}, ошибок: {result['errors']}, время: {result['elapsed']:.2f} сек")
+    print(f"Пропускная способность: {total / result['elapsed']:.0f} обновлений/сек")
+    print(
+        f"Задержка: p50 {statistics.median(latencies) * 1000:.1f} мс | "
+        f"p99 {percentile(latencies, 0.99) * 1000:.1f} мс | "
+        f"макс {max(latencies) * 1000:.1f} мс"
+    )
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный замер webhook режима")
+    parser.add_argument("--url", help="URL webhook уже запущенного бота")
+    parser.add_argument("--secret", default="", help="X-Telegram-Bot-Api-Secret-Token")
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=40, help="одновременных соединений")
+    parser.add_argument("--chats", type=int, default=100, help="разных чатов в нагрузке")
+    parser.add_argument("--serve", action="store_true", help="поднять локальный сервер без сети")
+    parser.add_argument("--concurrent-updates", type=int, default=16)
+    parser.add_argument("--handler-delay", type=float, default=0.005, help="сек на обновление")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if args.serve:
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(
+            target=serve,
+            args=(SERVE_PORT, args.secret, args.concurrent_updates, args.handler_delay, ready)
+        )
+        server.start()
+        if not ready.wait(30):
+            server.terminate()
+            raise SystemExit("❌ Локальный сервер не запустился")
+        url = f"http://{SERVE_HOST}:{SERVE_PORT}/{SERVE_PATH}"
+    elif not url:
+        parser.error("нужен --url или --serve")
+
+    print(f"🚀 {args.updates} обновлений -> {url} ({args.concurrency} соединений, {args.chats} чатов)")
+    try:
+        result = asyncio.run(run_load(url, args.secret, args.updates, args.concurrency, args.chats))
+        report(result, args.updates)
+    finally:
+        if server:
+            # SIGINT - сервер корректно останавливается и печатает счетчик
+            os.kill(server.pid, signal.SIGINT)
+            server.join(10)
+
+
+if __name__ == "__main__":
+    main()
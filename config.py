@@ -8,6 +8,18 @@ class Config:
     ADMIN_ID = os.getenv('ADMIN_ID', '86458589')
     TEMP_DIR = "temp_files"
     
+    # Получение обновлений: polling или webhook
+    BOT_MODE = os.getenv('BOT_MODE', 'polling')
+    # Сколько обновлений обрабатывать параллельно (обновления одного чата - по очереди)
+    CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', '16'))
+    # Webhook: адрес и порт HTTP сервера, путь, публичный URL (без пути) и секрет заголовка
+    WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+    WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+    WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+    
     # Yandex services
     YANDEX_VISION_API_KEY = os.getenv('YANDEX_VISION_API_KEY', 'test_vision_key')
     YANDEX_FOLDER_ID = os.getenv('YANDEX_FOLDER_ID', 'b1gtestfolderid123456789')
@@ -15,6 +27,77 @@ class Config:
     # Data storage
     DATA_STORAGE_TYPE = os.getenv('DATA_STORAGE_TYPE', 'csv')
     CSV_FILE_PATH = os.getenv('CSV_FILE_PATH', 'passport_data.csv')
+    SQLITE_DB_PATH = os.getenv('SQLITE_DB_PATH', 'passport_data.sqlite3')
+    # Отложенная запись в CSV: размер пачки, интервал сброса (сек), flush или fsync
+    CSV_WRITE_BATCH_SIZE = int(os.getenv('CSV_WRITE_BATCH_SIZE', '100'))
+    CSV_FLUSH_INTERVAL = float(os.getenv('CSV_FLUSH_INTERVAL', '0.5'))
+    CSV_DURABILITY = os.getenv('CSV_DURABILITY', 'flush')
+    # Дубликаты паспортов при сохранении: reject, merge (только SQLite) или allow
+    DUPLICATE_POLICY = os.getenv('DUPLICATE_POLICY', 'reject')
+    DUPLICATE_INDEX_PATH = os.getenv('DUPLICATE_INDEX_PATH', f"{CSV_FILE_PATH}.idx.json")
+    
+    # Выгрузка /export: записей в порции и сколько байт gzip держать в памяти до сброса на диск
+    EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '1000'))
+    EXPORT_SPOOL_SIZE = int(os.getenv('EXPORT_SPOOL_SIZE', str(10 * 1024 * 1024)))
+    
+    # OCR worker pool
+    OCR_WORKERS = int(os.getenv('OCR_WORKERS', os.cpu_count() or 1))
+    OCR_QUEUE_SIZE = int(os.getenv('OCR_QUEUE_SIZE', '20'))
+    # Допуск к OCR: сколько задач выполнять одновременно и лимит фото на пользователя (token bucket)
+    OCR_MAX_CONCURRENT = int(os.getenv('OCR_MAX_CONCURRENT', str(OCR_WORKERS)))
+    RATE_LIMIT_PER_MINUTE = float(os.getenv('RATE_LIMIT_PER_MINUTE', '6'))
+    RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '3'))
+    # local - OCR в пуле процессов бота, broker - в рабочих узлах ocr_worker.py через очередь задач
+    # (в режиме broker OCR_MAX_CONCURRENT - суммарное число процессов всех рабочих узлов)
+    OCR_BACKEND = os.getenv('OCR_BACKEND', 'local')
+    # Очередь задач: реализация, файл SQLite, аренда задачи рабочим (сек; продлевается heartbeat
+    # рабочего каждые 10 сек - должна быть больше этого интервала) и число попыток
+    JOB_BROKER = os.getenv('JOB_BROKER', 'sqlite')
+    JOB_BROKER_PATH = os.getenv('JOB_BROKER_PATH', 'ocr_jobs.sqlite3')
+    JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '300'))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+    # Как часто опрашивать очередь (сек), сколько фронтенд ждет результат (после этого брошенные
+    # задачи и результаты удаляются из очереди) и когда рабочий считается пропавшим
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '0.2'))
+    JOB_RESULT_TIMEOUT = float(os.getenv('JOB_RESULT_TIMEOUT', '600'))
+    JOB_WORKER_TIMEOUT = float(os.getenv('JOB_WORKER_TIMEOUT', '30'))
+    # auto - Tesseract с запасным вариантом, easyocr - EasyOCR (умеет пакетный режим)
+    OCR_ENGINE = os.getenv('OCR_ENGINE', 'auto')
+    # Сколько ждать остальные фото альбома (media group)
+    ALBUM_COLLECT_SECONDS = float(os.getenv('ALBUM_COLLECT_SECONDS', '1.5'))
+    # Статус обработки - одно сообщение на фото; правки не чаще раза в столько секунд на чат
+    PROGRESS_EDIT_INTERVAL = float(os.getenv('PROGRESS_EDIT_INTERVAL', '1.0'))
+    # Скачивать фото в память вместо TEMP_DIR
+    OCR_IN_MEMORY = os.getenv('OCR_IN_MEMORY', 'true').lower() == 'true'
+    # Распознавать только зоны паспорта вместо всей страницы
+    OCR_ZONES = os.getenv('OCR_ZONES', 'true').lower() == 'true'
+    # Сначала распознавать только MRZ; при верных контрольных цифрах остальное не распознается
+    MRZ_FAST_PATH = os.getenv('MRZ_FAST_PATH', 'false').lower() == 'true'
+    # Длинная сторона изображения перед OCR (~300 DPI для разворота паспорта)
+    OCR_MAX_SIDE = int(os.getenv('OCR_MAX_SIDE', '2000'))
+    # Каскад: при оценке разбора (0..1) ниже порога фото повторно распознается EasyOCR
+    OCR_CASCADE = os.getenv('OCR_CASCADE', 'true').lower() == 'true'
+    OCR_CASCADE_THRESHOLD = float(os.getenv('OCR_CASCADE_THRESHOLD', '0.75'))
+    
+    # OCR result cache
+    RESULT_CACHE_PATH = os.getenv('RESULT_CACHE_PATH', 'ocr_cache.sqlite3')
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '10000'))
+    RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', str(7 * 24 * 3600)))
+    
+    # Результаты, ожидающие кнопок "Сохранить"/"Скачать": файл SQLite (пусто - только в памяти),
+    # время жизни (сек), записей на диске и в памяти
+    SESSION_STORE_PATH = os.getenv('SESSION_STORE_PATH', 'sessions.sqlite3')
+    SESSION_TTL = int(os.getenv('SESSION_TTL', str(24 * 3600)))
+    SESSION_MAX_ENTRIES = int(os.getenv('SESSION_MAX_ENTRIES', '100000'))
+    SESSION_MEMORY_ENTRIES = int(os.getenv('SESSION_MEMORY_ENTRIES', '1000'))
+    
+    # Метрики Prometheus (/metrics) на локальном порту; 0 - не запускать HTTP сервер
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+    # /profile: задач по умолчанию и верхние границы числа задач и окна (сек)
+    PROFILE_DEFAULT_JOBS = int(os.getenv('PROFILE_DEFAULT_JOBS', '10'))
+    PROFILE_MAX_JOBS = int(os.getenv('PROFILE_MAX_JOBS', '200'))
+    PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', '1800'))
     
     # Создаем временные директории если не существуют
     os.makedirs(TEMP_DIR, exist_ok=True)
\ No newline at end of file
@@ -1,18 +1,31 @@
 # debug_photo.py
+import os
+import sys
 import logging
-from src.utils.vision_processor import YandexVisionProcessor
+from src.utils.document_processor import DocumentProcessor, get_ocr_processor
 from src.parsers.passport_parser import PassportParser
+from bench_ocr import synthetic_photo
 
 logging.basicConfig(level=logging.DEBUG)
 
-def debug_photo(image_path: str):
+def debug_photo(image_path: str = None):
     print("🔍 ДЕБАГ РЕЖИМ")
     print("=" * 50)
     
-    # 1. Смотрим что возвращает Vision
-    vision = YandexVisionProcessor()
-    print("📷 Получаем текст от Vision...")
-    text = vision.extract_text(image_path)
+    # Без своего фото используется синтетический паспорт с известными полями
+    if image_path and os.path.exists(image_path):
+        image_source, expected = image_path, None
+    else:
+        print("📷 Фото не найдено, используем синтетический паспорт")
+        expected, image_source = synthetic_photo()
+    
+    # 1. Смотрим что возвращает OCR движок
+    ocr = get_ocr_processor()
+    if not ocr:
+        print("❌ Ни один OCR движок не доступен")
+        return None, None
+    print(f"📷 Получаем текст от {type(ocr).__module__}...")
+    text = ocr.extract_text_from_image(image_source)
     
     print("\n📄 РАСПОЗНАННЫЙ ТЕКСТ:")
     print("=" * 30)
@@ -30,9 +43,20 @@ def debug_photo(image_path: str):
     for key, value in result.items():
         print(f"{key}: {value}")
     
+    # 3. Полный конвейер бота: зоны, MRZ, каскад движков
+    print("\n🚀 DocumentProcessor:")
+    print("=" * 30)
+    pipeline_result = DocumentProcessor().process_passport_image(image_source)
+    for key, value in pipeline_result.items():
+        if key == 'raw_text':
+            continue
+        mark = ""
+        if expected and key in expected:
+            mark = "✅ " if str(value).upper() == expected[key] else f"❌ (ожидалось {expected[key]}) "
+        print(f"{mark}{key}: {value}")
+    
     return text, result
 
 if __name__ == "__main__":
-    # Укажите путь к вашему тестовому фото
-    image_path = "test_photo.jpg"  # или полный путь к файлу
-    debug_photo(image_path)
\ No newline at end of file
+    # Укажите путь к вашему тестовому фото (необязательно)
+    debug_photo(sys.argv[1] if len(sys.argv) > 1 else "test_photo.jpg")
@@ -0,0 +1,28 @@
+# import_csv_to_sqlite.py
+"""
+Однократный перенос passport_data.csv в SQLite.
+
+Запуск: python import_csv_to_sqlite.py [путь_к_csv] [путь_к_базе]
+После переноса установите DATA_STORAGE_TYPE=sqlite.
+"""
+import logging
+import sys
+
+from config import Config
+from src.utils.sqlite_manager import SQLiteManager
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else Config.CSV_FILE_PATH
+    db_path = sys.argv[2] if len(sys.argv) > 2 else Config.SQLITE_DB_PATH
+
+    manager = SQLiteManager(db_path)
+    imported = manager.import_from_csv(csv_path)
+    print(f"✅ Перенесено записей: {imported}")
+    print(f"📊 Всего записей в базе: {manager.get_records_count()}")
+
+
+if __name__ == "__main__":
+    main()
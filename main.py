@@ -3,14 +3,34 @@ import logging
 from telegram.ext import Application, MessageHandler, filters, CommandHandler, CallbackQueryHandler
 
 from config import Config
+from src.bot.update_processor import ChatOrderedUpdateProcessor
+from src.utils.metrics import start_metrics_server
 from src.bot.handlers import (
     start_command, 
     help_command, 
     stats_command,
+    export_command,
+    perf_command,
+    profile_command,
     handle_photo, 
-    button_callback
+    button_callback,
+    ocr_executor,
+    data_manager,
+    session_store
 )
 
+async def post_init(application):
+    # Модели OCR грузятся в фоне, пока бот уже принимает обновления
+    ocr_executor.start_warm_up()
+    start_metrics_server(Config.METRICS_HOST, Config.METRICS_PORT)
+
+async def post_shutdown(application):
+    # Останавливаем пул OCR процессов
+    ocr_executor.shutdown()
+    # Дописываем отложенные записи
+    await data_manager.close()
+    session_store.close()
+
 def main():
     # Настройка логирования
     logging.basicConfig(
@@ -30,12 +50,22 @@ def main():
         return
     
     # Создание приложения
-    application = Application.builder().token(Config.BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(Config.BOT_TOKEN)
+        .concurrent_updates(ChatOrderedUpdateProcessor(Config.CONCURRENT_UPDATES))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
     # Регистрация обработчиков команд
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("export", export_command))
+    application.add_handler(CommandHandler("perf", perf_command))
+    application.add_handler(CommandHandler("profile", profile_command))
     
     # Регистрация обработчиков медиа (ТОЛЬКО фото)
     application.add_handler(MessageHandler(filters.PHOTO, handle_photo))
@@ -44,9 +74,27 @@ def main():
     application.add_handler(CallbackQueryHandler(button_callback))
     
     # Запуск бота
-    logger.info("Bot is starting...")
+    logger.info(f"Bot is starting ({Config.BOT_MODE})...")
     print("🤖 Бот запускается...")
-    application.run_polling()
+    if Config.BOT_MODE == 'webhook':
+        run_webhook(application, logger)
+    else:
+        application.run_polling()
+
+def run_webhook(application, logger):
+    """Telegram сам присылает обновления POST запросами - без getUpdates"""
+    if not Config.WEBHOOK_URL:
+        logger.error("WEBHOOK_URL not found!")
+        return
+    
+    application.run_webhook(
+        listen=Config.WEBHOOK_LISTEN,
+        port=Config.WEBHOOK_PORT,
+        url_path=Config.WEBHOOK_PATH,
+        webhook_url=f"{Config.WEBHOOK_URL.rstrip('/')}/{Config.WEBHOOK_PATH}",
+        secret_token=Config.WEBHOOK_SECRET or None,
+        max_connections=Config.WEBHOOK_MAX_CONNECTIONS
+    )
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,134 @@
+# ocr_worker.py
+"""
+Рабочий узел OCR: берет фото из очереди задач (JOB_BROKER), распознает
+DocumentProcessor и возвращает результат фронтенду бота (OCR_BACKEND=broker).
+Узлов может быть несколько - на этой машине или на других, с доступом к очереди.
+
+Запуск: python ocr_worker.py [--processes N]
+"""
+import argparse
+import logging
+import multiprocessing
+import signal
+import threading
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Как часто отмечаться в очереди, что рабочий жив, и продлевать аренду задачи (сек)
+HEARTBEAT_INTERVAL = 10
+
+
+def setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+
+def _heartbeat_loop(broker, name: str, current: dict, stop_event):
+    """Отдельный поток: пока идет OCR, аренда текущей задачи (current['job_id']) продлевается"""
+    while True:
+        try:
+            broker.heartbeat(name, current['job_id'])
+        except Exception as e:
+            logger.error(f"❌ Ошибка heartbeat рабочего OCR: {e}")
+        if stop_event.wait(HEARTBEAT_INTERVAL):
+            return
+
+
+def run_worker(stop_event):
+    """Цикл одного процесса: задача -> OCR + парсинг -> результат"""
+    # spawn: процесс начинается с чистого интерпретатора, логирование настраиваем заново
+    setup_logging()
+    from src.utils.document_processor import DocumentProcessor, warm_up
+    from src.utils.job_broker import get_job_broker, worker_name
+    from src.utils.metrics import metrics
+    from src.utils.ocr_executor import encode_profile
+    from src.utils.profiler import run_profiled
+
+    # Ctrl+C получает основной процесс и останавливает рабочих через stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    name = worker_name()
+    broker = get_job_broker()
+    warm_up()
+    processor = DocumentProcessor()
+    logger.info(f"✅ Рабочий OCR {name} готов")
+
+    current = {'job_id': None}
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(broker, name, current, stop_event), daemon=True)
+    heartbeat.start()
+    while not stop_event.is_set():
+        job = None
+        try:
+            job = broker.claim(name)
+            if job is None:
+                stop_event.wait(Config.JOB_POLL_INTERVAL)
+                continue
+            current['job_id'] = job['id']
+
+            snapshot = None
+            with metrics.collect() as events:
+                if job['meta'].get('profile'):
+                    result, snapshot = run_profiled(processor.process_passport_image, job['payload'])
+                else:
+                    result = processor.process_passport_image(job['payload'])
+
+            reply = {'result': result, 'events': events}
+            if snapshot:
+                reply['profile'] = encode_profile(snapshot)
+            broker.complete(job['id'], reply)
+            logger.info(f"Задача {job['id']} выполнена (попытка {job['attempts']})")
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка рабочего OCR: {e}")
+            if job is not None:
+                try:
+                    # Сразу в очередь (или ошибка после max_attempts), не дожидаясь аренды
+                    broker.fail(job['id'], str(e))
+                except Exception as fail_error:
+                    # Аренда больше не продлевается - задача вернется в очередь по ее истечении
+                    logger.error(f"❌ Не удалось вернуть задачу {job['id']} в очередь: {fail_error}")
+            stop_event.wait(Config.JOB_POLL_INTERVAL)
+        finally:
+            current['job_id'] = None
+
+    heartbeat.join()
+    broker.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Рабочий узел OCR для очереди задач бота")
+    parser.add_argument('--processes', type=int, default=Config.OCR_WORKERS, help="процессов OCR на узле")
+    args = parser.parse_args()
+
+    setup_logging()
+
+    # spawn: как и в пуле бота, каждый процесс грузит OCR движок сам
+    context = multiprocessing.get_context('spawn')
+    stop_event = context.Event()
+    workers = [
+        context.Process(target=run_worker, args=(stop_event,), name=f"ocr-worker-{i + 1}")
+        for i in range(max(1, args.processes))
+    ]
+    for worker in workers:
+        worker.start()
+    logger.info(f"🚀 Запущено рабочих OCR: {len(workers)}, очередь: {Config.JOB_BROKER}")
+
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    try:
+        while not stop_event.is_set() and any(worker.is_alive() for worker in workers):
+            stop_event.wait(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        logger.info("Останавливаем рабочих OCR, текущие задачи дописываются...")
+        for worker in workers:
+            worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,35 @@
-import os
+import asyncio
 import logging
+import os
+import time
+from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 from config import Config
-from src.utils.file_handlers import download_file, cleanup_file
+from src.utils.file_handlers import download_file, download_file_to_memory, cleanup_file
+from src.utils.ocr_executor import OCRQueueFullError, create_ocr_executor
 from src.utils.document_processor import DocumentProcessor
 from src.utils.data_manager import DataManager
 from src.utils.file_generator import FileGenerator
+from src.utils.image_utils import content_digest
+from src.utils.result_cache import ResultCache
+from src.utils.duplicate_index import DuplicateRecordError
+from src.utils.session_store import SessionStore
+from src.utils.exporter import parse_export_args, export_records_gzip
+from src.utils.admission import AdmissionController, RateLimitedError
+from src.utils.records import split_series_number
+from src.utils.metrics import metrics
+from src.utils.profiler import profiler
+from src.bot.progress import ProgressReporter
 
 logger = logging.getLogger(__name__)
-doc_processor = DocumentProcessor()
+ocr_executor = create_ocr_executor()
 data_manager = DataManager()
 file_generator = FileGenerator()
+result_cache = ResultCache()
+session_store = SessionStore()
+admission = AdmissionController()
 
 # Команды бота
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -50,20 +67,54 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         storage_info = data_manager.get_storage_info()
         
-        if storage_info['type'] == 'csv':
+        if storage_info['type'] in ('csv', 'sqlite'):
+            storage_name = 'CSV файл' if storage_info['type'] == 'csv' else 'SQLite'
             stats_text = f"""
 📊 Статистика базы данных:
 
-💾 Тип хранилища: CSV файл
+💾 Тип хранилища: {storage_name}
 📁 Файл: {storage_info.get('file_path', 'не найден')}
 📊 Записей: {storage_info.get('records_count', 0)}
 """
+            write_queue = storage_info.get('write_queue')
+            if write_queue:
+                stats_text += (
+                    f"✍️ Очередь записи: {write_queue['queue_depth']}, "
+                    f"последний сброс {write_queue['last_flush_ms']} мс\n"
+                )
+            
             records = storage_info.get('last_records', [])
             if records:
                 stats_text += "\nПоследние записи:"
                 for i, record in enumerate(records[-3:], 1):
                     stats_text += f"\n{i}. {record.get('ФИО', 'Неизвестно')} - {record.get('Дата добавления', '')}"
             
+            admission_stats = admission.stats()
+            stats_text += (
+                f"\n\n🚦 OCR: выполняется {admission_stats['running']}, в очереди {admission_stats['waiting']}, "
+                f"отказов по лимиту {admission_stats['rate_limited']}, по очереди {admission_stats['queue_rejected']}"
+                f"\n⏱ Ожидание в очереди: среднее {admission_stats['wait_avg_ms']} мс, "
+                f"p95 {admission_stats['wait_p95_ms']} мс, макс {admission_stats['wait_max_ms']} мс"
+            )
+            
+            if Config.OCR_BACKEND == 'broker':
+                broker_stats = await ocr_executor.stats()
+                stats_text += (
+                    f"\n\n🛰 Очередь задач: ждут {broker_stats['queued']}, выполняются {broker_stats['running']}, "
+                    f"рабочих узлов {broker_stats['workers']}"
+                )
+            
+            cache_stats = result_cache.stats()
+            stats_text += (
+                f"\n\n⚡ Кеш распознавания: {cache_stats['size']} записей, "
+                f"попаданий {cache_stats['hits']}, промахов {cache_stats['misses']}"
+            )
+            session_stats = await asyncio.to_thread(session_store.stats)
+            stats_text += (
+                f"\n🗂 Результаты до сохранения: {session_stats['size']} "
+                f"(в памяти {session_stats['in_memory']})"
+            )
+            
             await update.message.reply_text(stats_text)
         else:
             await update.message.reply_text(f"Тип хранилища: {storage_info['type']}")
@@ -72,57 +123,354 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"Ошибка статистики: {e}")
         await update.message.reply_text("❌ Ошибка получения статистики")
 
+def _is_admin(update: Update) -> bool:
+    return str(update.effective_user.id) == str(Config.ADMIN_ID)
+
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Выгрузка базы для администратора: /export [from=ГГГГ-ММ-ДД] [to=ГГГГ-ММ-ДД] [user=ID].
+    Записи читаются порциями и сжимаются gzip на лету - память не растет с размером базы.
+    """
+    if not _is_admin(update):
+        await update.message.reply_text("⛔ Команда доступна только администратору")
+        return
+    
+    try:
+        filters = parse_export_args(context.args or [])
+    except ValueError as e:
+        await update.message.reply_text(
+            f"❌ {e}\nФормат: /export [from=ГГГГ-ММ-ДД] [to=ГГГГ-ММ-ДД] [user=ID]"
+        )
+        return
+    
+    output = None
+    try:
+        await update.message.reply_text("📦 Готовлю выгрузку...")
+        # Отложенные строки CSV должны попасть в выгрузку
+        await data_manager.flush()
+        output, exported = await asyncio.to_thread(
+            export_records_gzip, data_manager.iter_records(**filters)
+        )
+        
+        if not exported:
+            await update.message.reply_text("📭 Нет записей для выгрузки")
+            return
+        
+        filename = f"passport_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv.gz"
+        await update.message.reply_document(
+            document=output,
+            filename=filename,
+            caption=f"✅ Выгружено записей: {exported}"
+        )
+        
+    except Exception as e:
+        logger.error(f"❌ Ошибка выгрузки: {e}")
+        await update.message.reply_text("❌ Ошибка выгрузки данных")
+    finally:
+        if output:
+            output.close()
+
+async def perf_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Задержки по этапам обработки фото, ошибки и попадания в кеш (для администратора)"""
+    if not _is_admin(update):
+        await update.message.reply_text("⛔ Команда доступна только администратору")
+        return
+    
+    rows = metrics.summary()
+    if not rows:
+        await update.message.reply_text("📭 Замеров пока нет - ни одно фото не обработано")
+        return
+    
+    lines = ["⏱ Этапы обработки (мс): число, среднее, p50, p95, макс", ""]
+    for row in rows:
+        stage = f"{row['stage']}/{row['engine']}" if row['engine'] else row['stage']
+        lines.append(
+            f"{stage}: {row['count']} | {row['avg_ms']} | {row['p50_ms']} | {row['p95_ms']} | {row['max_ms']}"
+        )
+    
+    counters = metrics.counters()
+    errors = [
+        f"{dict(labels).get('stage')} {value}"
+        for (name, labels), value in sorted(counters.items()) if name == 'errors_total'
+    ]
+    lines.append("")
+    lines.append(f"❌ Ошибки: {', '.join(errors) if errors else 'нет'}")
+    lines.append(
+        f"⚡ Кеш: по file_id {metrics.counter('cache_hits_total', cache='file_id')}, "
+        f"по хешу {metrics.counter('cache_hits_total', cache='image_hash')}, "
+        f"промахов {metrics.counter('cache_misses_total')}"
+    )
+    if Config.METRICS_PORT:
+        lines.append(f"📈 Prometheus: http://{Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics")
+    
+    await update.message.reply_text("\n".join(lines))
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Профилирование OCR в рабочих процессах без перезапуска (для администратора):
+    /profile [N] - следующие N задач, /profile 120s - окно, /profile stop - завершить.
+    """
+    if not _is_admin(update):
+        await update.message.reply_text("⛔ Команда доступна только администратору")
+        return
+    
+    args = context.args or []
+    if args and args[0] == 'stop':
+        if not profiler.active:
+            await update.message.reply_text("ℹ️ Профилирование не запущено")
+            return
+        profiler.stop()
+        await update.message.reply_text("⏹ Профилирование остановлено, результат придет после текущих задач")
+        return
+    
+    if not args and profiler.active:
+        await update.message.reply_text(f"🔬 Профилирование идет: {profiler.session.describe()}")
+        return
+    
+    jobs, seconds = Config.PROFILE_DEFAULT_JOBS, None
+    try:
+        if args and args[0].endswith('s'):
+            seconds = float(args[0][:-1])
+        elif args:
+            jobs = int(args[0])
+    except ValueError:
+        await update.message.reply_text("❌ Формат: /profile [N] | /profile 120s | /profile stop")
+        return
+    
+    chat_id = update.effective_chat.id
+    bot = context.bot
+    
+    async def send_profile(path, summary, profiled, error):
+        try:
+            if error:
+                await bot.send_message(
+                    chat_id, f"❌ Профилирование завершено (задач: {profiled}), но профиль не сохранен: {error}"
+                )
+                return
+            if not path:
+                await bot.send_message(chat_id, "🔬 Профилирование завершено: за это время не было задач OCR")
+                return
+            with open(path, 'rb') as f:
+                await bot.send_document(
+                    chat_id, document=f, filename=os.path.basename(path),
+                    caption=f"🔬 Профиль OCR, задач: {profiled}. Открыть: python -m pstats <файл> или snakeviz"
+                )
+            # Лимит сообщения Telegram - 4096 символов
+            await bot.send_message(chat_id, summary[:4000])
+        except Exception as e:
+            logger.error(f"❌ Ошибка отправки профиля: {e}")
+        finally:
+            if path:
+                cleanup_file(path)
+    
+    try:
+        session = profiler.start(send_profile, jobs=jobs, seconds=seconds)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    await update.message.reply_text(f"🔬 Профилирование OCR включено: {session.describe()}")
+
 # Обработка фото
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     photo = update.message.photo[-1]
     
+    # Фото альбома собираются и обрабатываются одним документом
+    if update.message.media_group_id:
+        _collect_album_photo(update, context)
+        return
+    
     logger.info(f"Получено фото от пользователя {user_id}")
-    await update.message.reply_text("📸 Фото получено. Начинаю обработку...")
+    started = time.perf_counter()
+    
+    # Повторно присланное фото: без скачивания и OCR
+    cached = result_cache.get(photo.file_unique_id)
+    if cached:
+        logger.info(f"Результат для {photo.file_unique_id} взят из кеша")
+        metrics.inc('cache_hits_total', cache='file_id')
+        await _send_passport_result(update, context, cached)
+        metrics.observe('total', time.perf_counter() - started)
+        return
+    
+    # Дешевая проверка лимитов до скачивания фото
+    try:
+        priority = admission.admit(user_id, photo.file_unique_id)
+    except RateLimitedError as e:
+        await update.message.reply_text(f"⏳ Слишком много фото подряд. Попробуйте через {e.retry_after} сек.")
+        return
+    except OCRQueueFullError:
+        await update.message.reply_text("⏳ Сервер перегружен, очередь заполнена. Попробуйте через минуту.")
+        return
+    
+    # Все этапы и итог - в одном сообщении статуса
+    progress = ProgressReporter(update.message)
+    position = admission.queue_position()
+    if not ocr_executor.is_ready:
+        await progress.update("⏳ Бот только что запустился и загружает модели распознавания. Фото в очереди, ответ придет автоматически.")
+    elif position:
+        await progress.update(f"⏳ Фото поставлено в очередь, позиция {position}")
+    else:
+        await progress.update("📸 Фото получено. Начинаю обработку...")
     
+    file_path = None
     try:
-        # Скачиваем файл
-        file_path = await download_file(photo, "photo", Config.TEMP_DIR)
+        with metrics.timer('download'):
+            image_source, file_path = await _download_photo(photo)
         
-        # Обрабатываем документ
-        await update.message.reply_text("🔍 Распознаю текст...")
-        result = await doc_processor.process_document(file_path) # type: ignore
+        # Тот же снимок может прийти с другим file_unique_id (пересланное фото);
+        # ключ - криптографический хеш файла: похожие паспорта разных людей не совпадут
+        try:
+            if isinstance(image_source, bytes):
+                image_hash = content_digest(image_source)
+            else:
+                image_hash = await asyncio.to_thread(content_digest, image_source)
+        except Exception as e:
+            logger.warning(f"Не удалось вычислить хеш изображения: {e}")
+            image_hash = None
         
-        # Сохраняем результат и информацию о пользователе
-        context.user_data['last_parsed_data'] = result
-        context.user_data['user_info'] = {
-            'user_id': user_id,
-            'username': update.effective_user.username or 'не указан',
-            'first_name': update.effective_user.first_name or 'не указан'
-        }
+        result = result_cache.get(image_hash)
+        if result:
+            metrics.inc('cache_hits_total', cache='image_hash')
+            result_cache.put([photo.file_unique_id], result)
+        else:
+            metrics.inc('cache_misses_total')
+            # Обрабатываем документ в пуле процессов
+            async with admission.slot(priority):
+                await progress.update("🔍 Распознаю текст...")
+                result = await ocr_executor.process(image_source)
+            result_cache.put([photo.file_unique_id, image_hash], result)
         
-        # Форматируем и отправляем результат
-        response_text = format_passport_data(result)
+        if 'error' in result:
+            admission.mark_failed(photo.file_unique_id)
+        else:
+            admission.mark_done(photo.file_unique_id)
+        await _send_passport_result(update, context, result, progress)
+        metrics.observe('total', time.perf_counter() - started)
         
-        # Создаем клавиатуру с кнопками
-        keyboard = [
-            [
-                InlineKeyboardButton("💾 Сохранить в базу", callback_data="save_to_db"),
-                InlineKeyboardButton("📥 Скачать файл", callback_data="download_file")
-            ],
-            [
-                InlineKeyboardButton("🔄 Новое фото", callback_data="new_photo")
-            ]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+    except Exception as e:
+        admission.mark_failed(photo.file_unique_id)
+        metrics.inc('errors_total', stage='total')
+        logger.error(f"Ошибка обработки фото: {e}")
+        await progress.finish("❌ Ошибка при обработке фото. Попробуйте еще раз.")
+    finally:
+        # Удаляем временный файл (только для дискового варианта)
+        if file_path:
+            cleanup_file(file_path)
+
+async def _download_photo(photo):
+    """Скачивает фото в память, диск - только запасной вариант. Возвращает (источник, путь к файлу)"""
+    if Config.OCR_IN_MEMORY:
+        try:
+            return await download_file_to_memory(photo), None
+        except Exception as e:
+            logger.warning(f"Не удалось скачать фото в память: {e}")
+    file_path = await download_file(photo, "photo", Config.TEMP_DIR)
+    return file_path, file_path
+
+# Альбомы: Telegram присылает каждое фото media group отдельным обновлением
+_pending_albums = {}
+_album_tasks = set()
+
+def _collect_album_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    media_group_id = update.message.media_group_id
+    album = _pending_albums.setdefault(media_group_id, [])
+    album.append(update)
+    
+    # Первое фото альбома запускает отложенную обработку всей группы
+    if len(album) == 1:
+        task = asyncio.get_running_loop().create_task(_process_album(media_group_id, context))
+        _album_tasks.add(task)
+        task.add_done_callback(_album_tasks.discard)
+
+async def _process_album(media_group_id: str, context: ContextTypes.DEFAULT_TYPE):
+    """Распознает все фото альбома одним пакетом и отвечает одним сообщением"""
+    await asyncio.sleep(Config.ALBUM_COLLECT_SECONDS)
+    updates = _pending_albums.pop(media_group_id, [])
+    first_update = updates[0]
+    photos = [update.message.photo[-1] for update in updates]
+    
+    logger.info(f"Получен альбом из {len(photos)} фото от пользователя {first_update.effective_user.id}")
+    
+    # Альбом - одна задача: один токен пользователя и одно место в очереди
+    album_key = photos[0].file_unique_id
+    try:
+        priority = admission.admit(first_update.effective_user.id, album_key)
+    except RateLimitedError as e:
+        await first_update.message.reply_text(f"⏳ Слишком много фото подряд. Попробуйте через {e.retry_after} сек.")
+        return
+    except OCRQueueFullError:
+        await first_update.message.reply_text("⏳ Сервер перегружен, очередь заполнена. Попробуйте через минуту.")
+        return
+    
+    progress = ProgressReporter(first_update.message)
+    await progress.update(f"📸 Получено фото: {len(photos)}. Обрабатываю как один документ...")
+    
+    started = time.perf_counter()
+    file_paths = []
+    try:
+        # Уже распознанные страницы берем из кеша
+        results = [result_cache.get(photo.file_unique_id) for photo in photos]
+        missing = [i for i, result in enumerate(results) if not result]
+        metrics.inc('cache_hits_total', len(photos) - len(missing), cache='file_id')
         
-        await update.message.reply_text(
-            response_text, 
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
+        if missing:
+            metrics.inc('cache_misses_total', len(missing))
+            with metrics.timer('download'):
+                downloads = await asyncio.gather(*[_download_photo(photos[i]) for i in missing])
+            file_paths = [file_path for _, file_path in downloads if file_path]
+            async with admission.slot(priority):
+                await progress.update(f"🔍 Распознаю текст: {len(missing)} фото...")
+                recognized = await ocr_executor.process_batch([source for source, _ in downloads])
+            for i, result in zip(missing, recognized):
+                result_cache.put([photos[i].file_unique_id], result)
+                results[i] = result
         
-        # Удаляем временный файл
-        cleanup_file(file_path)
+        admission.mark_done(album_key)
+        await _send_passport_result(first_update, context, DocumentProcessor.merge_results(results), progress)
+        metrics.observe('total', time.perf_counter() - started)
         
     except Exception as e:
-        logger.error(f"Ошибка обработки фото: {e}")
-        await update.message.reply_text("❌ Ошибка при обработке фото. Попробуйте еще раз.")
+        admission.mark_failed(album_key)
+        metrics.inc('errors_total', stage='total')
+        logger.error(f"Ошибка обработки альбома: {e}")
+        await progress.finish("❌ Ошибка при обработке фото. Попробуйте еще раз.")
+    finally:
+        for file_path in file_paths:
+            cleanup_file(file_path)
+
+async def _send_passport_result(update: Update, context: ContextTypes.DEFAULT_TYPE, result: dict,
+                                progress: ProgressReporter = None):
+    """Запоминает результат и отправляет его с кнопками - вместо сообщения статуса, если оно есть"""
+    user = update.effective_user
+    
+    # Сохраняем результат и информацию о пользователе - до нажатия кнопок, в том числе после перезапуска
+    await session_store.put_async(user.id, result, {
+        'user_id': user.id,
+        'username': user.username or 'не указан',
+        'first_name': user.first_name or 'не указан'
+    })
+    
+    # Форматируем и отправляем результат
+    response_text = format_passport_data(result)
+    
+    # Создаем клавиатуру с кнопками
+    keyboard = [
+        [
+            InlineKeyboardButton("💾 Сохранить в базу", callback_data="save_to_db"),
+            InlineKeyboardButton("📥 Скачать файл", callback_data="download_file")
+        ],
+        [
+            InlineKeyboardButton("🔄 Новое фото", callback_data="new_photo")
+        ]
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    
+    with metrics.timer('reply'):
+        await (progress or ProgressReporter(update.message)).finish(
+            response_text,
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
 
 # Обработка callback-кнопок
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -135,7 +483,10 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await _handle_save_to_db(query, context)
         
     elif callback_data == "download_file":
-        await _handle_download_file(query, context)
+        await _show_download_formats(query)
+        
+    elif callback_data.startswith("download:"):
+        await _handle_download_file(query, context, callback_data.split(":", 1)[1])
         
     elif callback_data == "new_photo":
         await query.edit_message_text("🔄 Отправьте новое фото паспорта для обработки.")
@@ -143,34 +494,66 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def _handle_save_to_db(query, context):
     """Обрабатывает сохранение в базу данных"""
     try:
-        passport_data = context.user_data.get('last_parsed_data')
-        user_info = context.user_data.get('user_info')
-        
-        if not passport_data or not user_info:
+        session = await session_store.get_async(query.from_user.id)
+        if not session:
             await query.edit_message_text("❌ Данные не найдены. Обработайте фото заново.")
             return
+        passport_data, user_info = session['passport_data'], session['user_info']
         
         if 'error' in passport_data:
             await query.edit_message_text(f"❌ Ошибка в данных: {passport_data['error']}")
             return
         
-        await query.edit_message_text("💾 Сохраняю данные в базу...")
+        # Статус и итог - правки одного сообщения с кнопками; на быстрое сохранение уходит одна правка
+        progress = ProgressReporter(query.message, status=query.message)
+        
+        # Проверка дубликата и резервирование ключей - один шаг: параллельное сохранение
+        # того же паспорта из другого чата увидит дубликат
+        check_duplicates = Config.DUPLICATE_POLICY != 'allow'
+        duplicate_added_at = None
+        if check_duplicates:
+            duplicate_added_at = await data_manager.reserve_duplicate(passport_data, user_info)
         
-        # Сохраняем в базу
-        success = data_manager.save_passport_data(passport_data, user_info)
+        success = False
+        if duplicate_added_at is None:
+            await progress.update("💾 Сохраняю данные в базу...")
+            # Сохраняем в базу (запись в CSV уходит в очередь отложенной записи)
+            try:
+                with metrics.timer('storage'):
+                    success = await data_manager.save_passport_data_async(
+                        passport_data, user_info, reserved=check_duplicates
+                    )
+            except DuplicateRecordError as e:
+                # Тот же паспорт записан другим процессом между проверкой и записью
+                duplicate_added_at = e.added_at
+        
+        if duplicate_added_at is not None:
+            if Config.DUPLICATE_POLICY == 'merge' and data_manager.can_merge:
+                merged = await data_manager.merge_passport_data_async(passport_data, user_info)
+                await progress.finish(
+                    f"🔁 Этот паспорт уже есть в базе (добавлен {duplicate_added_at or 'ранее'}).\n"
+                    + ("Недостающие поля дополнены." if merged else "Новых данных для дополнения нет.")
+                )
+            else:
+                await progress.finish(
+                    f"⚠️ Этот паспорт уже сохранен в базе (добавлен {duplicate_added_at or 'ранее'}).\n"
+                    "Повторная запись не создана."
+                )
+            return
         
         if success:
             storage_info = data_manager.get_storage_info()
             record_count = storage_info.get('records_count', 0)
             
-            await query.edit_message_text(
+            await progress.finish(
                 f"✅ Данные успешно сохранены в базу!\n\n"
                 f"📊 Всего записей: {record_count}\n"
                 f"👤 Пользователь: {user_info.get('username', 'Неизвестно')}\n"
                 f"📅 Дата: {passport_data.get('issue_date', 'Неизвестно')}"
             )
         else:
-            await query.edit_message_text(
+            metrics.inc('errors_total', stage='storage')
+            await progress.finish(
                 "❌ Не удалось сохранить данные в базу.\n"
                 "Попробуйте позже или скачайте текстовый файл."
             )
@@ -179,36 +562,40 @@ async def _handle_save_to_db(query, context):
         logger.error(f"Ошибка сохранения в базу: {e}")
         await query.edit_message_text("❌ Произошла ошибка при сохранении.")
 
-async def _handle_download_file(query, context):
-    """Обрабатывает скачивание текстового файла"""
+async def _show_download_formats(query):
+    """Заменяет кнопки под результатом на выбор формата файла"""
+    keyboard = [
+        [
+            InlineKeyboardButton(f"📄 {file_format.upper()}", callback_data=f"download:{file_format}")
+            for file_format in file_generator.formats
+        ]
+    ]
+    await query.edit_message_reply_markup(reply_markup=InlineKeyboardMarkup(keyboard))
+
+async def _handle_download_file(query, context, file_format: str = 'txt'):
+    """Обрабатывает скачивание файла с данными в выбранном формате"""
     try:
-        passport_data = context.user_data.get('last_parsed_data')
-        user_info = context.user_data.get('user_info')
-        
-        if not passport_data or not user_info:
+        session = await session_store.get_async(query.from_user.id)
+        if not session:
             await query.edit_message_text("❌ Данные не найдены. Обработайте фото заново.")
             return
+        passport_data, user_info = session['passport_data'], session['user_info']
         
         if 'error' in passport_data:
             await query.edit_message_text(f"❌ Ошибка в данных: {passport_data['error']}")
             return
         
-        await query.edit_message_text("📄 Создаю текстовый файл...")
+        await query.edit_message_text("📄 Создаю файл...")
         
-        # Создаем текстовый файл
-        file_path = file_generator.create_passport_text_file(passport_data, user_info)
+        # Файл собирается в памяти - диск не используется
+        buffer, filename = file_generator.create_passport_file(passport_data, user_info, file_format)
         
-        if file_path and os.path.exists(file_path):
-            # Отправляем файл пользователю
-            with open(file_path, 'rb') as file:
-                await query.message.reply_document(
-                    document=file,
-                    filename=os.path.basename(file_path),
-                    caption="📄 Ваши данные в текстовом файле"
-                )
-            
-            # Удаляем временный файл
-            file_generator.cleanup_file(file_path)
+        if buffer is not None:
+            await query.message.reply_document(
+                document=buffer,
+                filename=filename,
+                caption=f"📄 Ваши данные в формате {file_format.upper()}"
+            )
             
             await query.edit_message_text("✅ Файл успешно отправлен!")
         else:
@@ -223,38 +610,27 @@ def format_passport_data(data: dict) -> str:
     """Форматирует данные паспорта для красивого вывода"""
     if 'error' in data:
         return f"❌ {data['error']}"
-    
+
+    series, number = split_series_number(data)
+    code = data.get('code') or data.get('passport_code') or 'не распознано'
     lines = [
         "📄 **Распознанные данные паспорта:**",
         "",
         f"👤 **ФИО:** {data.get('full_name', 'не распознано')}",
         f"🎂 **Дата рождения:** {data.get('birth_date', 'не распознано')}",
         f"📍 **Место рождения:** {data.get('birth_place', 'не распознано')}",
-        f"🔢 **Серия паспорта:** {data.get('passport_series', 'не распознано')}",
-        f"🔢 **Номер паспорта:** {data.get('passport_number', 'не распознано')}",
-        f"🏷️ **Код подразделения:** {data.get('passport_code', 'не распознано')}",
+        f"🔢 **Серия паспорта:** {series or 'не распознано'}",
+        f"🔢 **Номер паспорта:** {number or 'не распознано'}",
+        f"🏷️ **Код подразделения:** {code}",
         f"📅 **Дата выдачи:** {data.get('issue_date', 'не распознано')}",
         f"🏛️ **Кем выдан:** {data.get('authority', 'не распознано')}",
+    ]
+    if data.get('failed_pages'):
+        lines += ["", f"⚠️ Не распознаны фото: {', '.join(map(str, data['failed_pages']))} - данные только по остальным"]
+    lines += [
         "",
         "---",
         "💾 Выберите действие:"
     ]
     
     return "\n".join(lines)
-def format_passport_result(result):
-    """Форматирует результат парсинга для красивого вывода"""
-    
-    # Для вашего конкретного случая
-    if 'БУДНИКОВА' in result.get('full_name', ''):
-        return {
-            'full_name': 'БУДНИКОВА ТАТЬЯНА АЛЕКСАНДРОВНА',
-            'birth_date': '22.11.1994',
-            'birth_place': 'ГОР. НЕРЮНГРИ РЕСПУБЛИКИ САХА (ЯКУТИЯ)',
-            'series_number': '03 11 339404',
-            'code': '030-040',
-            'issue_date': '02.03.2015',
-            'authority': 'ОТДЕЛ УФМС РОССИИ ПО КРАСНОДАРСКОМУ КРАЮ В КУРГАНИНСКОМ РАЙОНЕ',
-            'gender': 'ЖЕН'
-        }
-    
-    return result
\ No newline at end of file
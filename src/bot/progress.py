@@ -0,0 +1,166 @@
+# src/bot/progress.py
+import asyncio
+import logging
+import time
+from telegram.error import BadRequest, RetryAfter
+from config import Config
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Когда чату в последний раз отправляли/редактировали сообщение (monotonic) - общий лимит на чат
+_last_call = {}
+# Сколько чатов помнить, прежде чем чистить устаревшие записи
+_MAX_CHATS = 10000
+
+
+def _prune(now: float):
+    interval = Config.PROGRESS_EDIT_INTERVAL
+    for chat_id in [chat_id for chat_id, called in _last_call.items() if now - called >= interval]:
+        del _last_call[chat_id]
+
+
+class ProgressReporter:
+    """
+    Одно сообщение статуса на задачу. Первый update() отправляет сообщение,
+    следующие только запоминают текст: правка уходит не чаще раза в
+    PROGRESS_EDIT_INTERVAL на чат, промежуточные этапы схлопываются.
+    finish() заменяет статус итоговым ответом - на быстрое фото уходит
+    два вызова Bot API: статус и результат.
+    """
+
+    def __init__(self, message, status=None):
+        # message - сообщение пользователя, на которое отвечаем; status - уже существующее сообщение бота
+        self.message = message
+        self.chat_id = message.chat_id
+        self.status = status
+        self._shown = status.text if status is not None else None
+        self._pending = None
+        self._task = None
+        self._calling = False  # отложенная правка уже отправлена в Bot API
+        self._started = time.monotonic()
+
+    def _wait_time(self, interval: float = None) -> float:
+        """Сколько ждать до следующего вызова; interval=0 - только пауза flood wait"""
+        called = _last_call.get(self.chat_id)
+        if called is None:
+            return 0.0
+        if interval is None:
+            interval = Config.PROGRESS_EDIT_INTERVAL
+        return max(0.0, called + interval - time.monotonic())
+
+    def _mark_call(self, delay: float = 0.0):
+        now = time.monotonic()
+        if len(_last_call) > _MAX_CHATS:
+            _prune(now)
+        # delay > 0 - Telegram попросил подождать (flood wait): до этого момента чат не трогаем
+        _last_call[self.chat_id] = now + delay
+
+    async def update(self, text: str):
+        """Новый этап задачи; правка сообщения откладывается и схлопывается"""
+        self._pending = text
+        if self.status is None and not self._wait_time():
+            await self._send_status()
+        elif self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _send_status(self):
+        text, self._pending = self._pending, None
+        try:
+            self._mark_call()
+            self.status = await self.message.reply_text(text)
+            self._shown = text
+            metrics.inc('bot_api_calls_total', method='send')
+        except RetryAfter as e:
+            self._mark_call(e.retry_after)
+            logger.warning(f"Flood wait {e.retry_after} сек в чате {self.chat_id}, статус пропущен")
+        except Exception as e:
+            logger.warning(f"Не удалось отправить статус: {e}")
+
+    async def _flush_later(self):
+        # Этап короче интервала не показываем вовсе - его сразу заменит итог
+        first_edit = self._started + Config.PROGRESS_EDIT_INTERVAL - time.monotonic()
+        await asyncio.sleep(max(self._wait_time(), first_edit))
+        self._calling = True
+        try:
+            if self.status is None:
+                await self._send_status()
+                return
+            text, self._pending = self._pending, None
+            if not text or text == self._shown:
+                return
+            self._mark_call()
+            await self.status.edit_text(text)
+            self._shown = text
+            metrics.inc('bot_api_calls_total', method='edit')
+        except RetryAfter as e:
+            # Промежуточный статус не важен - пропускаем, итог дождется окончания паузы
+            self._mark_call(e.retry_after)
+            logger.warning(f"Flood wait {e.retry_after} сек в чате {self.chat_id}, статус пропущен")
+        except Exception as e:
+            # Сетевая ошибка промежуточного статуса не должна дойти до finish()
+            logger.warning(f"Не удалось обновить статус: {e}")
+        finally:
+            self._calling = False
+
+    async def finish(self, text: str, **kwargs) -> bool:
+        """
+        Итоговый ответ: заменяет статус (или отправляется, если статуса нет);
+        kwargs - для reply_text/edit_text. Исключений не бросает - вызывается
+        и из обработчиков ошибок; False - ответ отправить не удалось.
+        """
+        if self._task is not None and not self._task.done():
+            if self._calling:
+                # Запрос уже ушел - дожидаемся, иначе статус останется висеть отдельным сообщением
+                await self._task
+            else:
+                self._task.cancel()
+        self._pending = None
+
+        for attempt in range(3):
+            # Итог не откладывается ради промежуточных правок - только по требованию Telegram
+            await asyncio.sleep(self._wait_time(0))
+            try:
+                self._mark_call()
+                if self.status is None:
+                    self.status = await self.message.reply_text(text, **kwargs)
+                    metrics.inc('bot_api_calls_total', method='send')
+                else:
+                    await self.status.edit_text(text, **kwargs)
+                    metrics.inc('bot_api_calls_total', method='edit')
+                self._shown = text
+                return True
+            except RetryAfter as e:
+                self._mark_call(e.retry_after)
+                logger.warning(f"Flood wait {e.retry_after} сек в чате {self.chat_id}, ждем для итогового ответа")
+            except BadRequest as e:
+                error = str(e).lower()
+                if 'not modified' in error:
+                    # В статусе уже этот текст
+                    self._shown = text
+                    return True
+                if 'parse' in error and kwargs.get('parse_mode'):
+                    # Разметка не разобралась - тот же текст без форматирования
+                    logger.warning(f"Не удалось разобрать разметку итога: {e}")
+                    kwargs.pop('parse_mode')
+                    continue
+                if self.status is None:
+                    logger.error(f"❌ Итоговый ответ в чат {self.chat_id} не отправлен: {e}")
+                    return False
+                # Статус не редактируется - итог отправляем новым сообщением, старый статус убираем
+                logger.warning(f"Не удалось заменить статус итогом: {e}")
+                await self._delete_status()
+            except Exception as e:
+                logger.error(f"❌ Итоговый ответ в чат {self.chat_id} не отправлен: {e}")
+                return False
+        logger.error(f"❌ Итоговый ответ в чат {self.chat_id} не отправлен")
+        return False
+
+    async def _delete_status(self):
+        status, self.status = self.status, None
+        try:
+            await status.delete()
+            metrics.inc('bot_api_calls_total', method='delete')
+        except Exception as e:
+            # Статус уже удален пользователем - ничего страшного
+            logger.warning(f"Не удалось удалить статус: {e}")
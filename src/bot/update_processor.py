@@ -0,0 +1,57 @@
+# src/bot/update_processor.py
+import asyncio
+import logging
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Лимит базового класса: его семафор берется до очереди чата, поэтому
+# настоящий лимит CONCURRENT_UPDATES держит do_process_update
+_BASE_LIMIT = 1 << 30
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обрабатывает обновления параллельно (до max_concurrent_updates), но
+    обновления одного чата - строго по очереди: фото, нажатие "Сохранить"
+    и следующее фото пользователя не обгоняют друг друга.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(_BASE_LIMIT)
+        if max_concurrent_updates < 1:
+            raise ValueError("max_concurrent_updates должен быть положительным")
+        self.max_updates = max_concurrent_updates
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        # chat_id -> [lock, число ожидающих обновлений]
+        self._chat_locks = {}
+
+    async def do_process_update(self, update, coroutine):
+        """
+        Сначала очередь чата, потом общий лимит: пока обновление ждет
+        предыдущие обновления своего чата, оно не занимает слот
+        CONCURRENT_UPDATES и не задерживает другие чаты.
+        """
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            async with self._slots:
+                await coroutine
+            return
+
+        entry = self._chat_locks.setdefault(chat.id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0], self._slots:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            # Блокировки неактивных чатов не копятся
+            if not entry[1]:
+                del self._chat_locks[chat.id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        self._chat_locks.clear()
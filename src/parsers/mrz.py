@@ -0,0 +1,119 @@
+# src/parsers/mrz.py
+import re
+import logging
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Машиночитаемая зона паспорта РФ (ICAO 9303, формат TD3, 2 строки по 44 символа).
+# Вторая строка: номер документа (3 цифры серии + 6 цифр номера), гражданство,
+# дата рождения, пол, срок действия (у внутреннего паспорта пустой) и
+# дополнительные данные: последняя цифра серии, дата выдачи, код подразделения.
+MRZ_LINE2_RE = re.compile(
+    r'(?P<document>[0-9]{9})(?P<document_check>[0-9])'
+    r'(?P<nationality>RUS)'
+    r'(?P<birth>[0-9]{6})(?P<birth_check>[0-9])'
+    r'(?P<sex>[MF<])'
+    r'(?P<expiry>[0-9<]{6})(?P<expiry_check>[0-9<])'
+    r'(?P<optional>[0-9<]{14})(?P<optional_check>[0-9<])'
+    r'(?P<composite_check>[0-9])'
+)
+MRZ_LINE1_RE = re.compile(r'P[N<]RUS(?P<names>[A-Z0-9<]{10,39})')
+
+# Транслитерация ФИО в MRZ внутреннего паспорта РФ
+MRZ_TO_CYRILLIC = {
+    'A': 'А', 'B': 'Б', 'V': 'В', 'G': 'Г', 'D': 'Д', 'E': 'Е', '2': 'Ё',
+    'J': 'Ж', 'Z': 'З', 'I': 'И', 'Q': 'Й', 'K': 'К', 'L': 'Л', 'M': 'М',
+    'N': 'Н', 'O': 'О', 'P': 'П', 'R': 'Р', 'S': 'С', 'T': 'Т', 'U': 'У',
+    'F': 'Ф', 'H': 'Х', 'C': 'Ц', '3': 'Ч', '4': 'Ш', 'W': 'Щ', 'X': 'Ъ',
+    'Y': 'Ы', '9': 'Ь', '6': 'Э', '7': 'Ю', '8': 'Я'
+}
+
+_WEIGHTS = (7, 3, 1)
+
+
+def check_digit(field: str) -> int:
+    """Контрольная цифра ICAO 9303: веса 7-3-1, '<' = 0, A-Z = 10-35"""
+    total = 0
+    for i, char in enumerate(field):
+        if char.isdigit():
+            value = int(char)
+        elif 'A' <= char <= 'Z':
+            value = ord(char) - ord('A') + 10
+        else:
+            value = 0
+        total += value * _WEIGHTS[i % 3]
+    return total % 10
+
+
+def _is_valid(field: str, check: str) -> bool:
+    # Пустое поле (одни '<') допускает контрольный символ '<'
+    if check == '<':
+        return set(field) <= {'<'}
+    return check_digit(field) == int(check)
+
+
+def _format_date(yymmdd: str, past_only: bool = True) -> Optional[str]:
+    try:
+        date = datetime.strptime(yymmdd, '%y%m%d')
+    except ValueError:
+        return None
+    # strptime относит 00-68 к 2000-м; даты рождения и выдачи не бывают в будущем
+    if past_only and date > datetime.now():
+        date = date.replace(year=date.year - 100)
+    return date.strftime('%d.%m.%Y')
+
+
+def _decode_names(names: str) -> Optional[str]:
+    parts = [part for part in re.split(r'<+', names) if part]
+    if not parts:
+        return None
+    return " ".join(''.join(MRZ_TO_CYRILLIC.get(char, '') for char in part) for part in parts)
+
+
+def parse_mrz(text: str) -> Optional[dict]:
+    """
+    Ищет MRZ в тексте и возвращает поля паспорта, если все контрольные
+    цифры сошлись. Иначе None - данные MRZ считаются ненадежными.
+    """
+    # OCR часто вставляет пробелы внутрь строки MRZ
+    compact = re.sub(r'[ \t]', '', text.upper())
+    match = MRZ_LINE2_RE.search(compact)
+    if not match:
+        return None
+
+    line = match.group(0)
+    checks = [
+        (match.group('document'), match.group('document_check')),
+        (match.group('birth'), match.group('birth_check')),
+        (match.group('expiry'), match.group('expiry_check')),
+        (match.group('optional'), match.group('optional_check')),
+        (line[0:10] + line[13:20] + line[21:43], match.group('composite_check')),
+    ]
+    if not all(_is_valid(field, check) for field, check in checks):
+        logger.info("MRZ найдена, но контрольные цифры не сошлись")
+        return None
+
+    document = match.group('document')
+    optional = match.group('optional')
+    birth_date = _format_date(match.group('birth'))
+    issue_date = _format_date(optional[1:7])
+    if not birth_date or not issue_date or not optional[7:13].isdigit():
+        return None
+
+    series = document[:3] + optional[0]
+    result = {
+        'series_number': f"{series[:2]} {series[2:]} {document[3:]}",
+        'birth_date': birth_date,
+        'issue_date': issue_date,
+        'code': f"{optional[7:10]}-{optional[10:13]}",
+        'gender': {'F': 'ЖЕН', 'M': 'МУЖ'}.get(match.group('sex'), 'не распознано'),
+    }
+
+    names_match = MRZ_LINE1_RE.search(compact[:match.start()])
+    full_name = _decode_names(names_match.group('names')) if names_match else None
+    if full_name:
+        result['full_name'] = full_name
+
+    return result
@@ -2,89 +2,331 @@
 import re
 import logging
 from datetime import datetime
+from .mrz import parse_mrz
 
 logger = logging.getLogger(__name__)
 
+NOT_RECOGNIZED = "не распознано"
+
+# Все шаблоны компилируются один раз при импорте модуля
+_WHITESPACE_RE = re.compile(r'\s+')
+# Один проход по тексту: даты, коды подразделения, слова и числа.
+# Слово - последовательность букв/цифр хотя бы с одной кириллической буквой,
+# цифры внутри слова - ошибки OCR (БУДНИК0ВА)
+_TOKEN_RE = re.compile(
+    r'(?P<date>\b\d{2}\.\d{2}\.\d{4}\b)'
+    r'|(?P<code>\b\d{3}-\d{3}\b)'
+    r'|(?P<word>[А-ЯЁA-Z0-9]*[А-ЯЁ][А-ЯЁA-Z0-9]*)'
+    r'|(?P<number>\d+)'
+)
+_ZONE_CODE_RE = re.compile(r'\b(\d{3})\s?-\s?(\d{3})\b')
+# Строки текста для полей, которые занимают несколько строк (место рождения, орган выдачи)
+_LINE_JUNK_RE = re.compile(r'[^А-ЯЁA-Z0-9\n .,()\-<:]+')
+_PHRASE_WORD_RE = re.compile(r'[А-ЯЁA-Z0-9]*[А-ЯЁ][А-ЯЁA-Z0-9]*')
+_BIRTH_PLACE_RE = re.compile(
+    r'^(?:МЕСТ[О0] Р[О0]ЖДЕНИЯ:?\s*)?(?P<place>(?:Г[О0]Р|Г|С|СЕЛО|ПОС|П|ПГТ|ДЕР|Д|СТ-ЦА|СТАНИЦА|АУЛ|Х)\.?\s.+)$'
+)
+_AUTHORITY_RE = re.compile(r'\b(?:ОТДЕЛ\w*|ОУФМС|УФМС|УФИС|ОВД|У?МВД|Г?УВД|ГУ|ТП)\b')
+_DIGIT_RE = re.compile(r'\d')
+# Отдельное число в строке (дата, код) - строка не часть органа выдачи; цифры внутри слов - ошибки OCR
+_NUMBER_WORD_RE = re.compile(r'(?<![А-ЯЁA-Z])\d+(?![А-ЯЁA-Z])')
+_TRAILING_JUNK_RE = re.compile(r'(?:\s+[.,:])+$')
+_AUTHORITY_LABELS = ('ПАСПОРТ ВЫДАН', 'КЕМ ВЫДАН')
+_AUTHORITY_LABEL_RE = re.compile(r'^(?:ПАСПОРТ ВЫДАН|КЕМ ВЫДАН)\s*:?\s*')
+# Строка-продолжение многострочного поля: буквы и знаки без подписей полей; цифры - только внутри слов
+_CONTINUATION_RE = re.compile(r'^(?=.*[А-ЯЁ])(?:[А-ЯЁ .,()\-]|(?<=[А-ЯЁ])\d|\d(?=[А-ЯЁ]))+$')
+_GENDER_RE = re.compile(r'\b(МУЖ|ЖЕН)')
+_PATRONYMIC_RE = re.compile(r'(?:ИЧ|ВНА|ИЧНА)$')
+# Тюркские отчества пишутся двумя словами: "ИЛЬХАМ ОГЛЫ"
+_PATRONYMIC_SUFFIXES = frozenset({'ОГЛЫ', 'КЫЗЫ', 'УЛЫ'})
+_NAME_LABELS = ('ФАМИЛИЯ', 'ИМЯ', 'ОТЧЕСТВО')
+# Подписи полей бланка: с них начинается следующее поле, а не продолжение текущего
+_FIELD_LABEL_WORDS = frozenset({
+    'ФАМИЛИЯ', 'ИМЯ', 'ОТЧЕСТВО', 'ПОЛ', 'ДАТА', 'КОД', 'МЕСТО', 'ЛИЧНАЯ', 'ПАСПОРТ',
+    'КЕМ', 'АДРЕС', 'РОССИЙСКАЯ',
+})
+# Слова бланка и органа выдачи, которые не бывают частью ФИО
+_NOT_NAME_WORDS = frozenset({
+    'РОССИЙСКАЯ', 'ФЕДЕРАЦИЯ', 'ПАСПОРТ', 'ВЫДАН', 'ОТДЕЛ', 'ОТДЕЛОМ', 'ОТДЕЛЕНИЕМ',
+    'УФМС', 'ОУФМС', 'УВД', 'ОВД', 'МВД', 'РОССИИ', 'ПО', 'ГОР', 'РАЙОНЕ', 'РАЙОНА',
+    'РАЙОНОМ', 'КРАЮ', 'КРАЯ', 'ОБЛ', 'ОБЛАСТИ', 'РЕСПУБЛИКИ', 'РЕСПУБЛИКА', 'ДАТА',
+    'ВЫДАЧИ', 'КОД', 'ПОДРАЗДЕЛЕНИЯ', 'ЛИЧНАЯ', 'ПОДПИСЬ', 'ФАМИЛИЯ', 'ИМЯ', 'ОТЧЕСТВО',
+    'ПОЛ', 'МУЖ', 'ЖЕН', 'МЕСТО', 'РОЖДЕНИЯ', 'СЕЛО', 'ПОС', 'АДРЕС', 'КЕМ', 'ГОРОДА',
+})
+
+# Цифры, которые OCR ставит вместо похожих букв (только внутри слов)
+_OCR_DIGIT_TO_LETTER = str.maketrans({
+    '0': 'О', '1': 'I', '3': 'З', '4': 'Ч', '5': 'Б',
+    '6': 'Б', '8': 'В', '9': 'Д'
+})
+_OCR_WORD_FIXES = {'УФИС': 'УФМС'}
+
+
+def _fix_word(word: str) -> str:
+    if not word.isalpha():
+        word = word.translate(_OCR_DIGIT_TO_LETTER)
+    return _OCR_WORD_FIXES.get(word, word)
+
+
+def _fix_phrase(text: str) -> str:
+    """Исправляет ошибки OCR в словах фразы, сохраняя пунктуацию"""
+    if _DIGIT_RE.search(text) or 'УФИС' in text:
+        text = _PHRASE_WORD_RE.sub(lambda match: _fix_word(match.group()), text)
+    if text.endswith((' .', ' ,', ' :')):
+        # Отдельно стоящая точка в конце - мусор OCR, а не сокращение ("ОБЛ.")
+        text = _TRAILING_JUNK_RE.sub('', text)
+    return text.strip(' ,:')
+
+
+def _date_key(value: str) -> str:
+    # ДД.ММ.ГГГГ -> ГГГГММДД: строки сравниваются как даты
+    return value[6:] + value[3:5] + value[:2]
+
+
+class _TokenStream:
+    """Результат однопроходной токенизации текста, общий для всех экстракторов"""
+
+    __slots__ = ('text', 'lines', 'tokens', 'words', 'words_text', 'dates', 'codes')
+
+    def __init__(self, text: str):
+        upper = text.upper()
+        self.text = _WHITESPACE_RE.sub(' ', upper).strip()
+        # Строки без мусора OCR (*, |, кавычки) - одна замена на весь текст
+        self.lines = [' '.join(words) for words in map(str.split, _LINE_JUNK_RE.sub('', upper).split('\n')) if words]
+        self.tokens = []  # (вид, значение) в порядке следования
+        self.words = []
+        self.dates = []
+        self.codes = []
+
+        # findall быстрее finditer: кортеж групп без создания Match объектов
+        for date, code, word, number in _TOKEN_RE.findall(self.text):
+            if word:
+                if not word.isalpha():
+                    word = word.translate(_OCR_DIGIT_TO_LETTER)
+                word = _OCR_WORD_FIXES.get(word, word)
+                self.words.append(word)
+                self.tokens.append(('word', word))
+            elif number:
+                self.tokens.append(('number', number))
+            elif date:
+                self.dates.append(date)
+                self.tokens.append(('date', date))
+            else:
+                self.codes.append(code)
+                self.tokens.append(('code', code))
+
+        self.words_text = ' '.join(self.words)
+
+    def phrase(self, start: int, first_line: str = None) -> str:
+        """Строка start (или first_line вместо нее) и следующие строки-продолжения одной фразой"""
+        parts = [first_line or self.lines[start]]
+        for line in self.lines[start + 1:]:
+            if not _CONTINUATION_RE.match(line) or line.split()[0] in _FIELD_LABEL_WORDS:
+                break
+            parts.append(line)
+        return _fix_phrase(' '.join(parts))
+
+    def number_runs(self):
+        """Группы подряд идущих чисел: '03 11 339404' -> ['03', '11', '339404']"""
+        run = []
+        for kind, value in self.tokens:
+            if kind == 'number':
+                run.append(value)
+                continue
+            if run:
+                yield run
+                run = []
+        if run:
+            yield run
+
+
 class RussianPassportParser:
-    def __init__(self):
-        self.ocr_replacements = {
-            '0': 'О', '1': 'I', '3': 'З', '4': 'Ч', '5': 'Б',
-            '6': 'Б', '8': 'В', '9': 'Д', 'УФИС': 'УФМС'
+    def parse(self, text: str) -> dict:
+        try:
+            logger.debug(f"📄 Получен текст для парсинга:\n{text}")
+
+            # Быстрый путь: MRZ с верными контрольными цифрами надежнее эвристик
+            mrz = parse_mrz(text)
+
+            # Токенизируем текст один раз
+            tokens = _TokenStream(text)
+
+            if mrz:
+                logger.info("✅ Данные взяты из MRZ")
+                extractors = {
+                    'full_name': self._extract_name,
+                    'birth_place': self._extract_birth_place,
+                    'authority': self._extract_authority,
+                }
+                # Эвристики только для полей, которых нет в MRZ
+                result = {field: mrz.get(field) or extract(tokens) for field, extract in extractors.items()}
+                result.update({field: value for field, value in mrz.items() if field not in result})
+                result['mrz_valid'] = True
+                return result
+
+            return {field: extract(tokens) for field, extract in self._extractors().items()}
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка парсинга: {e}")
+            return {'error': str(e)}
+
+    def _extractors(self) -> dict:
+        """Эвристики по полям для текста страницы целиком"""
+        return {
+            'full_name': self._extract_name,
+            'birth_date': self._extract_birth_date,
+            'birth_place': self._extract_birth_place,
+            'series_number': self._extract_series_number,
+            'code': self._extract_code,
+            'issue_date': self._extract_issue_date,
+            'authority': self._extract_authority,
+            'gender': self._extract_gender,
         }
 
-    def parse(self, text: str) -> dict:
+    def parse_zones(self, zones: dict) -> dict:
+        """
+        Парсит текст, распознанный по зонам паспорта. Каждое поле ищется
+        только в своей зоне; общий текст зон разбирается лишь для полей,
+        которых в своей зоне не нашлось (например, рамка найдена неточно).
+        """
         try:
-            logger.info(f"📄 Получен текст для парсинга:\n{text}")
-            
-            # Очищаем текст
-            text = self._clean_text(text)
-            
-            result = {
-                'full_name': self._extract_name(text),
-                'birth_date': self._extract_birth_date(text),
-                'birth_place': self._extract_birth_place(text),
-                'series_number': self._extract_series_number(text),
-                'code': self._extract_code(text),
-                'issue_date': self._extract_issue_date(text),
-                'authority': self._extract_authority(text),
-                'gender': self._extract_gender(text),
-            }
-            
+            issue = _TokenStream(zones.get('issue', ''))
+            personal = _TokenStream(zones.get('personal', ''))
+            mrz = parse_mrz(zones.get('mrz', ''))
+
+            if mrz:
+                logger.info("✅ Данные взяты из MRZ")
+                result = {
+                    'full_name': mrz.get('full_name') or self._extract_name(personal),
+                    'birth_place': self._extract_birth_place(personal),
+                    'authority': self._extract_authority(issue),
+                }
+                result.update({field: value for field, value in mrz.items() if field not in result})
+                result['mrz_valid'] = True
+            else:
+                series = _TokenStream(re.sub(r'\D', '', zones.get('series', '')))
+                # Код подразделения пишется через дефис - это отличает его от дат
+                code_match = _ZONE_CODE_RE.search(issue.text)
+                result = {
+                    'full_name': self._extract_name(personal),
+                    'birth_date': self._extract_birth_date(personal),
+                    'birth_place': self._extract_birth_place(personal),
+                    'series_number': self._extract_series_number(series),
+                    'code': f"{code_match.group(1)}-{code_match.group(2)}" if code_match else self._extract_code(issue),
+                    'issue_date': self._extract_birth_date(issue),  # на странице выдачи одна дата
+                    'authority': self._extract_authority(issue),
+                    'gender': self._extract_gender(personal),
+                }
+
+            missing = [field for field, value in result.items() if value == NOT_RECOGNIZED]
+            if missing:
+                tokens = _TokenStream("\n".join(text for text in zones.values() if text))
+                extractors = self._extractors()
+                for field in missing:
+                    result[field] = extractors[field](tokens)
             return result
-            
+
         except Exception as e:
             logger.error(f"❌ Ошибка парсинга: {e}")
             return {'error': str(e)}
-    
-    def _clean_text(self, text: str) -> str:
-        text = re.sub(r'\s+', ' ', text)
-        text = text.upper().strip()
-        
-        for wrong, correct in self.ocr_replacements.items():
-            text = text.replace(wrong, correct)
-            
-        return text
-    
-    def _extract_name(self, text: str) -> str:
-        # Для тестового паспорта
-        if any(name in text for name in ['БУДНИКОВ', 'ТАТЬЯНА', 'АЛЕКСАНДРОВНА']):
-            return "БУДНИКОВА ТАТЬЯНА АЛЕКСАНДРОВНА"
-        
-        # Поиск трех слов подряд
-        match = re.search(r'([А-Я]{3,})\s+([А-Я]{3,})\s+([А-Я]{3,})', text)
-        return f"{match.group(1)} {match.group(2)} {match.group(3)}" if match else "не распознано"
-    
-    def _extract_birth_date(self, text: str) -> str:
-        dates = re.findall(r'\b(\d{2}\.\d{2}\.\d{4})\b', text)
-        return dates[0] if dates else "не распознано"
-    
-    def _extract_birth_place(self, text: str) -> str:
-        if 'НЕРЮНГРИ' in text:
-            return "ГОР. НЕРЮНГРИ РЕСПУБЛИКИ САХА (ЯКУТИЯ)"
-        return "не распознано"
-    
-    def _extract_series_number(self, text: str) -> str:
-        # Ищем 10 цифр подряд
-        match = re.search(r'(\d{2}\s?\d{2}\s?\d{6})', text.replace(' ', ''))
-        if match:
-            num = match.group(1)
-            return f"{num[:2]} {num[2:4]} {num[4:]}"
-        return "не распознано"
-    
-    def _extract_code(self, text: str) -> str:
-        match = re.search(r'(\d{3}[\s-]\d{3})', text)
-        return match.group(1) if match else "не распознано"
-    
-    def _extract_issue_date(self, text: str) -> str:
-        dates = re.findall(r'\b(\d{2}\.\d{2}\.\d{4})\b', text)
-        return dates[1] if len(dates) > 1 else "не распознано"
-    
-    def _extract_authority(self, text: str) -> str:
-        if any(word in text for word in ['УФМС', 'УФИС', 'ОВД']):
-            return "ОТДЕЛ УФМС РОССИИ ПО КРАСНОДАРСКОМУ КРАЮ В КУРГАНИНСКОМ РАЙОНЕ"
-        return "не распознано"
-    
-    def _extract_gender(self, text: str) -> str:
-        return "ЖЕН" if any(word in text for word in ['ЖЕН', 'F']) else "МУЖ"
-
-PassportParser = RussianPassportParser
\ No newline at end of file
+
+    def parse_mrz_only(self, text: str) -> dict:
+        """Парсит только MRZ; None если контрольные цифры не сошлись"""
+        mrz = parse_mrz(text)
+        if not mrz:
+            return None
+        result = {field: NOT_RECOGNIZED for field in ('full_name', 'birth_place', 'authority')}
+        result.update(mrz)
+        result['mrz_valid'] = True
+        return result
+
+    def _extract_name(self, tokens: _TokenStream) -> str:
+        words = [value for kind, value in tokens.tokens]
+        kinds = [kind for kind, _ in tokens.tokens]
+
+        # 1. Подписи полей: "ФАМИЛИЯ ИВАНОВ ИМЯ ИВАН ОТЧЕСТВО ИВАНОВИЧ"
+        labeled = {}
+        for i, word in enumerate(words[:-1]):
+            if word in _NAME_LABELS and kinds[i + 1] == 'word' and self._is_name_word(words[i + 1]):
+                labeled.setdefault(word, words[i + 1])
+        if 'ФАМИЛИЯ' in labeled and 'ИМЯ' in labeled:
+            return " ".join(labeled[label] for label in _NAME_LABELS if label in labeled)
+
+        # 2. Отчество (-ВИЧ, -ВНА, ... или "ИЛЬХАМ ОГЛЫ") и два слова перед ним
+        for i in range(2, len(words)):
+            if words[i] in _PATRONYMIC_SUFFIXES and i >= 3 and all(
+                    kinds[j] == 'word' and self._is_name_word(words[j]) for j in range(i - 3, i)):
+                return " ".join(words[i - 3:i + 1])
+            if (kinds[i] == 'word' and len(words[i]) >= 5 and _PATRONYMIC_RE.search(words[i])
+                    and self._is_name_word(words[i])
+                    and all(kinds[j] == 'word' and self._is_name_word(words[j]) for j in (i - 2, i - 1))):
+                return " ".join(words[i - 2:i + 1])
+
+        # 3. Три слова подряд, не относящиеся к бланку и органу выдачи
+        run = []
+        for kind, value in tokens.tokens:
+            if kind == 'word' and len(value) >= 3 and self._is_name_word(value):
+                run.append(value)
+                if len(run) == 3:
+                    return " ".join(run)
+            else:
+                run = []
+        return NOT_RECOGNIZED
+
+    @staticmethod
+    def _is_name_word(word: str) -> bool:
+        return len(word) >= 2 and word.isalpha() and word not in _NOT_NAME_WORDS
+
+    def _extract_birth_date(self, tokens: _TokenStream) -> str:
+        # Дата рождения всегда раньше даты выдачи, порядок в тексте зависит от раскладки
+        return min(tokens.dates, key=_date_key) if tokens.dates else NOT_RECOGNIZED
+
+    def _extract_birth_place(self, tokens: _TokenStream) -> str:
+        # Место рождения на странице с личными данными - ниже органа выдачи
+        start, place = None, None
+        for i, line in enumerate(tokens.lines):
+            match = _BIRTH_PLACE_RE.match(line)
+            if match:
+                start, place = i, match.group('place')
+        if start is None:
+            return NOT_RECOGNIZED
+        return tokens.phrase(start, place)
+
+    def _extract_series_number(self, tokens: _TokenStream) -> str:
+        # Ищем 10 цифр подряд (допускаются пробелы: 03 11 339404)
+        for run in tokens.number_runs():
+            digits = ''.join(run)
+            if len(digits) >= 10:
+                return f"{digits[:2]} {digits[2:4]} {digits[4:10]}"
+        return NOT_RECOGNIZED
+
+    def _extract_code(self, tokens: _TokenStream) -> str:
+        if tokens.codes:
+            return tokens.codes[0]
+        for run in tokens.number_runs():
+            for first, second in zip(run, run[1:]):
+                if len(first) == 3 and len(second) == 3:
+                    return f"{first} {second}"
+        return NOT_RECOGNIZED
+
+    def _extract_issue_date(self, tokens: _TokenStream) -> str:
+        if len(tokens.dates) < 2:
+            return NOT_RECOGNIZED
+        return max(tokens.dates, key=_date_key)
+
+    def _extract_authority(self, tokens: _TokenStream) -> str:
+        for i, line in enumerate(tokens.lines):
+            if line.startswith(_AUTHORITY_LABELS):
+                line = _AUTHORITY_LABEL_RE.sub('', line)
+            if not line or _NUMBER_WORD_RE.search(line):
+                continue
+            line = _fix_phrase(line)
+            if _AUTHORITY_RE.search(line):
+                return tokens.phrase(i, line)
+        return NOT_RECOGNIZED
+
+    def _extract_gender(self, tokens: _TokenStream) -> str:
+        match = _GENDER_RE.search(tokens.words_text)
+        return match.group(1) if match else NOT_RECOGNIZED
+
+PassportParser = RussianPassportParser
@@ -0,0 +1,111 @@
+# src/parsers/validation.py
+import re
+from datetime import date, datetime
+from typing import Optional
+
+# Вклад полей в общую оценку разбора (сумма = 1)
+FIELD_WEIGHTS = {
+    'full_name': 0.2,
+    'birth_date': 0.15,
+    'birth_place': 0.05,
+    'series_number': 0.25,
+    'code': 0.15,
+    'issue_date': 0.15,
+    'authority': 0.05,
+}
+
+# Поля, которые дает одна MRZ: места рождения и органа выдачи в ней нет
+MRZ_FIELDS = ('full_name', 'birth_date', 'series_number', 'code', 'issue_date')
+
+# Зона паспорта -> поля, которые из нее берутся (для уверенности OCR по зонам)
+ZONE_FIELDS = {
+    'personal': ('full_name', 'birth_date', 'birth_place'),
+    'series': ('series_number',),
+    'issue': ('code', 'issue_date', 'authority'),
+}
+
+# Средняя уверенность Tesseract, начиная с которой поле не штрафуется
+CONFIDENCE_OK = 70.0
+
+_NAME_RE = re.compile(r'^[А-ЯЁ-]{2,}(?: [А-ЯЁ-]{2,}){1,3}$')
+_SERIES_NUMBER_RE = re.compile(r'^\d{2} ?\d{2} ?\d{6}$')
+_CODE_RE = re.compile(r'^\d{3}-\d{3}$')
+_CODE_WITHOUT_DASH_RE = re.compile(r'^\d{3} \d{3}$')
+# Паспорт РФ выдается с 14 лет
+_MIN_ISSUE_AGE = 14
+
+
+def _parse_date(value) -> Optional[date]:
+    try:
+        return datetime.strptime(value or '', '%d.%m.%Y').date()
+    except ValueError:
+        return None
+
+
+def _add_years(day: date, years: int) -> date:
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:  # 29 февраля
+        return day.replace(year=day.year + years, day=28)
+
+
+def field_validity(result: dict) -> dict:
+    """Проверки формата и здравого смысла: 1 - поле правдоподобно, 0 - нет"""
+    today = date.today()
+    birth = _parse_date(result.get('birth_date'))
+    issue = _parse_date(result.get('issue_date'))
+    if birth and not (date(1900, 1, 1) <= birth <= today):
+        birth = None
+    if issue and not (date(1997, 1, 1) <= issue <= today):  # паспорта нового образца с 1997
+        issue = None
+
+    birth_score = issue_score = 1.0
+    if birth and issue and issue < _add_years(birth, _MIN_ISSUE_AGE):
+        # Одна из дат прочитана неверно, но неизвестно какая
+        birth_score = issue_score = 0.5
+
+    name = result.get('full_name') or ''
+    code = result.get('code') or ''
+    scores = {
+        'full_name': 1.0 if _NAME_RE.match(name) else 0.0,
+        'birth_date': birth_score if birth else 0.0,
+        'issue_date': issue_score if issue else 0.0,
+        'series_number': 1.0 if _SERIES_NUMBER_RE.match(result.get('series_number') or '') else 0.0,
+        'code': 1.0 if _CODE_RE.match(code) else 0.5 if _CODE_WITHOUT_DASH_RE.match(code) else 0.0,
+    }
+    for field in ('birth_place', 'authority'):
+        value = result.get(field) or ''
+        scores[field] = 1.0 if len(value) >= 5 and value != 'не распознано' else 0.0
+    return scores
+
+
+def field_scores(result: dict, zone_confidences: dict = None) -> dict:
+    """
+    Оценка каждого поля 0..1: правдоподобие значения, умноженное на уверенность
+    OCR зоны, из которой поле взято (если она известна). Поля MRZ с верными
+    контрольными цифрами не штрафуются.
+    """
+    scores = field_validity(result)
+    if zone_confidences and not result.get('mrz_valid'):
+        for zone, fields in ZONE_FIELDS.items():
+            confidence = zone_confidences.get(zone)
+            if confidence is None:
+                continue
+            factor = min(1.0, confidence / CONFIDENCE_OK)
+            for field in fields:
+                scores[field] *= factor
+    return scores
+
+
+def parse_score(result: dict, zone_confidences: dict = None, fields=None) -> float:
+    """
+    Общая оценка разбора 0..1; 0 для результата с ошибкой. fields - оценивать
+    только эти поля (веса нормируются): разбор одной MRZ не штрафуется за поля,
+    которых в ней нет.
+    """
+    if not result or 'error' in result:
+        return 0.0
+    scores = field_scores(result, zone_confidences)
+    fields = fields or FIELD_WEIGHTS
+    total = sum(FIELD_WEIGHTS[field] for field in fields)
+    return sum(FIELD_WEIGHTS[field] * scores[field] for field in fields) / total
@@ -0,0 +1,211 @@
+# src/utils/admission.py
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from config import Config
+from src.utils.ocr_executor import OCRQueueFullError
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Меньше - раньше: администратор, затем повтор неудавшейся задачи, затем остальные
+PRIORITY_ADMIN = 0
+PRIORITY_RETRY = 1
+PRIORITY_NORMAL = 2
+
+# Сколько пользователей держать в памяти, прежде чем чистить полные корзины
+_MAX_BUCKETS = 10000
+# Сколько неудавшихся фото помнить для приоритета повтора
+_MAX_RETRY_KEYS = 1000
+# Окно замеров ожидания в очереди для перцентилей
+_WAIT_SAMPLES = 1000
+
+
+class RateLimitedError(Exception):
+    """Пользователь превысил лимит фото"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = math.ceil(retry_after)
+        super().__init__(f"Повторите через {self.retry_after} сек")
+
+
+class AdmissionController:
+    """
+    Допуск задач к OCR: token bucket на каждого пользователя, общий лимит
+    одновременно выполняемых задач и очередь с приоритетами. Проверка
+    admit() синхронная и дешевая - отказ отправляется сразу, до скачивания фото.
+    Место в очереди резервируется в admit() и освобождается в mark_done()/
+    mark_failed(): фото, которые еще скачиваются, тоже занимают место.
+    """
+
+    def __init__(self, max_concurrent: int = None, max_queue: int = None,
+                 rate_per_minute: float = None, burst: int = None, admin_id: str = None):
+        self.max_concurrent = max_concurrent or Config.OCR_MAX_CONCURRENT
+        self.max_queue = Config.OCR_QUEUE_SIZE if max_queue is None else max_queue
+        self.rate = (rate_per_minute or Config.RATE_LIMIT_PER_MINUTE) / 60
+        self.burst = burst or Config.RATE_LIMIT_BURST
+        self.admin_id = str(admin_id or Config.ADMIN_ID)
+        self._buckets = {}  # user_id -> [токены, время пополнения]
+        self._retry_keys = OrderedDict()
+        self._heap = []  # (приоритет, порядковый номер, future)
+        self._seq = itertools.count()
+        self._running = 0
+        self._waiting = 0
+        self._reserved = {}  # ключ задачи -> число зарезервированных мест
+        self._reserved_total = 0
+        # Метрики
+        self.admitted = 0
+        self.rate_limited = 0
+        self.queue_rejected = 0
+        self._wait_times = deque(maxlen=_WAIT_SAMPLES)
+        self.max_wait = 0.0
+
+    def is_admin(self, user_id) -> bool:
+        return str(user_id) == self.admin_id
+
+    def is_full(self) -> bool:
+        return self._reserved_total >= self.max_concurrent + self.max_queue
+
+    def queue_position(self) -> int:
+        """Позиция только что допущенной задачи в очереди (0 - начнется сразу)"""
+        return max(0, self._reserved_total - self.max_concurrent)
+
+    def _take_token(self, user_id) -> float:
+        """Списывает токен; 0 - успешно, иначе сколько секунд ждать следующего"""
+        now = time.monotonic()
+        if len(self._buckets) > _MAX_BUCKETS:
+            self._prune(now)
+        tokens, updated = self._buckets.get(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[user_id] = [tokens, now]
+            return (1 - tokens) / self.rate
+        self._buckets[user_id] = [tokens - 1, now]
+        return 0.0
+
+    def _prune(self, now: float):
+        # Корзина, которая успела наполниться, ничем не отличается от отсутствующей
+        self._buckets = {
+            user_id: bucket for user_id, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * self.rate < self.burst
+        }
+
+    def admit(self, user_id, key: str = None) -> int:
+        """
+        Проверяет лимиты до скачивания фото и возвращает приоритет задачи.
+        Бросает RateLimitedError или OCRQueueFullError.
+        """
+        if self.is_admin(user_id):
+            # Администратор не упирается в лимит, но его задача занимает место
+            self._reserve(key)
+            return PRIORITY_ADMIN
+
+        if self.is_full():
+            self.queue_rejected += 1
+            # Фото, которому не хватило места, при повторной отправке пойдет вперед
+            self._remember_retry(key)
+            raise OCRQueueFullError(f"В очереди уже {self._reserved_total} задач")
+
+        retry_after = self._take_token(user_id)
+        if retry_after:
+            self.rate_limited += 1
+            raise RateLimitedError(retry_after)
+
+        self._reserve(key)
+        return PRIORITY_RETRY if key in self._retry_keys else PRIORITY_NORMAL
+
+    def _reserve(self, key: str):
+        self._reserved[key] = self._reserved.get(key, 0) + 1
+        self._reserved_total += 1
+
+    def _release_reservation(self, key: str):
+        # Повторный вызов для той же задачи (mark_done, затем mark_failed) место не освобождает
+        count = self._reserved.get(key)
+        if not count:
+            return
+        if count == 1:
+            del self._reserved[key]
+        else:
+            self._reserved[key] = count - 1
+        self._reserved_total -= 1
+
+    def _remember_retry(self, key: str):
+        if not key:
+            return
+        self._retry_keys[key] = True
+        self._retry_keys.move_to_end(key)
+        if len(self._retry_keys) > _MAX_RETRY_KEYS:
+            self._retry_keys.popitem(last=False)
+
+    def mark_failed(self, key: str):
+        """Освобождает место задачи и запоминает фото, распознавание которого не удалось"""
+        self._release_reservation(key)
+        self._remember_retry(key)
+
+    def mark_done(self, key: str):
+        """Освобождает место задачи"""
+        self._release_reservation(key)
+        self._retry_keys.pop(key, None)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_NORMAL):
+        """Ждет свободного места в общем лимите; задачи выходят из очереди по приоритету"""
+        started = time.monotonic()
+        if self._running < self.max_concurrent and not self._waiting:
+            self._running += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._heap, (priority, next(self._seq), future))
+            self._waiting += 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Место уже передано этой задаче - отдаем его следующей
+                    self._release()
+                else:
+                    # Отмененный future остается в куче и пропускается при выдаче мест
+                    self._waiting -= 1
+                raise
+
+        self._record_wait(time.monotonic() - started)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        while self._heap:
+            _, _, future = heapq.heappop(self._heap)
+            if future.done():
+                continue
+            # Место переходит следующей задаче, число выполняемых не меняется
+            self._waiting -= 1
+            future.set_result(None)
+            return
+        self._running -= 1
+
+    def _record_wait(self, seconds: float):
+        self.admitted += 1
+        self._wait_times.append(seconds)
+        self.max_wait = max(self.max_wait, seconds)
+        metrics.observe('queue_wait', seconds)
+
+    def stats(self) -> dict:
+        waits = sorted(self._wait_times)
+        return {
+            'running': self._running,
+            'waiting': self._waiting,
+            'reserved': self._reserved_total,
+            'admitted': self.admitted,
+            'rate_limited': self.rate_limited,
+            'queue_rejected': self.queue_rejected,
+            'wait_avg_ms': round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            'wait_p95_ms': round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+            'wait_max_ms': round(self.max_wait * 1000, 1),
+        }
@@ -1,15 +1,31 @@
 import os
+import io
 import csv
 import logging
-from datetime import datetime
+from collections import deque
 from config import Config
+from src.utils.records import CSV_HEADERS, RECORD_KEYS, build_record, record_to_row
+from src.utils.write_behind import WriteBehindWriter
 
 logger = logging.getLogger(__name__)
 
+# Сколько последних записей держать в памяти для /stats
+TAIL_SIZE = 5
+# Блок чтения с конца файла при восстановлении последних записей
+_TAIL_BLOCK = 64 * 1024
+
 class CSVManager:
     def __init__(self):
         self.csv_file = Config.CSV_FILE_PATH
+        self._records_count = 0
+        self._tail = deque(maxlen=TAIL_SIZE)
+        self.writer = WriteBehindWriter(
+            self._write_rows,
+            batch_size=Config.CSV_WRITE_BATCH_SIZE,
+            flush_interval=Config.CSV_FLUSH_INTERVAL
+        )
         self._create_file_if_not_exists()
+        self._load_stats()
     
     def _create_file_if_not_exists(self):
         """Создает CSV файл с заголовками если его нет"""
@@ -17,19 +33,7 @@ class CSVManager:
             if not os.path.exists(self.csv_file):
                 with open(self.csv_file, 'w', newline='', encoding='utf-8') as file:
                     writer = csv.writer(file)
-                    writer.writerow([
-                        'ФИО',
-                        'Дата рождения', 
-                        'Место рождения',
-                        'Серия паспорта',
-                        'Номер паспорта',
-                        'Код подразделения',
-                        'Дата выдачи',
-                        'Кем выдан',
-                        'Username Telegram',
-                        'User ID',
-                        'Дата добавления'
-                    ])
+                    writer.writerow(CSV_HEADERS)
                 logger.info(f"✅ CSV файл создан: {self.csv_file}")
         except Exception as e:
             logger.error(f"❌ Ошибка создания CSV: {e}")
@@ -40,22 +44,13 @@ class CSVManager:
             with open(self.csv_file, 'a', newline='', encoding='utf-8') as file:
                 writer = csv.writer(file)
                 
-                row_data = [
-                    passport_data.get('full_name', ''),
-                    passport_data.get('birth_date', ''),
-                    passport_data.get('birth_place', ''),
-                    passport_data.get('passport_series', ''),
-                    passport_data.get('passport_number', ''),
-                    passport_data.get('passport_code', ''),
-                    passport_data.get('issue_date', ''),
-                    passport_data.get('authority', ''),
-                    user_info.get('username', ''),
-                    str(user_info.get('user_id', '')),
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                ]
+                row_data = record_to_row(build_record(passport_data, user_info))
                 
                 writer.writerow(row_data)
             
+            self._records_count += 1
+            self._tail.append(dict(zip(CSV_HEADERS, row_data)))
+            
             logger.info(f"✅ Данные сохранены в CSV: {passport_data.get('full_name', 'Unknown')}")
             return True
             
@@ -63,6 +58,45 @@ class CSVManager:
             logger.error(f"❌ Ошибка сохранения в CSV: {e}")
             return False
     
+    async def save_passport_data_async(self, passport_data: dict, user_info: dict) -> bool:
+        """Ставит запись в очередь отложенной записи и ждет сброса ее пачки на диск"""
+        try:
+            row_data = record_to_row(build_record(passport_data, user_info))
+            written = await self.writer.put(row_data)
+            
+            # Успех и статистика - только когда пачка действительно записана
+            if not await written:
+                return False
+            self._records_count += 1
+            self._tail.append(dict(zip(CSV_HEADERS, row_data)))
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Ошибка отложенной записи CSV: {e}")
+            return False
+    
+    def _write_rows(self, rows: list):
+        """Записывает пачку строк одной операцией (выполняется в потоке writer)"""
+        buffer = io.StringIO(newline='')
+        csv.writer(buffer).writerows(rows)
+        data = memoryview(buffer.getvalue().encode('utf-8'))
+        # Без буфера Python: при ошибке в файле нет недописанных байт, которые сбросятся позже
+        with open(self.csv_file, 'ab', buffering=0) as file:
+            start = file.tell()
+            try:
+                while data:
+                    data = data[file.write(data):]
+                if Config.CSV_DURABILITY == 'fsync':
+                    os.fsync(file.fileno())
+            except Exception:
+                # Обрезаем частично записанную пачку, чтобы повтор не задвоил строки
+                file.truncate(start)
+                raise
+        logger.info(f"✅ В CSV записано строк: {len(rows)}")
+    
+    async def close(self):
+        await self.writer.close()
+    
     def get_all_data(self) -> list:
         """Возвращает все данные из CSV"""
         try:
@@ -73,6 +107,61 @@ class CSVManager:
             logger.error(f"❌ Ошибка чтения CSV: {e}")
             return []
     
+    def iter_records(self, offset: int = 0):
+        """
+        Потоково отдает записи (dict с ключами RECORD_KEYS), начиная
+        с байтового смещения offset; весь файл в память не читается
+        """
+        with open(self.csv_file, 'rb') as raw:
+            raw.seek(offset)
+            if offset == 0:
+                raw.readline()  # заголовок
+            text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+            for row in csv.reader(text):
+                if row:
+                    yield dict(zip(RECORD_KEYS, row))
+    
+    def get_file_size(self) -> int:
+        return os.path.getsize(self.csv_file) if os.path.exists(self.csv_file) else 0
+    
+    def _load_stats(self):
+        """
+        Один раз при старте: считает записи потоково по блокам
+        и читает последние строки обратным seek от конца файла
+        """
+        try:
+            with open(self.csv_file, 'rb') as file:
+                lines = 0
+                ends_with_newline = True
+                for block in iter(lambda: file.read(1024 * 1024), b''):
+                    lines += block.count(b'\n')
+                    ends_with_newline = block.endswith(b'\n')
+                if not ends_with_newline:
+                    lines += 1
+                
+                # Первая строка - заголовок
+                self._records_count = max(0, lines - 1)
+                
+                size = file.tell()
+                file.seek(max(0, size - _TAIL_BLOCK))
+                tail = file.read().decode('utf-8', errors='replace')
+            
+            # Первая строка блока - заголовок или обрезанная запись
+            tail_lines = tail.splitlines()[1:]
+            
+            rows = csv.reader(io.StringIO('\n'.join(tail_lines[-TAIL_SIZE:])))
+            self._tail.extend(dict(zip(CSV_HEADERS, row)) for row in rows if row)
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения статистики CSV: {e}")
+    
+    def get_records_count(self) -> int:
+        """Число записей без чтения файла"""
+        return self._records_count
+    
+    def get_last_records(self) -> list:
+        """Последние записи без чтения файла"""
+        return list(self._tail)
+    
     def get_csv_file(self) -> str:
         """Возвращает путь к CSV файлу"""
         return self.csv_file if os.path.exists(self.csv_file) else ""
\ No newline at end of file
@@ -1,19 +1,86 @@
 import logging
+from typing import Optional
 from config import Config
 from src.utils.csv_manager import CSVManager
+from src.utils.sqlite_manager import SQLiteManager
+from src.utils.duplicate_index import DuplicateIndex, DuplicateRecordError
+from src.utils.records import build_record
+from src.utils.exporter import filter_records
 
 logger = logging.getLogger(__name__)
 
 class DataManager:
     def __init__(self):
         self.storage_type = Config.DATA_STORAGE_TYPE
-        self.csv_manager = CSVManager()
+        self.storage = self._create_storage()
+        # SQLite проверяет дубликаты уникальными индексами; индекс в памяти нужен только CSV
+        self.duplicate_index = DuplicateIndex(Config.DUPLICATE_INDEX_PATH) if self.storage_type == 'csv' else None
+        self._build_duplicate_index()
+    
+    def _create_storage(self):
+        """Создает менеджер выбранного хранилища; у всех одинаковый интерфейс"""
+        if self.storage_type == 'csv':
+            return CSVManager()
+        if self.storage_type == 'sqlite':
+            return SQLiteManager()
+        logger.error(f"❌ Неподдерживаемый тип хранилища: {self.storage_type}")
+        return None
+    
+    def _build_duplicate_index(self):
+        """Строит индекс дубликатов потоково: со снимка дочитывается только новый хвост файла"""
+        if self.duplicate_index is None:
+            return
+        try:
+            size = self.storage.get_file_size()
+            self.duplicate_index.load_snapshot(size)
+            added = self.duplicate_index.add_many(self.storage.iter_records(self.duplicate_index.offset))
+            self.duplicate_index.save_snapshot(size)
+            logger.info(f"✅ Индекс дубликатов: {len(self.duplicate_index)} ключей (прочитано записей: {added})")
+        except Exception as e:
+            logger.error(f"❌ Ошибка построения индекса дубликатов: {e}")
+    
+    def find_duplicate(self, passport_data: dict, user_info: dict) -> Optional[str]:
+        """Дата добавления уже сохраненного такого же паспорта или None"""
+        record = build_record(passport_data, user_info)
+        if self.duplicate_index is None:
+            return self.storage.find_duplicate(record) if self.storage_type == 'sqlite' else None
+        return self.duplicate_index.find(record)
+    
+    async def reserve_duplicate(self, passport_data: dict, user_info: dict) -> Optional[str]:
+        """
+        Проверка дубликата перед сохранением: дата добавления такого же паспорта
+        или None. Для CSV ключи записи сразу занимаются в индексе - параллельное
+        сохранение того же паспорта увидит дубликат; save_passport_data_async(reserved=True)
+        освобождает их при ошибке. В SQLite гонку решает уникальный индекс при записи.
+        """
+        record = build_record(passport_data, user_info)
+        if self.duplicate_index is not None:
+            return self.duplicate_index.reserve(record)
+        if self.storage_type == 'sqlite':
+            return await self.storage.find_duplicate_async(record)
+        return None
+    
+    @property
+    def can_merge(self) -> bool:
+        # В CSV можно только дописывать, объединение поддерживает SQLite
+        return hasattr(self.storage, 'merge_passport_data_async')
+    
+    async def merge_passport_data_async(self, passport_data: dict, user_info: dict) -> bool:
+        """Дополняет существующую запись недостающими полями"""
+        try:
+            return await self.storage.merge_passport_data_async(passport_data, user_info)
+        except Exception as e:
+            logger.error(f"❌ Ошибка объединения данных: {e}")
+            return False
     
     def save_passport_data(self, passport_data: dict, user_info: dict) -> bool:
         """Сохраняет данные в выбранное хранилище"""
         try:
-            if self.storage_type == 'csv':
-                return self.csv_manager.save_passport_data(passport_data, user_info)
+            if self.storage:
+                success = self.storage.save_passport_data(passport_data, user_info)
+                if success and self.duplicate_index is not None:
+                    self.duplicate_index.add(build_record(passport_data, user_info))
+                return success
             else:
                 logger.error(f"❌ Неподдерживаемый тип хранилища: {self.storage_type}")
                 return False
@@ -22,15 +89,77 @@ class DataManager:
             logger.error(f"❌ Ошибка сохранения данных: {e}")
             return False
     
+    async def save_passport_data_async(self, passport_data: dict, user_info: dict, reserved: bool = False) -> bool:
+        """
+        Сохраняет данные, не блокируя event loop. reserved=True - ключи заняты
+        reserve_duplicate(), дубликаты запрещены: в SQLite при гонке
+        DuplicateRecordError, в CSV при ошибке записи ключи освобождаются.
+        """
+        success = False
+        try:
+            if self.storage_type == 'sqlite':
+                success = await self.storage.save_passport_data_async(passport_data, user_info, unique=reserved)
+            elif self.storage:
+                success = await self.storage.save_passport_data_async(passport_data, user_info)
+            else:
+                logger.error(f"❌ Неподдерживаемый тип хранилища: {self.storage_type}")
+            return success
+            
+        except DuplicateRecordError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения данных: {e}")
+            return False
+        finally:
+            if self.duplicate_index is not None:
+                record = build_record(passport_data, user_info)
+                if success:
+                    self.duplicate_index.add(record)
+                elif reserved:
+                    self.duplicate_index.release(record)
+    
+    def iter_records(self, date_from: str = None, date_to: str = None, user_id: str = None):
+        """
+        Потоково отдает сохраненные записи с фильтрами по дате добавления
+        (date_to не включается) и пользователю. SQLite фильтрует запросом,
+        CSV - генератором при чтении файла.
+        """
+        if self.storage_type == 'sqlite':
+            return self.storage.iter_records(date_from=date_from, date_to=date_to, user_id=user_id)
+        if self.storage_type == 'csv':
+            return filter_records(self.storage.iter_records(), date_from, date_to, user_id)
+        return iter(())
+    
+    async def flush(self):
+        """Дожидается записи на диск всех отложенных строк"""
+        if self.storage_type == 'csv':
+            await self.storage.writer.flush()
+    
+    async def close(self):
+        """Дописывает отложенные записи при остановке бота"""
+        if self.storage:
+            await self.storage.close()
+            if self.storage_type == 'csv':
+                # Все записи уже на диске - снимок индекса можно сохранить со смещением конца файла
+                self.duplicate_index.save_snapshot(self.storage.get_file_size())
+    
     def get_storage_info(self) -> dict:
         """Возвращает информацию о хранилище"""
         if self.storage_type == 'csv':
-            data = self.csv_manager.get_all_data()
+            # Счетчики ведутся CSVManager инкрементально - файл не перечитывается
             return {
                 'type': 'csv',
-                'file_path': self.csv_manager.get_csv_file(),
-                'records_count': len(data),
-                'last_records': data[-5:] if data else []
+                'file_path': self.storage.get_csv_file(),
+                'records_count': self.storage.get_records_count(),
+                'last_records': self.storage.get_last_records(),
+                'write_queue': self.storage.writer.stats()
+            }
+        elif self.storage_type == 'sqlite':
+            return {
+                'type': 'sqlite',
+                'file_path': self.storage.get_db_file(),
+                'records_count': self.storage.get_records_count(),
+                'last_records': self.storage.get_last_records()
             }
         else:
-            return {'type': self.storage_type, 'error': 'Неизвестный тип хранилища'}
\ No newline at end of file
+            return {'type': self.storage_type, 'error': 'Неизвестный тип хранилища'}
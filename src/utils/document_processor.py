@@ -1,46 +1,243 @@
 # src/utils/document_processor.py
 import logging
+import threading
+from config import Config
 
 # Логгер должен быть определен в самом начале
 logger = logging.getLogger(__name__)
 
-# Инициализируем OCR процессор
+# OCR процессор создается лениво: загрузка моделей занимает секунды
+# и не должна выполняться при импорте модуля
 ocr_processor = None
+_ocr_initialized = False
+_ocr_lock = threading.Lock()
 
-try:
-    from .ocr_processor import OCRProcessor
-    ocr_processor = OCRProcessor()
-    logger.info("✅ Используем EasyOCR для распознавания")
-except Exception as e:
-    logger.warning(f"EasyOCR не доступен: {e}")
+
+def _create_ocr_processor():
+    if Config.OCR_ENGINE == 'easyocr':
+        try:
+            from .easyocr_processor import EasyOCRProcessor
+            processor = EasyOCRProcessor()
+            logger.info("✅ Используем EasyOCR для распознавания")
+            return processor
+        except Exception as e:
+            logger.warning(f"EasyOCR не доступен: {e}")
+    
+    try:
+        from .ocr_processor import OCRProcessor
+        processor = OCRProcessor()
+        logger.info("✅ Используем Tesseract (по зонам) для распознавания")
+        return processor
+    except Exception as e:
+        logger.warning(f"Tesseract (по зонам) не доступен: {e}")
+        try:
+            from .tesseract_processor import TesseractOCRProcessor
+            processor = TesseractOCRProcessor()
+            logger.info("✅ Используем Tesseract для распознавания")
+            return processor
+        except Exception as e:
+            logger.error(f"❌ Ни один OCR не доступен: {e}")
+            return None
+
+
+def get_ocr_processor():
+    """Возвращает OCR процессор, инициализируя его при первом обращении"""
+    global ocr_processor, _ocr_initialized
+    if not _ocr_initialized:
+        with _ocr_lock:
+            if not _ocr_initialized:
+                ocr_processor = _create_ocr_processor()
+                _ocr_initialized = True
+    return ocr_processor
+
+
+# Второй, медленный движок каскада: загружается только при первом недостоверном разборе
+fallback_processor = None
+_fallback_initialized = False
+
+
+def _create_fallback_processor():
     try:
-        from .tesseract_processor import TesseractOCRProcessor
-        ocr_processor = TesseractOCRProcessor()
-        logger.info("✅ Используем Tesseract для распознавания")
+        from .easyocr_processor import EasyOCRProcessor
+        processor = EasyOCRProcessor()
+        if processor.reader is None:
+            return None
+        logger.info("✅ EasyOCR подключен для недостоверных разборов")
+        return processor
     except Exception as e:
-        logger.error(f"❌ Ни один OCR не доступен: {e}")
-        ocr_processor = None
+        logger.warning(f"EasyOCR не доступен, каскад отключен: {e}")
+        return None
+
+
+def get_fallback_processor():
+    """EasyOCR для каскада; None если каскад выключен или основной движок и так EasyOCR"""
+    global fallback_processor, _fallback_initialized
+    if not Config.OCR_CASCADE or Config.OCR_ENGINE == 'easyocr':
+        return None
+    if not _fallback_initialized:
+        with _ocr_lock:
+            if not _fallback_initialized:
+                fallback_processor = _create_fallback_processor()
+                _fallback_initialized = True
+    return fallback_processor
+
 
-from ..parsers.passport_parser import PassportParser
+def warm_up() -> bool:
+    """
+    Заранее загружает OCR движок и, если включен каскад, EasyOCR для него -
+    иначе модель грузилась бы на первом недостоверном фото пользователя.
+    Возвращает True если основной движок доступен.
+    """
+    ready = get_ocr_processor() is not None
+    get_fallback_processor()
+    return ready
+
+
+from ..parsers.passport_parser import PassportParser, NOT_RECOGNIZED
+from ..parsers.validation import FIELD_WEIGHTS, MRZ_FIELDS, field_scores, parse_score
+from .image_utils import load_image
+from .metrics import metrics
+
+# Сколько полей должно найтись в зонах; меньше - рамка документа найдена неверно, читаем страницу целиком
+_ZONE_MIN_FIELDS = 4
 
 class DocumentProcessor:
     def __init__(self):
         self.parser = PassportParser()
         
-    def process_passport_image(self, image_path: str):
+    def process_passport_image(self, image_source):
+        """
+        image_source - путь к файлу, байты фото, PIL Image или NumPy массив.
+        Каскад: быстрый движок, и только если разбор недостоверен - EasyOCR.
+        """
+        ocr_processor = get_ocr_processor()
         if not ocr_processor:
             return {'error': 'OCR процессор не инициализирован'}
         
         try:
-            text = ocr_processor.extract_text_from_image(image_path)
-            logger.info(f"📝 Распознано текста: {len(text)} символов")
+            # Декодируем один раз и передаем картинку движкам
+            with metrics.timer('decode'):
+                image = load_image(image_source)
             
-            if "Ошибка" in text or "Текст не распознан" in text:
-                return {'error': text}
+            result, confidences, fields = self._recognize(ocr_processor, image)
+            score = parse_score(result, confidences, fields)
             
-            result = self.parser.parse(text)
+            if score < Config.OCR_CASCADE_THRESHOLD:
+                fallback = get_fallback_processor()
+                if fallback:
+                    logger.info(f"Оценка разбора {score:.2f} ниже порога, распознаем через EasyOCR")
+                    result, score = self._merge_cascade(
+                        result, confidences,
+                        self._parse_text(fallback.extract_text_from_image(image))
+                    )
+            
+            if 'error' not in result:
+                result['confidence'] = round(score, 2)
             return result
             
         except Exception as e:
             logger.error(f"❌ Ошибка обработки документа: {e}")
-            return {'error': str(e)}
\ No newline at end of file
+            return {'error': str(e)}
+    
+    def _recognize(self, ocr_processor, image) -> tuple:
+        """
+        Распознавание основным движком: (результат, уверенность OCR по зонам
+        или None, оцениваемые поля или None - все)
+        """
+        # Самый быстрый путь: дешевый OCR нижней полосы с MRZ
+        if Config.MRZ_FAST_PATH and hasattr(ocr_processor, 'extract_zones'):
+            mrz_text = ocr_processor.extract_zones(image, ['mrz']).get('mrz', '')
+            with metrics.timer('parse'):
+                result = self.parser.parse_mrz_only(mrz_text)
+            if result:
+                result['raw_text'] = mrz_text
+                # Иначе каждый такой разбор ниже порога и уходит в каскад EasyOCR
+                return result, None, MRZ_FIELDS
+            logger.info("MRZ не прошла проверку, распознаем документ полностью")
+        
+        # Распознаем только зоны паспорта, если движок это умеет
+        if Config.OCR_ZONES and hasattr(ocr_processor, 'extract_zones_with_confidence'):
+            zones, confidences = ocr_processor.extract_zones_with_confidence(image)
+            with metrics.timer('parse'):
+                result = self.parser.parse_zones(zones)
+            found = sum(1 for field in FIELD_WEIGHTS if result.get(field, NOT_RECOGNIZED) != NOT_RECOGNIZED)
+            if 'error' not in result and (result.get('mrz_valid') or found >= _ZONE_MIN_FIELDS):
+                result['raw_text'] = "\n".join(text for text in zones.values() if text)
+                return result, confidences, None
+            logger.info(f"В зонах найдено полей: {found}, распознаем страницу целиком")
+        
+        return self._parse_text(ocr_processor.extract_text_from_image(image)), None, None
+    
+    @staticmethod
+    def _merge_cascade(primary: dict, confidences: dict, secondary: dict) -> tuple:
+        """Каждое поле берется из того движка, где оно оценено выше; возвращает (результат, оценка)"""
+        if 'error' in secondary:
+            return primary, parse_score(primary, confidences)
+        if 'error' in primary:
+            return secondary, parse_score(secondary)
+        
+        primary_scores = field_scores(primary, confidences)
+        secondary_scores = field_scores(secondary)
+        merged = dict(primary)
+        for field in FIELD_WEIGHTS:
+            value = secondary.get(field)
+            if value and value != NOT_RECOGNIZED and secondary_scores[field] > primary_scores[field]:
+                merged[field] = value
+                primary_scores[field] = secondary_scores[field]
+        merged['raw_text'] = "\n\n".join(filter(None, [primary.get('raw_text'), secondary.get('raw_text')]))
+        return merged, sum(FIELD_WEIGHTS[field] * primary_scores[field] for field in FIELD_WEIGHTS)
+    
+    def process_passport_images(self, image_sources: list) -> list:
+        """Обрабатывает несколько страниц; пакетно, если движок это умеет"""
+        ocr_processor = get_ocr_processor()
+        if not ocr_processor or not hasattr(ocr_processor, 'extract_text_batch'):
+            return [self.process_passport_image(source) for source in image_sources]
+        
+        try:
+            with metrics.timer('decode'):
+                images = [load_image(source) for source in image_sources]
+            return [self._parse_text(text) for text in ocr_processor.extract_text_batch(images)]
+        except Exception as e:
+            logger.error(f"❌ Ошибка пакетной обработки: {e}")
+            return [{'error': str(e)}] * len(image_sources)
+    
+    def _parse_text(self, text: str) -> dict:
+        logger.info(f"📝 Распознано текста: {len(text)} символов")
+        
+        if "Ошибка" in text or "Текст не распознан" in text:
+            return {'error': text}
+        
+        with metrics.timer('parse'):
+            result = self.parser.parse(text)
+        if 'error' in result:
+            metrics.inc('errors_total', stage='parse')
+        else:
+            # Сырой текст нужен для кеша результатов
+            result['raw_text'] = text
+        return result
+    
+    @staticmethod
+    def merge_results(results: list) -> dict:
+        """
+        Объединяет результаты нескольких страниц одного паспорта:
+        для каждого поля берется первое распознанное значение.
+        Номера нераспознанных страниц (с 1) - в 'failed_pages'.
+        """
+        parsed = [result for result in results if 'error' not in result]
+        if not parsed:
+            return results[0] if results else {'error': 'Нет изображений'}
+        failed_pages = [page for page, result in enumerate(results, 1) if 'error' in result]
+        
+        # MRZ с верными контрольными цифрами - самый надежный источник
+        parsed.sort(key=lambda result: not result.get('mrz_valid'))
+        merged = {}
+        for result in parsed:
+            for field, value in result.items():
+                if field == 'raw_text':
+                    continue
+                if merged.get(field) in (None, "не распознано"):
+                    merged[field] = value
+        merged['raw_text'] = "\n\n".join(result.get('raw_text', '') for result in parsed)
+        if failed_pages:
+            merged['failed_pages'] = failed_pages
+        return merged
@@ -0,0 +1,118 @@
+# src/utils/duplicate_index.py
+import json
+import logging
+import os
+import re
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_NOT_RECOGNIZED = {'', 'не распознано', 'не указано'}
+_SPACES_RE = re.compile(r'\s+')
+
+
+def passport_key(record: dict) -> Optional[str]:
+    """Нормализованные серия+номер: только 10 цифр"""
+    digits = ''.join(
+        ch for ch in record.get('passport_series', '') + record.get('passport_number', '') if ch.isdigit()
+    )
+    return f"pn:{digits}" if len(digits) == 10 else None
+
+
+def person_key(record: dict) -> Optional[str]:
+    """ФИО + дата рождения - для записей без распознанного номера"""
+    name = _SPACES_RE.sub(' ', record.get('full_name', '')).strip().lower()
+    birth_date = record.get('birth_date', '').strip()
+    if name in _NOT_RECOGNIZED or birth_date in _NOT_RECOGNIZED:
+        return None
+    return f"nb:{name.upper().replace('Ё', 'Е')}|{birth_date}"
+
+
+def record_keys(record: dict) -> list:
+    return [key for key in (passport_key(record), person_key(record)) if key]
+
+
+class DuplicateRecordError(Exception):
+    """Такой паспорт уже сохранен (обнаружено при записи)"""
+
+    def __init__(self, added_at: str = ''):
+        self.added_at = added_at
+        super().__init__(f"Запись уже сохранена {added_at}")
+
+
+class DuplicateIndex:
+    """
+    Хеш-индекс сохраненных паспортов: ключ -> дата добавления записи.
+    Проверка дубликата - O(1). Снимок индекса хранится на диске вместе
+    со смещением в файле данных, при старте дочитывается только хвост.
+    """
+
+    def __init__(self, snapshot_path: str = None):
+        self.snapshot_path = snapshot_path
+        self.keys = {}
+        self.offset = 0
+
+    def find(self, record: dict) -> Optional[str]:
+        """Возвращает дату добавления уже сохраненной записи или None"""
+        for key in record_keys(record):
+            if key in self.keys:
+                return self.keys[key]
+        return None
+
+    def add(self, record: dict):
+        for key in record_keys(record):
+            self.keys.setdefault(key, record.get('added_at', ''))
+
+    def reserve(self, record: dict) -> Optional[str]:
+        """
+        Проверка и занятие ключей одним шагом (без await между ними): дата
+        добавления дубликата или None - ключи записи заняты до release()
+        """
+        added_at = self.find(record)
+        if added_at is None:
+            self.add(record)
+        return added_at
+
+    def release(self, record: dict):
+        """Освобождает ключи, занятые reserve(), если запись не сохранилась"""
+        for key in record_keys(record):
+            self.keys.pop(key, None)
+
+    def add_many(self, records: Iterable[dict]) -> int:
+        count = 0
+        for record in records:
+            self.add(record)
+            count += 1
+        return count
+
+    def load_snapshot(self, data_size: int):
+        """Загружает снимок, если он не новее файла данных"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as file:
+                snapshot = json.load(file)
+            # Файл данных урезали или заменили - снимок не годится
+            if snapshot['offset'] > data_size:
+                logger.warning("Снимок индекса дубликатов устарел, строим заново")
+                return
+            self.keys = snapshot['keys']
+            self.offset = snapshot['offset']
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения снимка индекса: {e}")
+            self.keys, self.offset = {}, 0
+
+    def save_snapshot(self, offset: int):
+        if not self.snapshot_path:
+            return
+        try:
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'offset': offset, 'keys': self.keys}, file, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+            self.offset = offset
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения снимка индекса: {e}")
+
+    def __len__(self):
+        return len(self.keys)
@@ -0,0 +1,101 @@
+# src/utils/exporter.py
+import io
+import csv
+import gzip
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from itertools import islice
+from config import Config
+from src.utils.records import CSV_HEADERS, record_to_row
+
+logger = logging.getLogger(__name__)
+
+_DATE_FORMAT = '%Y-%m-%d'
+
+
+def _parse_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, _DATE_FORMAT)
+    except ValueError:
+        raise ValueError(f"Неверная дата: {value}")
+
+
+def parse_export_args(args: list) -> dict:
+    """
+    Разбирает аргументы /export: from=ГГГГ-ММ-ДД to=ГГГГ-ММ-ДД user=ID.
+    Дата 'to' включается целиком. Бросает ValueError при неверном аргументе.
+    """
+    filters = {'date_from': None, 'date_to': None, 'user_id': None}
+    for arg in args:
+        key, sep, value = arg.partition('=')
+        if not sep or not value:
+            raise ValueError(f"Неверный аргумент: {arg}")
+        if key == 'from':
+            filters['date_from'] = _parse_date(value).strftime(_DATE_FORMAT)
+        elif key == 'to':
+            # Верхняя граница исключающая: начало следующего дня
+            day = _parse_date(value) + timedelta(days=1)
+            filters['date_to'] = day.strftime(_DATE_FORMAT)
+        elif key == 'user':
+            if not value.isdigit():
+                raise ValueError(f"Неверный user: {value}")
+            filters['user_id'] = value
+        else:
+            raise ValueError(f"Неизвестный параметр: {key}")
+    return filters
+
+
+def filter_records(records, date_from: str = None, date_to: str = None, user_id: str = None):
+    """Генератор: пропускает только записи из диапазона дат и/или указанного пользователя"""
+    for record in records:
+        added_at = record.get('added_at', '')
+        if date_from and added_at < date_from:
+            continue
+        if date_to and added_at >= date_to:
+            continue
+        if user_id and record.get('user_id') != str(user_id):
+            continue
+        yield record
+
+
+def chunked(iterable, size: int):
+    """Генератор порций по size элементов"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_records_gzip(records, chunk_size: int = None, spool_size: int = None):
+    """
+    Пишет записи в CSV, сжимая gzip на лету, во временный файл, который
+    держится в памяти до spool_size байт и дальше уходит на диск.
+    Память не зависит от числа записей: в работе только одна порция.
+    Возвращает (файл, установленный на начало, число записей).
+    """
+    chunk_size = chunk_size or Config.EXPORT_CHUNK_SIZE
+    output = tempfile.SpooledTemporaryFile(
+        max_size=spool_size or Config.EXPORT_SPOOL_SIZE, dir=Config.TEMP_DIR
+    )
+    exported = 0
+    try:
+        with gzip.GzipFile(fileobj=output, mode='wb') as compressed:
+            text = io.TextIOWrapper(compressed, encoding='utf-8-sig', newline='')
+            writer = csv.writer(text)
+            writer.writerow(CSV_HEADERS)
+            for chunk in chunked(records, chunk_size):
+                writer.writerows(record_to_row(record) for record in chunk)
+                exported += len(chunk)
+            text.flush()
+            # TextIOWrapper закрыл бы и GzipFile, и SpooledTemporaryFile
+            text.detach()
+    except Exception:
+        output.close()
+        raise
+
+    output.seek(0)
+    logger.info(f"✅ Выгружено записей: {exported}")
+    return output, exported
@@ -1,64 +1,166 @@
 import os
+import io
+import csv
+import json
 import logging
+import zipfile
 from datetime import datetime
+from string import Template
+from xml.sax.saxutils import escape
 from config import Config
+from src.utils.records import CSV_HEADERS, build_record, record_to_row
 
 logger = logging.getLogger(__name__)
 
+# Шаблоны компилируются один раз при импорте
+_TEXT_TEMPLATE = Template("\n".join([
+    "=" * 50,
+    "ДАННЫЕ ПАСПОРТА ГРАЖДАНИНА РФ",
+    "=" * 50,
+    "",
+    "ФИО: $full_name",
+    "Дата рождения: $birth_date",
+    "Место рождения: $birth_place",
+    "Серия паспорта: $passport_series",
+    "Номер паспорта: $passport_number",
+    "Код подразделения: $passport_code",
+    "Дата выдачи: $issue_date",
+    "Кем выдан: $authority",
+    "",
+    "=" * 50,
+    "ИНФОРМАЦИЯ О СОХРАНЕНИИ",
+    "=" * 50,
+    "",
+    "Username: $username",
+    "User ID: $user_id",
+    "Дата обработки: $added_at",
+    "",
+    "=" * 50
+]))
+
+_DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+_DOCX_DOCUMENT = Template(
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:body>$paragraphs</w:body></w:document>'
+)
+_DOCX_PARAGRAPH = Template('<w:p><w:r><w:t xml:space="preserve">$text</w:t></w:r></w:p>')
+
+
+def _template_values(record: dict) -> dict:
+    # Пустые поля в документе показываем явно
+    return {key: value or 'не указано' for key, value in record.items()}
+
+
+def render_txt(record: dict) -> bytes:
+    return _TEXT_TEMPLATE.substitute(_template_values(record)).encode('utf-8')
+
+
+def render_csv(record: dict) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADERS)
+    writer.writerow(record_to_row(record))
+    # BOM - чтобы Excel открыл кириллицу без выбора кодировки
+    return buffer.getvalue().encode('utf-8-sig')
+
+
+def render_json(record: dict) -> bytes:
+    return json.dumps(record, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def render_docx(record: dict) -> bytes:
+    """Минимальный DOCX (Office Open XML) собирается в памяти без сторонних библиотек"""
+    text = _TEXT_TEMPLATE.substitute(_template_values(record))
+    paragraphs = "".join(_DOCX_PARAGRAPH.substitute(text=escape(line)) for line in text.split("\n"))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr('[Content_Types].xml', _DOCX_CONTENT_TYPES)
+        docx.writestr('_rels/.rels', _DOCX_RELS)
+        docx.writestr('word/document.xml', _DOCX_DOCUMENT.substitute(paragraphs=paragraphs))
+    return buffer.getvalue()
+
+
+# Формат -> функция отрисовки; новые форматы добавляются через register_renderer
+RENDERERS = {
+    'txt': render_txt,
+    'csv': render_csv,
+    'json': render_json,
+    'docx': render_docx,
+}
+
+
 class FileGenerator:
     def __init__(self):
         self.temp_dir = Config.TEMP_DIR
-    
+        self.renderers = dict(RENDERERS)
+
+    def register_renderer(self, file_format: str, renderer):
+        """Подключает свой формат: renderer(record: dict) -> bytes"""
+        self.renderers[file_format] = renderer
+
+    @property
+    def formats(self) -> list:
+        return list(self.renderers)
+
+    def create_passport_file(self, passport_data: dict, user_info: dict, file_format: str = 'txt'):
+        """
+        Создает файл с данными паспорта в памяти.
+        Возвращает (BytesIO, имя файла) или (None, "") при ошибке.
+        """
+        try:
+            record = build_record(passport_data, user_info)
+            content = self.renderers[file_format](record)
+
+            buffer = io.BytesIO(content)
+            filename = f"passport_data_{user_info.get('user_id', 'unknown')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_format}"
+
+            logger.info(f"✅ Файл {filename} создан в памяти ({len(content)} байт)")
+            return buffer, filename
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка создания файла {file_format}: {e}")
+            return None, ""
+
     def create_passport_text_file(self, passport_data: dict, user_info: dict) -> str:
-        """Создает текстовый файл с данными паспорта"""
+        """Создает текстовый файл с данными паспорта на диске (для скриптов вне бота)"""
         try:
-            # Создаем содержимое файла
-            content = self._generate_file_content(passport_data, user_info)
-            
-            # Создаем имя файла
-            filename = f"passport_data_{user_info.get('user_id', 'unknown')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+            buffer, filename = self.create_passport_file(passport_data, user_info, 'txt')
+            if buffer is None:
+                return ""
             filepath = os.path.join(self.temp_dir, filename)
-            
+
             # Сохраняем файл
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
+            with open(filepath, 'wb') as f:
+                f.write(buffer.getvalue())
+
             logger.info(f"✅ Текстовый файл создан: {filepath}")
             return filepath
-            
+
         except Exception as e:
             logger.error(f"❌ Ошибка создания текстового файла: {e}")
             return ""
-    
+
     def _generate_file_content(self, passport_data: dict, user_info: dict) -> str:
         """Генерирует содержимое текстового файла"""
-        content = [
-            "=" * 50,
-            "ДАННЫЕ ПАСПОРТА ГРАЖДАНИНА РФ",
-            "=" * 50,
-            "",
-            f"ФИО: {passport_data.get('full_name', 'не указано')}",
-            f"Дата рождения: {passport_data.get('birth_date', 'не указано')}",
-            f"Место рождения: {passport_data.get('birth_place', 'не указано')}",
-            f"Серия паспорта: {passport_data.get('passport_series', 'не указано')}",
-            f"Номер паспорта: {passport_data.get('passport_number', 'не указано')}",
-            f"Код подразделения: {passport_data.get('passport_code', 'не указано')}",
-            f"Дата выдачи: {passport_data.get('issue_date', 'не указано')}",
-            f"Кем выдан: {passport_data.get('authority', 'не указано')}",
-            "",
-            "=" * 50,
-            "ИНФОРМАЦИЯ О СОХРАНЕНИИ",
-            "=" * 50,
-            "",
-            f"Username: {user_info.get('username', 'не указан')}",
-            f"User ID: {user_info.get('user_id', 'не указан')}",
-            f"Дата обработки: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            "",
-            "=" * 50
-        ]
-        
-        return "\n".join(content)
-    
+        return render_txt(build_record(passport_data, user_info)).decode('utf-8')
+
     def cleanup_file(self, filepath: str):
         """Удаляет временный файл"""
         try:
@@ -66,4 +168,4 @@ class FileGenerator:
                 os.remove(filepath)
                 logger.info(f"✅ Файл удален: {filepath}")
         except Exception as e:
-            logger.error(f"❌ Ошибка удаления файла: {e}")
\ No newline at end of file
+            logger.error(f"❌ Ошибка удаления файла: {e}")
@@ -1,4 +1,5 @@
 import os
+import io
 import logging
 from uuid import uuid4
 
@@ -17,6 +18,13 @@ async def download_file(file_obj, file_type: str, temp_dir: str) -> str:
     
     return file_path
 
+async def download_file_to_memory(file_obj) -> bytes:
+    """Скачивает файл в память, минуя диск"""
+    file = await file_obj.get_file()
+    buffer = io.BytesIO()
+    await file.download_to_memory(buffer)
+    return buffer.getvalue()
+
 def get_file_extension(file_obj, file_type: str) -> str:
     if file_type == "photo":
         return ".jpg"
@@ -0,0 +1,47 @@
+# src/utils/image_preprocessor.py
+import logging
+import cv2
+import numpy as np
+from config import Config
+from src.utils.image_utils import to_numpy
+
+logger = logging.getLogger(__name__)
+
+# CLAHE объект не зависит от изображения - создаем один раз на процесс
+_clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+
+
+def downscale_gray(image_source, max_side: int = None) -> np.ndarray:
+    """
+    Переводит изображение в grayscale и уменьшает до разрешения,
+    которое реально нужно OCR движку. Сначала уменьшение - все
+    дальнейшие шаги работают с меньшим числом пикселей.
+    """
+    max_side = max_side or Config.OCR_MAX_SIDE
+    array = to_numpy(image_source)
+
+    height, width = array.shape[:2]
+    scale = max_side / max(height, width)
+    if scale < 1.0:
+        array = cv2.resize(array, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    if array.ndim == 3:
+        array = cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
+    return array
+
+
+def enhance(gray: np.ndarray, binarize: bool = True) -> np.ndarray:
+    """Контраст (CLAHE), шумоподавление и адаптивная бинаризация"""
+    gray = _clahe.apply(np.ascontiguousarray(gray))
+    gray = cv2.medianBlur(gray, 3)
+    if binarize:
+        # Адаптивный порог устойчив к неравномерному освещению и бликам
+        gray = cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15
+        )
+    return gray
+
+
+def preprocess_for_ocr(image_source, max_side: int = None, binarize: bool = True) -> np.ndarray:
+    """Полный конвейер подготовки изображения для Tesseract и EasyOCR"""
+    return enhance(downscale_gray(image_source, max_side), binarize=binarize)
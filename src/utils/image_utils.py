@@ -0,0 +1,57 @@
+# src/utils/image_utils.py
+import hashlib
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def load_image(source):
+    """
+    Открывает изображение из пути, байтов, PIL Image или NumPy массива.
+    Декодирование выполняется один раз, дальше по конвейеру передается PIL Image.
+    """
+    from PIL import Image
+
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        image = Image.open(io.BytesIO(source))
+    elif isinstance(source, str):
+        image = Image.open(source)
+    elif hasattr(source, '__array_interface__'):
+        return Image.fromarray(source)
+    else:
+        raise TypeError(f"Неподдерживаемый источник изображения: {type(source).__name__}")
+
+    # Декодируем сразу, чтобы не держать открытым файл/буфер
+    image.load()
+    return image
+
+
+def to_numpy(source):
+    """Возвращает изображение как NumPy массив (RGB или grayscale)"""
+    import numpy as np
+
+    if isinstance(source, np.ndarray):
+        return source
+    image = load_image(source)
+    if image.mode not in ('L', 'RGB'):
+        image = image.convert('RGB')
+    return np.asarray(image)
+
+
+def content_digest(source) -> str:
+    """
+    SHA-256 скачанного файла (байты или путь) без декодирования - фото
+    декодирует только рабочий OCR. Совпадает у байт-в-байт одинаковых копий
+    с разным file_unique_id, но не у разных снимков.
+    Возвращает строку с префиксом 'sha256:' для использования как ключ кеша.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"sha256:{hashlib.sha256(source).hexdigest()}"
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return f"sha256:{digest.hexdigest()}"
@@ -0,0 +1,266 @@
+# src/utils/job_broker.py
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Состояния задачи
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS ocr_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    payload BLOB,
+    meta TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS idx_ocr_jobs_queue ON ocr_jobs (status, priority, created_at);
+CREATE TABLE IF NOT EXISTS ocr_workers (
+    worker TEXT PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+"""
+
+
+def worker_name() -> str:
+    """Имя рабочего процесса для аренды задач: хост и PID"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobBroker(ABC):
+    """
+    Очередь задач OCR между фронтендом бота и рабочими узлами.
+    Фронтенд: enqueue() и get_result(); рабочие: claim(), complete(), fail(), heartbeat().
+    Задача - словарь {'id', 'payload' (байты фото), 'meta', 'attempts'}.
+    Взятая задача арендуется на lease_seconds, heartbeat() рабочего продлевает
+    аренду текущей задачи: если рабочий упал, задача возвращается в очередь. Задачи и
+    результаты, которые никто не забрал за JOB_RESULT_TIMEOUT, удаляются.
+    """
+
+    @abstractmethod
+    def enqueue(self, payload: bytes, meta: dict = None, priority: int = 0) -> str:
+        """Ставит фото в очередь и возвращает id задачи"""
+
+    @abstractmethod
+    def claim(self, worker: str) -> Optional[dict]:
+        """Берет следующую задачу (меньший priority - раньше) или None, если очередь пуста"""
+
+    @abstractmethod
+    def complete(self, job_id: str, result: dict):
+        """Сохраняет результат задачи для фронтенда"""
+
+    @abstractmethod
+    def fail(self, job_id: str, error: str):
+        """Задача не выполнена: снова в очередь, после max_attempts - результат с ошибкой"""
+
+    @abstractmethod
+    def get_result(self, job_id: str) -> Optional[dict]:
+        """Результат готовой задачи (задача при этом удаляется) или None"""
+
+    @abstractmethod
+    def cancel(self, job_id: str):
+        """Удаляет задачу: ответ больше никто не ждет"""
+
+    @abstractmethod
+    def heartbeat(self, worker: str, job_id: str = None):
+        """Рабочий жив; job_id - задача, которую он выполняет сейчас, ее аренда продлевается"""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Число задач по состояниям и живых рабочих"""
+
+    def close(self):
+        pass
+
+
+class SQLiteJobBroker(JobBroker):
+    """
+    Очередь в файле SQLite (WAL). Работает без внешних сервисов: фронтенд
+    и рабочие на одной машине или на общем диске с рабочими блокировками
+    файлов (сетевые ФС вроде NFS этого обычно не гарантируют).
+    """
+
+    def __init__(self, db_path: str = None, lease_seconds: float = None, max_attempts: int = None,
+                 result_ttl: float = None):
+        self.db_path = db_path or Config.JOB_BROKER_PATH
+        self.lease_seconds = lease_seconds or Config.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or Config.JOB_MAX_ATTEMPTS
+        self.result_ttl = result_ttl or Config.JOB_RESULT_TIMEOUT
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA_SQL)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Отдельное соединение на поток - sqlite3 не разделяет их между потоками"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, payload: bytes, meta: dict = None, priority: int = 0) -> str:
+        job_id = uuid.uuid4().hex
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO ocr_jobs (id, status, priority, payload, meta, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, priority, sqlite3.Binary(payload), json.dumps(meta or {}), time.time())
+            )
+        return job_id
+
+    def claim(self, worker: str) -> Optional[dict]:
+        now = time.time()
+        conn = self._connection()
+        # BEGIN IMMEDIATE: выбор и аренда задачи - одна транзакция, два рабочих не возьмут одну задачу
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._sweep(conn, now)
+            self._requeue_expired(conn, now)
+            row = conn.execute(
+                "SELECT id, payload, meta, attempts FROM ocr_jobs WHERE status = ? "
+                "ORDER BY priority, created_at LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE ocr_jobs SET status = ?, worker = ?, attempts = attempts + 1, lease_until = ? "
+                    "WHERE id = ?",
+                    (RUNNING, worker, now + self.lease_seconds, row[0])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if not row:
+            return None
+        return {'id': row[0], 'payload': bytes(row[1]), 'meta': json.loads(row[2]), 'attempts': row[3] + 1}
+
+    def _sweep(self, conn: sqlite3.Connection, now: float):
+        """
+        Задачи, которые фронтенд уже не ждет (перезапуск, падение): фото в
+        очереди и готовые результаты с персональными данными не копятся
+        """
+        swept = conn.execute(
+            "DELETE FROM ocr_jobs WHERE status IN (?, ?) AND created_at < ?",
+            (QUEUED, DONE, now - self.result_ttl)
+        ).rowcount
+        if swept:
+            logger.warning(f"Удалено брошенных задач OCR: {swept}")
+
+    def _requeue_expired(self, conn: sqlite3.Connection, now: float):
+        """Задачи упавших рабочих - обратно в очередь, после max_attempts - ошибка"""
+        expired = conn.execute(
+            "SELECT id, attempts, worker FROM ocr_jobs WHERE status = ? AND lease_until < ?",
+            (RUNNING, now)
+        ).fetchall()
+        for job_id, attempts, worker in expired:
+            self._retry_or_fail(conn, job_id, attempts, f"аренда у {worker} истекла", 'Рабочий OCR не ответил')
+
+    def _retry_or_fail(self, conn: sqlite3.Connection, job_id: str, attempts: int, reason: str, error: str):
+        if attempts >= self.max_attempts:
+            logger.error(f"❌ Задача {job_id} не выполнена за {attempts} попыток ({reason})")
+            result = json.dumps({'result': {'error': error}, 'events': []}, ensure_ascii=False)
+            conn.execute(
+                "UPDATE ocr_jobs SET status = ?, result = ?, payload = NULL WHERE id = ?",
+                (DONE, result, job_id)
+            )
+        else:
+            logger.warning(f"Задача {job_id} возвращена в очередь: {reason}")
+            conn.execute("UPDATE ocr_jobs SET status = ?, worker = NULL WHERE id = ?", (QUEUED, job_id))
+
+    def fail(self, job_id: str, error: str):
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT attempts, worker FROM ocr_jobs WHERE id = ? AND status = ?", (job_id, RUNNING)
+            ).fetchone()
+            if row:
+                self._retry_or_fail(conn, job_id, row[0], f"ошибка у {row[1]}: {error}", 'Ошибка распознавания')
+
+    def complete(self, job_id: str, result: dict):
+        with self._connection() as conn:
+            # Фото больше не нужно - освобождаем место в базе сразу
+            conn.execute(
+                "UPDATE ocr_jobs SET status = ?, result = ?, payload = NULL WHERE id = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), job_id)
+            )
+
+    def get_result(self, job_id: str) -> Optional[dict]:
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT result FROM ocr_jobs WHERE id = ? AND status = ?", (job_id, DONE)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM ocr_jobs WHERE id = ?", (job_id,))
+        return json.loads(row[0])
+
+    def cancel(self, job_id: str):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM ocr_jobs WHERE id = ?", (job_id,))
+
+    def heartbeat(self, worker: str, job_id: str = None):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO ocr_workers (worker, seen_at) VALUES (?, ?) "
+                "ON CONFLICT (worker) DO UPDATE SET seen_at = excluded.seen_at",
+                (worker, now)
+            )
+            # Долгая задача (каскад EasyOCR) не уходит второму рабочему, пока этот жив.
+            # Продлевается только текущая задача: брошенная после ошибки вернется в очередь
+            if job_id is not None:
+                conn.execute(
+                    "UPDATE ocr_jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = ?",
+                    (now + self.lease_seconds, job_id, worker, RUNNING)
+                )
+
+    def stats(self) -> dict:
+        conn = self._connection()
+        with conn:
+            self._sweep(conn, time.time())
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM ocr_jobs GROUP BY status").fetchall())
+        alive_since = time.time() - Config.JOB_WORKER_TIMEOUT
+        workers = conn.execute("SELECT COUNT(*) FROM ocr_workers WHERE seen_at >= ?", (alive_since,)).fetchone()[0]
+        return {
+            'queued': counts.get(QUEUED, 0),
+            'running': counts.get(RUNNING, 0),
+            'done': counts.get(DONE, 0),
+            'workers': workers,
+        }
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Реализации очереди по значению Config.JOB_BROKER
+BROKERS = {
+    'sqlite': SQLiteJobBroker,
+}
+
+
+def get_job_broker() -> JobBroker:
+    broker_class = BROKERS.get(Config.JOB_BROKER)
+    if broker_class is None:
+        raise ValueError(f"Неизвестный JOB_BROKER: {Config.JOB_BROKER} (доступны: {', '.join(BROKERS)})")
+    return broker_class()
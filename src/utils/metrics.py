@@ -0,0 +1,183 @@
+# src/utils/metrics.py
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм, сек: от быстрого разбора до долгого OCR
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Окно последних замеров на этап для перцентилей в /perf
+_RECENT_SAMPLES = 1000
+
+# Этапы обработки фото в порядке конвейера
+STAGES = ('queue_wait', 'download', 'decode', 'preprocess', 'ocr', 'parse', 'storage', 'reply', 'total')
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count', 'recent')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # последняя - +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=_RECENT_SAMPLES)
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+
+class Metrics:
+    """
+    Гистограммы длительности этапов и счетчики ошибок и попаданий в кеш.
+    В рабочих процессах OCR замеры копятся в collect() и возвращаются
+    вместе с результатом - основной процесс добавляет их через replay().
+    """
+
+    def __init__(self):
+        self._histograms = {}  # (этап, движок) -> _Histogram
+        self._counters = {}  # (имя, метки) -> значение
+        self._lock = threading.Lock()
+        self._events = None  # список замеров внутри collect()
+
+    def observe(self, stage: str, seconds: float, engine: str = ''):
+        if self._events is not None:
+            self._events.append(('observe', stage, seconds, engine))
+            return
+        with self._lock:
+            histogram = self._histograms.get((stage, engine))
+            if histogram is None:
+                histogram = self._histograms[(stage, engine)] = _Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name: str, amount: int = 1, **labels):
+        if self._events is not None:
+            self._events.append(('inc', name, amount, labels))
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, stage: str, engine: str = ''):
+        """Замеряет блок; исключение засчитывается в errors_total этапа"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc('errors_total', stage=stage)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started, engine)
+
+    @contextmanager
+    def collect(self):
+        """Собирает замеры блока в список вместо записи (для передачи из рабочего процесса)"""
+        events = []
+        self._events = events
+        try:
+            yield events
+        finally:
+            self._events = None
+
+    def replay(self, events: list):
+        for kind, name, value, extra in events or ():
+            if kind == 'observe':
+                self.observe(name, value, extra)
+            else:
+                self.inc(name, value, **extra)
+
+    def counter(self, name: str, **labels) -> int:
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def summary(self) -> list:
+        """Строки для /perf: этап, движок, число замеров, среднее, p50, p95, максимум (мс)"""
+        rows = []
+        with self._lock:
+            items = sorted(self._histograms.items(), key=lambda item: (
+                STAGES.index(item[0][0]) if item[0][0] in STAGES else len(STAGES), item[0]
+            ))
+            for (stage, engine), histogram in items:
+                recent = sorted(histogram.recent)
+                rows.append({
+                    'stage': stage,
+                    'engine': engine,
+                    'count': histogram.count,
+                    'avg_ms': round(histogram.sum / histogram.count * 1000, 1),
+                    'p50_ms': round(recent[len(recent) // 2] * 1000, 1),
+                    'p95_ms': round(recent[int(len(recent) * 0.95)] * 1000, 1),
+                    'max_ms': round(recent[-1] * 1000, 1),
+                })
+        return rows
+
+    def counters(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+    def render_prometheus(self) -> str:
+        """Текстовый формат Prometheus"""
+        lines = [
+            '# HELP passport_bot_stage_seconds Длительность этапов обработки фото',
+            '# TYPE passport_bot_stage_seconds histogram',
+        ]
+        with self._lock:
+            for (stage, engine), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{stage}"' + (f',engine="{engine}"' if engine else '')
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'passport_bot_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'passport_bot_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'passport_bot_stage_seconds_count{{{labels}}} {histogram.count}')
+
+            declared = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f'passport_bot_{name}'
+                if metric not in declared:
+                    lines.append(f'# TYPE {metric} counter')
+                    declared.add(metric)
+                label_text = ','.join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f'{metric}{{{label_text}}} {value}' if label_text else f'{metric} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Опрос Prometheus раз в несколько секунд не должен засорять лог
+        pass
+
+
+def start_metrics_server(host: str, port: int):
+    """Поднимает /metrics в фоновом потоке; None если порт 0 или занят"""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    except OSError as e:
+        logger.error(f"❌ Не удалось запустить /metrics на {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info(f"✅ Метрики Prometheus: http://{host}:{port}/metrics")
+    return server
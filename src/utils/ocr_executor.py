@@ -0,0 +1,271 @@
+# src/utils/ocr_executor.py
+import asyncio
+import base64
+import logging
+import marshal
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+from src.utils.metrics import metrics
+from src.utils.profiler import profiler, run_profiled
+from src.utils.job_broker import get_job_broker
+
+logger = logging.getLogger(__name__)
+
+# DocumentProcessor живет в каждом рабочем процессе отдельно
+_worker_processor = None
+
+
+class OCRQueueFullError(Exception):
+    """Очередь распознавания переполнена"""
+
+
+def _get_worker_processor():
+    global _worker_processor
+    if _worker_processor is None:
+        from src.utils.document_processor import DocumentProcessor
+        _worker_processor = DocumentProcessor()
+    return _worker_processor
+
+
+def _init_worker():
+    """Инициализатор рабочего процесса: загружает OCR движок"""
+    from src.utils.document_processor import warm_up
+    warm_up()
+    _get_worker_processor()
+
+
+def _warm_up_worker() -> int:
+    return os.getpid()
+
+
+def _process_in_worker(image_source, profile: bool = False) -> tuple:
+    """
+    Выполняется в рабочем процессе: OCR + парсинг.
+    Возвращает (результат, замеры этапов, статистика cProfile или None).
+    """
+    return _run_in_worker(_get_worker_processor().process_passport_image, image_source, profile)
+
+
+def _process_batch_in_worker(image_sources: list, profile: bool = False) -> tuple:
+    """Выполняется в рабочем процессе: пакетный OCR нескольких страниц"""
+    return _run_in_worker(_get_worker_processor().process_passport_images, image_sources, profile)
+
+
+def _run_in_worker(func, argument, profile: bool) -> tuple:
+    snapshot = None
+    with metrics.collect() as events:
+        if profile:
+            result, snapshot = run_profiled(func, argument)
+        else:
+            result = func(argument)
+    return result, events, snapshot
+
+
+class OCRExecutor:
+    """Пул процессов для OCR; лимит очереди и приоритеты - за AdmissionController"""
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or Config.OCR_WORKERS
+        self._pool = None
+        self._active = 0  # задачи в работе + ожидающие
+        self._ready = asyncio.Event()
+        self._warm_up_task = None
+        self.warm_up_seconds = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def pending(self) -> int:
+        return self._active
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: не копируем event loop и потоки бота в рабочие процессы
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+            logger.info(f"✅ OCR пул запущен: {self.max_workers} процессов")
+        return self._pool
+
+    def start_warm_up(self):
+        """Запускает фоновый прогрев пула (вызывать из работающего event loop)"""
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.get_running_loop().create_task(self._warm_up())
+        return self._warm_up_task
+
+    async def _warm_up(self):
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        try:
+            # Каждая задача поднимает процесс, и его инициализатор загружает движок
+            pids = await asyncio.gather(*[
+                loop.run_in_executor(pool, _warm_up_worker) for _ in range(self.max_workers)
+            ])
+            self.warm_up_seconds = time.perf_counter() - started
+            logger.info(
+                f"✅ OCR пул прогрет за {self.warm_up_seconds:.1f} сек "
+                f"({len(set(pids))} процессов)"
+            )
+        except Exception as e:
+            logger.error(f"❌ Ошибка прогрева OCR пула: {e}")
+        finally:
+            # Даже при ошибке не держим фото в очереди вечно
+            self._ready.set()
+
+    async def process(self, image_source) -> dict:
+        """Отправляет фото (байты или путь к файлу) в пул, не блокируя event loop"""
+        self._active += 1
+        try:
+            # Фото, пришедшие во время прогрева, ждут его окончания
+            if not self.is_ready:
+                await self.start_warm_up()
+            return await self._submit(_process_in_worker, image_source)
+        finally:
+            self._active -= 1
+
+    async def process_batch(self, image_sources: list) -> list:
+        """
+        Обрабатывает страницы альбома. EasyOCR распознает их одним пакетом
+        в одном процессе, Tesseract - параллельно по странице на процесс.
+        """
+        if Config.OCR_ENGINE != 'easyocr':
+            return await _gather_pages([self.process(source) for source in image_sources])
+
+        self._active += 1
+        try:
+            if not self.is_ready:
+                await self.start_warm_up()
+            # Пакет профилируется как одна задача
+            return await self._submit(_process_batch_in_worker, image_sources)
+        finally:
+            self._active -= 1
+
+    async def _submit(self, worker_func, argument):
+        profile = profiler.acquire()
+        snapshot = None
+        try:
+            loop = asyncio.get_running_loop()
+            result, events, snapshot = await loop.run_in_executor(
+                self._get_pool(), worker_func, argument, profile
+            )
+            # Замеры рабочего процесса попадают в метрики основного
+            metrics.replay(events)
+            return result
+        finally:
+            if profile:
+                profiler.release(snapshot)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            logger.info("OCR пул остановлен")
+
+
+async def _gather_pages(tasks: list) -> list:
+    """Результаты страниц по порядку; ошибка одной страницы не отменяет остальные"""
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    pages = []
+    for page, result in enumerate(results, 1):
+        if isinstance(result, Exception):
+            logger.error(f"❌ Ошибка распознавания страницы {page}: {result}")
+            result = {'error': f"Страница {page} не распознана"}
+        pages.append(result)
+    return pages
+
+
+def encode_profile(snapshot: dict) -> str:
+    """Статистика cProfile для передачи в JSON (ключи - кортежи, поэтому marshal)"""
+    return base64.b64encode(marshal.dumps(snapshot)).decode('ascii')
+
+
+def decode_profile(data: str) -> dict:
+    return marshal.loads(base64.b64decode(data))
+
+
+def _read_source(image_source) -> bytes:
+    if isinstance(image_source, (bytes, bytearray)):
+        return bytes(image_source)
+    with open(image_source, 'rb') as f:
+        return f.read()
+
+
+class BrokerOCRExecutor:
+    """
+    Фронтенд без OCR: фото уходят в очередь задач (JOB_BROKER), распознают
+    рабочие узлы ocr_worker.py - на этой или других машинах. Интерфейс тот же,
+    что у OCRExecutor; лимиты очереди и приоритеты остаются за AdmissionController.
+    """
+
+    def __init__(self, broker=None):
+        self.broker = broker or get_job_broker()
+        self.poll_interval = Config.JOB_POLL_INTERVAL
+        self.result_timeout = Config.JOB_RESULT_TIMEOUT
+        self._active = 0
+
+    @property
+    def is_ready(self) -> bool:
+        # Модели грузят рабочие узлы; фронтенд готов сразу
+        return True
+
+    @property
+    def pending(self) -> int:
+        return self._active
+
+    def start_warm_up(self):
+        logger.info(f"✅ OCR через очередь задач: {Config.JOB_BROKER}")
+
+    async def process(self, image_source) -> dict:
+        """Ставит фото в очередь и ждет результат рабочего узла"""
+        payload = await asyncio.to_thread(_read_source, image_source)
+        profile = profiler.acquire()
+        snapshot = None
+        self._active += 1
+        job_id = None
+        try:
+            job_id = await asyncio.to_thread(self.broker.enqueue, payload, {'profile': profile})
+            deadline = time.monotonic() + self.result_timeout
+            while time.monotonic() < deadline:
+                reply = await asyncio.to_thread(self.broker.get_result, job_id)
+                if reply is not None:
+                    job_id = None
+                    metrics.replay(reply.get('events'))
+                    if reply.get('profile'):
+                        snapshot = decode_profile(reply['profile'])
+                    return reply['result']
+                await asyncio.sleep(self.poll_interval)
+            logger.error(f"❌ Задача {job_id} не выполнена за {self.result_timeout} сек")
+            metrics.inc('errors_total', stage='queue_wait')
+            return {'error': 'Рабочие OCR не ответили, попробуйте позже'}
+        finally:
+            self._active -= 1
+            if job_id is not None:
+                # Ответ никто не ждет - задачу не нужно выполнять
+                await asyncio.to_thread(self.broker.cancel, job_id)
+            if profile:
+                profiler.release(snapshot)
+
+    async def process_batch(self, image_sources: list) -> list:
+        """Страницы альбома - отдельные задачи, их разбирают свободные рабочие"""
+        return await _gather_pages([self.process(source) for source in image_sources])
+
+    async def stats(self) -> dict:
+        return await asyncio.to_thread(self.broker.stats)
+
+    def shutdown(self):
+        self.broker.close()
+
+
+def create_ocr_executor():
+    """OCRExecutor (локальный пул) или BrokerOCRExecutor по Config.OCR_BACKEND"""
+    if Config.OCR_BACKEND == 'broker':
+        return BrokerOCRExecutor()
+    return OCRExecutor()
@@ -1,6 +1,12 @@
 # src/utils/ocr_processor.py
 import logging
 import sys
+import time
+import numpy as np
+from src.utils.image_utils import load_image
+from src.utils.metrics import metrics
+from src.utils.image_preprocessor import downscale_gray, enhance, preprocess_for_ocr
+from src.utils.passport_layout import PASSPORT_ZONES, crop_zones, tesseract_config
 
 logger = logging.getLogger(__name__)
 
@@ -10,57 +16,41 @@ class OCRProcessor:
         
         try:
             import pytesseract
-            from PIL import Image, ImageEnhance, ImageFilter
+            from PIL import Image
             self.pytesseract = pytesseract
             self.Image = Image
-            self.ImageEnhance = ImageEnhance
-            self.ImageFilter = ImageFilter
             logger.info("✅ Tesseract инициализирован")
         except ImportError as e:
             logger.error(f"❌ Tesseract не установлен: {e}")
             self.ocr_type = "None"
 
-    def _preprocess_image(self, image_path: str):
+    def _preprocess_image(self, image_source):
         """Улучшает изображение для лучшего распознавания"""
         try:
-            # Открываем изображение
-            image = self.Image.open(image_path)
-            
-            # Конвертируем в grayscale
-            if image.mode != 'L':
-                image = image.convert('L')
-            
-            # Увеличиваем контраст
-            enhancer = self.ImageEnhance.Contrast(image)
-            image = enhancer.enhance(2.0)  # Увеличиваем контраст
-            
-            # Увеличиваем резкость
-            enhancer = self.ImageEnhance.Sharpness(image)
-            image = enhancer.enhance(2.0)
-            
-            # Применяем легкое размытие для уменьшения шума
-            image = image.filter(self.ImageFilter.MedianFilter())
-            
-            return image
+            # Один проход OpenCV: уменьшение, grayscale, CLAHE, шумоподавление, бинаризация
+            return self.Image.fromarray(preprocess_for_ocr(image_source))
             
         except Exception as e:
             logger.error(f"❌ Ошибка обработки изображения: {e}")
             # Возвращаем оригинальное изображение если обработка не удалась
-            return self.Image.open(image_path)
+            return load_image(image_source)
 
-    def extract_text_from_image(self, image_path: str):
+    def extract_text_from_image(self, image_source):
+        """Распознает текст; image_source - путь, байты, PIL Image или NumPy массив"""
         if self.ocr_type == "None":
             return "Ошибка: Tesseract не установлен. Установите: pip install pytesseract pillow && brew install tesseract tesseract-lang"
         
         try:
             # Обрабатываем изображение
-            processed_image = self._preprocess_image(image_path)
+            with metrics.timer('preprocess'):
+                processed_image = self._preprocess_image(image_source)
             
             # Настройки для лучшего распознавания русских паспортов
             custom_config = r'--oem 3 --psm 6 -l rus+eng'
             
             # Извлекаем текст
-            text = self.pytesseract.image_to_string(processed_image, config=custom_config)
+            with metrics.timer('ocr', 'tesseract'):
+                text = self.pytesseract.image_to_string(processed_image, config=custom_config)
             
             logger.info(f"📝 Tesseract распознал текст: {len(text)} символов")
             
@@ -72,4 +62,62 @@ class OCRProcessor:
                 
         except Exception as e:
             logger.error(f"❌ Ошибка Tesseract: {e}")
-            return f"Ошибка распознавания: {e}"
\ No newline at end of file
+            return f"Ошибка распознавания: {e}"
+
+    def _image_to_text(self, image, config: str) -> tuple:
+        """Текст и средняя уверенность Tesseract (0-100) за один вызов image_to_data"""
+        data = self.pytesseract.image_to_data(
+            image, config=config, output_type=self.pytesseract.Output.DICT
+        )
+        lines = {}
+        confidences = []
+        for i, word in enumerate(data['text']):
+            if not word.strip():
+                continue
+            confidences.append(float(data['conf'][i]))
+            line = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(line, []).append(word)
+        text = "\n".join(" ".join(words) for words in lines.values())
+        return text, (sum(confidences) / len(confidences) if confidences else 0.0)
+
+    def extract_zones(self, image_source, zone_names: list = None) -> dict:
+        """
+        Распознает только известные зоны паспорта (или перечисленные в zone_names),
+        каждую со своим режимом сегментации и белым списком символов
+        """
+        return self.extract_zones_with_confidence(image_source, zone_names)[0]
+
+    def extract_zones_with_confidence(self, image_source, zone_names: list = None) -> tuple:
+        """Как extract_zones, плюс средняя уверенность OCR по каждой зоне: (зоны, уверенности)"""
+        if self.ocr_type == "None":
+            return {}, {}
+        
+        zones = {}
+        confidences = {}
+        started = time.perf_counter()
+        # Уменьшаем один раз, рамку ищем по grayscale, улучшаем только вырезки
+        image = self.Image.fromarray(downscale_gray(image_source))
+        zones_spec = {name: PASSPORT_ZONES[name] for name in zone_names} if zone_names else None
+        crops = crop_zones(image, zones_spec)
+        # Подготовка и OCR зон чередуются - время каждого этапа суммируется по зонам
+        preprocess_seconds = time.perf_counter() - started
+        ocr_seconds = 0.0
+        for name, (crop, spec) in crops.items():
+            try:
+                started = time.perf_counter()
+                processed = enhance(np.asarray(crop))
+                enhanced = time.perf_counter()
+                preprocess_seconds += enhanced - started
+                zones[name], confidences[name] = self._image_to_text(processed, tesseract_config(spec))
+                ocr_seconds += time.perf_counter() - enhanced
+            except Exception as e:
+                logger.error(f"❌ Ошибка Tesseract в зоне {name}: {e}")
+                metrics.inc('errors_total', stage='ocr')
+                zones[name], confidences[name] = "", 0.0
+        metrics.observe('preprocess', preprocess_seconds)
+        metrics.observe('ocr', ocr_seconds, 'tesseract')
+        
+        logger.info(f"📝 Tesseract распознал зоны: " + ", ".join(
+            f"{name}={len(text)} ({confidences[name]:.0f}%)" for name, text in zones.items()
+        ))
+        return zones, confidences
@@ -0,0 +1,91 @@
+# src/utils/passport_layout.py
+import logging
+
+logger = logging.getLogger(__name__)
+
+DIGITS = '0123456789'
+MRZ_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789<'
+
+# Зоны разворота паспорта РФ в долях от рамки документа: (x0, y0, x1, y1).
+# Только полосы с полями: верхняя страница - кем и когда выдан (без подписи
+# и печати), нижняя - личные данные (без фото) и MRZ; серия и номер
+# напечатаны вертикально вдоль правого края дважды - читаем верхнюю копию.
+# Вместе ~54% площади документа.
+PASSPORT_ZONES = {
+    'issue': {
+        'box': (0.04, 0.03, 0.90, 0.30),
+        'psm': 6, 'lang': 'rus', 'whitelist': None, 'rotate': 0
+    },
+    'personal': {
+        'box': (0.30, 0.52, 0.92, 0.78),
+        'psm': 6, 'lang': 'rus', 'whitelist': None, 'rotate': 0
+    },
+    'series': {
+        'box': (0.90, 0.03, 1.00, 0.40),
+        'psm': 7, 'lang': 'eng', 'whitelist': DIGITS, 'rotate': 90
+    },
+    'mrz': {
+        'box': (0.02, 0.86, 0.98, 0.97),
+        'psm': 6, 'lang': 'eng', 'whitelist': MRZ_CHARS, 'rotate': 0
+    },
+}
+
+
+def find_document_box(image) -> tuple:
+    """
+    Ищет рамку документа на фото (самый крупный контур).
+    Если OpenCV недоступен или рамка не найдена - весь кадр.
+    """
+    width, height = image.size
+    full_box = (0, 0, width, height)
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        return full_box
+
+    try:
+        # Ищем контур на уменьшенной копии - рамке точность не нужна
+        scale = min(1.0, 800 / max(width, height))
+        small = image.convert('L').resize((max(1, int(width * scale)), max(1, int(height * scale))))
+        gray = cv2.GaussianBlur(np.asarray(small), (5, 5), 0)
+        edges = cv2.dilate(cv2.Canny(gray, 50, 150), None, iterations=2)
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return full_box
+
+        x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+        # Слишком маленький контур - скорее всего не документ
+        if w * h < 0.3 * small.size[0] * small.size[1]:
+            return full_box
+        return (int(x / scale), int(y / scale), int((x + w) / scale), int((y + h) / scale))
+    except Exception as e:
+        logger.warning(f"Не удалось найти рамку документа: {e}")
+        return full_box
+
+
+def crop_zones(image, zones: dict = None) -> dict:
+    """Возвращает {имя_зоны: (вырезка PIL, параметры зоны)}"""
+    zones = zones or PASSPORT_ZONES
+    left, top, right, bottom = find_document_box(image)
+    doc_width, doc_height = right - left, bottom - top
+
+    crops = {}
+    for name, spec in zones.items():
+        x0, y0, x1, y1 = spec['box']
+        crop = image.crop((
+            left + int(x0 * doc_width), top + int(y0 * doc_height),
+            left + int(x1 * doc_width), top + int(y1 * doc_height)
+        ))
+        if spec['rotate']:
+            crop = crop.rotate(spec['rotate'], expand=True)
+        crops[name] = (crop, spec)
+    return crops
+
+
+def tesseract_config(spec: dict) -> str:
+    """Собирает конфиг Tesseract для зоны: режим сегментации и белый список символов"""
+    config = f"--oem 3 --psm {spec['psm']} -l {spec['lang']}"
+    if spec['whitelist']:
+        config += f" -c tessedit_char_whitelist={spec['whitelist']}"
+    return config
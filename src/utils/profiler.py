@@ -0,0 +1,178 @@
+# src/utils/profiler.py
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+from datetime import datetime
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк топа по суммарному времени отправлять текстом
+_SUMMARY_LINES = 15
+
+
+class _Snapshot:
+    """Обертка над словарем статистики cProfile для pstats.Stats.add()"""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def run_profiled(func, *args):
+    """Выполняется в рабочем процессе: (результат func, статистика cProfile)"""
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        result = func(*args)
+    finally:
+        profile.disable()
+    profile.create_stats()
+    return result, profile.stats
+
+
+class ProfileSession:
+    """Профилирование следующих N задач OCR или всех задач, начатых за окно времени"""
+
+    def __init__(self, jobs: int = None, seconds: float = None):
+        self.jobs_left = jobs
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.started_at = datetime.now()
+        self.in_flight = 0
+        self.profiled = 0
+        self.stopped = False
+        self.stats = None
+
+    @property
+    def accepting(self) -> bool:
+        if self.stopped:
+            return False
+        if self.deadline is not None:
+            return time.monotonic() < self.deadline
+        return self.jobs_left > 0
+
+    @property
+    def done(self) -> bool:
+        return not self.accepting and not self.in_flight
+
+    def acquire(self) -> bool:
+        if not self.accepting:
+            return False
+        if self.deadline is None:
+            self.jobs_left -= 1
+        self.in_flight += 1
+        return True
+
+    def release(self, snapshot: dict = None):
+        self.in_flight -= 1
+        if not snapshot:
+            return
+        self.profiled += 1
+        if self.stats is None:
+            self.stats = pstats.Stats(_Snapshot(snapshot))
+        else:
+            self.stats.add(_Snapshot(snapshot))
+
+    def describe(self) -> str:
+        if self.deadline is not None:
+            left = max(0, self.deadline - time.monotonic())
+            return f"окно, осталось {left:.0f} сек, профилировано задач: {self.profiled}"
+        return f"осталось задач: {self.jobs_left}, профилировано: {self.profiled}"
+
+
+class PipelineProfiler:
+    """
+    Включает cProfile в рабочих процессах OCR без перезапуска бота.
+    Статистика задач объединяется в основном процессе; по завершении
+    сессии вызывается on_complete(путь к .pstats или None, текстовый топ
+    функций, число профилированных задач, текст ошибки записи или None).
+    """
+
+    def __init__(self):
+        self.session = None
+        self._on_complete = None
+        self._timer = None
+        self._tasks = set()
+
+    @property
+    def active(self) -> bool:
+        return self.session is not None
+
+    def start(self, on_complete, jobs: int = None, seconds: float = None) -> ProfileSession:
+        """Запускает сессию; ValueError если уже идет другая или лимиты превышены"""
+        if self.session is not None:
+            raise ValueError(f"Профилирование уже идет: {self.session.describe()}")
+        # seconds=0 - тоже окно (неверное), а не сессия по числу задач
+        if seconds is not None:
+            if not 1 <= seconds <= Config.PROFILE_MAX_SECONDS:
+                raise ValueError(f"Окно должно быть от 1 до {Config.PROFILE_MAX_SECONDS} сек")
+        elif not jobs or not 0 < jobs <= Config.PROFILE_MAX_JOBS:
+            raise ValueError(f"Число задач должно быть от 1 до {Config.PROFILE_MAX_JOBS}")
+
+        self.session = ProfileSession(jobs=None if seconds is not None else jobs, seconds=seconds)
+        self._on_complete = on_complete
+        if seconds:
+            self._timer = asyncio.get_running_loop().call_later(seconds, self._maybe_finish)
+        logger.info(f"🔬 Профилирование OCR включено: {self.session.describe()}")
+        return self.session
+
+    def stop(self):
+        """Больше не профилировать; уже начатые задачи дописываются в результат"""
+        if self.session is not None:
+            self.session.stopped = True
+            self._maybe_finish()
+
+    def acquire(self) -> bool:
+        """Вызывается перед отправкой задачи в пул: профилировать ли ее"""
+        return self.session is not None and self.session.acquire()
+
+    def release(self, snapshot: dict = None):
+        """Вызывается по завершении профилированной задачи (snapshot=None при ошибке)"""
+        if self.session is None:
+            return
+        self.session.release(snapshot)
+        self._maybe_finish()
+
+    def _maybe_finish(self):
+        session = self.session
+        if session is None or not session.done:
+            return
+        self.session = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        on_complete, self._on_complete = self._on_complete, None
+        error = None
+        try:
+            path, summary = self._dump(session)
+        except Exception as e:
+            # Вызывается из задачи OCR: ошибка записи профиля не должна сорвать распознавание
+            logger.error(f"❌ Не удалось сохранить профиль: {e}")
+            path, summary, error = None, "", str(e)
+        logger.info(f"🔬 Профилирование OCR завершено: задач {session.profiled}")
+        task = asyncio.get_running_loop().create_task(on_complete(path, summary, session.profiled, error))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def _dump(session: ProfileSession) -> tuple:
+        """Пишет объединенную статистику в файл .pstats; (путь или None, текстовый топ)"""
+        if session.stats is None:
+            return None, ""
+        path = os.path.join(
+            Config.TEMP_DIR, f"ocr_profile_{session.started_at.strftime('%Y%m%d_%H%M%S')}.pstats"
+        )
+        session.stats.dump_stats(path)
+        buffer = io.StringIO()
+        session.stats.stream = buffer
+        session.stats.strip_dirs().sort_stats('cumulative').print_stats(_SUMMARY_LINES)
+        return path, buffer.getvalue()
+
+
+profiler = PipelineProfiler()
@@ -0,0 +1,61 @@
+# src/utils/records.py
+from datetime import datetime
+
+# Колонки записи о паспорте: (ключ в БД, заголовок CSV)
+RECORD_COLUMNS = [
+    ('full_name', 'ФИО'),
+    ('birth_date', 'Дата рождения'),
+    ('birth_place', 'Место рождения'),
+    ('passport_series', 'Серия паспорта'),
+    ('passport_number', 'Номер паспорта'),
+    ('passport_code', 'Код подразделения'),
+    ('issue_date', 'Дата выдачи'),
+    ('authority', 'Кем выдан'),
+    ('username', 'Username Telegram'),
+    ('user_id', 'User ID'),
+    ('added_at', 'Дата добавления'),
+]
+RECORD_KEYS = [key for key, _ in RECORD_COLUMNS]
+CSV_HEADERS = [header for _, header in RECORD_COLUMNS]
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def split_series_number(passport_data: dict) -> tuple:
+    """
+    Парсер отдает 'series_number' ('03 11 339404'), хранилище - серию и номер
+    отдельно. Поддерживаются оба варианта.
+    """
+    series = passport_data.get('passport_series', '')
+    number = passport_data.get('passport_number', '')
+    if not series and not number:
+        digits = ''.join(ch for ch in passport_data.get('series_number', '') if ch.isdigit())
+        if len(digits) == 10:
+            series, number = f"{digits[:2]} {digits[2:4]}", digits[4:]
+    return series, number
+
+
+def build_record(passport_data: dict, user_info: dict) -> dict:
+    """Приводит результат парсинга и данные пользователя к записи хранилища"""
+    series, number = split_series_number(passport_data)
+    return {
+        'full_name': passport_data.get('full_name', ''),
+        'birth_date': passport_data.get('birth_date', ''),
+        'birth_place': passport_data.get('birth_place', ''),
+        'passport_series': series,
+        'passport_number': number,
+        'passport_code': passport_data.get('passport_code') or passport_data.get('code', ''),
+        'issue_date': passport_data.get('issue_date', ''),
+        'authority': passport_data.get('authority', ''),
+        'username': user_info.get('username', ''),
+        'user_id': str(user_info.get('user_id', '')),
+        'added_at': datetime.now().strftime(DATETIME_FORMAT),
+    }
+
+
+def record_to_row(record: dict) -> list:
+    return [record.get(key, '') for key in RECORD_KEYS]
+
+
+def record_to_csv_dict(record: dict) -> dict:
+    """Запись с заголовками CSV - формат, который ожидает /stats"""
+    return {header: record.get(key, '') for key, header in RECORD_COLUMNS}
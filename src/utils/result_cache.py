@@ -0,0 +1,114 @@
+# src/utils/result_cache.py
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    Постоянный кеш результатов OCR/парсинга.
+    Ключи - file_unique_id из Telegram и SHA-256 содержимого файла.
+    Вытеснение: LRU по времени последнего обращения + TTL.
+    """
+
+    def __init__(self, db_path: str = None, max_entries: int = None, ttl_seconds: int = None):
+        self.db_path = db_path or Config.RESULT_CACHE_PATH
+        self.max_entries = max_entries or Config.RESULT_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or Config.RESULT_CACHE_TTL
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._create_table()
+
+    def _create_table(self):
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ocr_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    raw_text TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ocr_cache_accessed ON ocr_cache (accessed_at)"
+            )
+
+    def get(self, key: Optional[str]) -> Optional[dict]:
+        """Возвращает сохраненный результат парсинга или None"""
+        if not key:
+            return None
+        try:
+            now = time.time()
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT raw_text, result, created_at FROM ocr_cache WHERE cache_key = ?",
+                    (key,)
+                ).fetchone()
+                if row and now - row[2] > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM ocr_cache WHERE cache_key = ?", (key,))
+                    row = None
+                if row:
+                    self._conn.execute(
+                        "UPDATE ocr_cache SET accessed_at = ? WHERE cache_key = ?", (now, key)
+                    )
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения кеша: {e}")
+            row = None
+
+        if not row:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        result = json.loads(row[1])
+        result['raw_text'] = row[0]
+        return result
+
+    def put(self, keys: Iterable[Optional[str]], result: dict):
+        """Сохраняет результат под всеми переданными ключами"""
+        keys = [key for key in keys if key]
+        if not keys or 'error' in result:
+            return
+        try:
+            now = time.time()
+            payload = {k: v for k, v in result.items() if k != 'raw_text'}
+            rows = [
+                (key, result.get('raw_text', ''), json.dumps(payload, ensure_ascii=False), now, now)
+                for key in keys
+            ]
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO ocr_cache VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._evict(now)
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи в кеш: {e}")
+
+    def _evict(self, now: float):
+        self._conn.execute(
+            "DELETE FROM ocr_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        self._conn.execute("""
+            DELETE FROM ocr_cache WHERE cache_key IN (
+                SELECT cache_key FROM ocr_cache
+                ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'size': size}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,157 @@
+# src/utils/session_store.py
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Поля результата, которые нужны кнопкам (их читает build_record); raw_text и прочее не храним
+SESSION_FIELDS = (
+    'full_name', 'birth_date', 'birth_place', 'series_number', 'passport_series', 'passport_number',
+    'code', 'passport_code', 'issue_date', 'authority', 'error',
+)
+
+
+class SessionStore:
+    """
+    Последний результат распознавания каждого пользователя - ждет кнопок
+    "Сохранить в базу" / "Скачать файл". Запись - словарь
+    {'passport_data', 'user_info'} по user_id.
+    В памяти - не больше memory_entries записей (LRU), у каждой записи TTL.
+    С db_path записи дублируются в SQLite: память не растет с числом
+    пользователей, а ожидающие результаты переживают перезапуск бота.
+    Из event loop вызывать put_async()/get_async() - запросы к SQLite идут в потоке.
+    """
+
+    def __init__(self, db_path: str = None, ttl_seconds: int = None,
+                 max_entries: int = None, memory_entries: int = None):
+        self.db_path = Config.SESSION_STORE_PATH if db_path is None else db_path
+        self.ttl_seconds = ttl_seconds or Config.SESSION_TTL
+        self.max_entries = max_entries or Config.SESSION_MAX_ENTRIES
+        self.memory_entries = memory_entries or Config.SESSION_MEMORY_ENTRIES
+        self._memory = OrderedDict()  # user_id -> (запись, created_at)
+        self._lock = threading.Lock()
+        self._conn = None
+        if self.db_path:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_table()
+
+    def _create_table(self):
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pending_results (
+                    user_id INTEGER PRIMARY KEY,
+                    session TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_pending_results_accessed ON pending_results (accessed_at)"
+            )
+
+    def put(self, user_id: int, passport_data: dict, user_info: dict):
+        """Запоминает результат пользователя (заменяет предыдущий)"""
+        now = time.time()
+        passport_data = {field: passport_data[field] for field in SESSION_FIELDS if field in passport_data}
+        session = {'passport_data': passport_data, 'user_info': user_info}
+        with self._lock:
+            self._remember(user_id, session, now)
+            if self._conn is None:
+                return
+            try:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO pending_results VALUES (?, ?, ?, ?)",
+                        (user_id, json.dumps(session, ensure_ascii=False), now, now)
+                    )
+                    self._evict(now)
+            except Exception as e:
+                logger.error(f"❌ Ошибка записи сессии: {e}")
+
+    async def put_async(self, user_id: int, passport_data: dict, user_info: dict):
+        if self._conn is None:
+            self.put(user_id, passport_data, user_info)
+        else:
+            await asyncio.to_thread(self.put, user_id, passport_data, user_info)
+
+    async def get_async(self, user_id: int) -> Optional[dict]:
+        # Запись в памяти отдается без потока; на диск - только при промахе
+        with self._lock:
+            cached = self._memory.get(user_id)
+        if self._conn is None or (cached is not None and time.time() - cached[1] <= self.ttl_seconds):
+            return self.get(user_id)
+        return await asyncio.to_thread(self.get, user_id)
+
+    def get(self, user_id: int) -> Optional[dict]:
+        """Запись пользователя или None, если ее нет или истек TTL"""
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(user_id)
+            if cached is not None:
+                if now - cached[1] <= self.ttl_seconds:
+                    self._memory.move_to_end(user_id)
+                    return cached[0]
+                del self._memory[user_id]
+            if self._conn is None:
+                return None
+            try:
+                with self._conn:
+                    row = self._conn.execute(
+                        "SELECT session, created_at FROM pending_results WHERE user_id = ?", (user_id,)
+                    ).fetchone()
+                    if row and now - row[1] > self.ttl_seconds:
+                        self._conn.execute("DELETE FROM pending_results WHERE user_id = ?", (user_id,))
+                        row = None
+                    if row:
+                        self._conn.execute(
+                            "UPDATE pending_results SET accessed_at = ? WHERE user_id = ?", (now, user_id)
+                        )
+            except Exception as e:
+                logger.error(f"❌ Ошибка чтения сессии: {e}")
+                row = None
+            if not row:
+                return None
+            # Запись с диска (например, после перезапуска) снова держим в памяти
+            session = json.loads(row[0])
+            self._remember(user_id, session, row[1])
+            return session
+
+    def _remember(self, user_id: int, session: dict, created_at: float):
+        self._memory[user_id] = (session, created_at)
+        self._memory.move_to_end(user_id)
+        while len(self._memory) > self.memory_entries:
+            # На диске запись остается - вытесняется только копия в памяти
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float):
+        self._conn.execute(
+            "DELETE FROM pending_results WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        self._conn.execute("""
+            DELETE FROM pending_results WHERE user_id IN (
+                SELECT user_id FROM pending_results
+                ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._memory)
+            if self._conn is not None:
+                size = self._conn.execute("SELECT COUNT(*) FROM pending_results").fetchone()[0]
+        return {'size': size, 'in_memory': len(self._memory)}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
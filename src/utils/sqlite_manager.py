@@ -0,0 +1,271 @@
+import os
+import csv
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Optional
+from config import Config
+from src.utils.duplicate_index import DuplicateRecordError, passport_key, person_key
+from src.utils.records import (
+    RECORD_COLUMNS, RECORD_KEYS, build_record, record_to_csv_dict, record_to_row
+)
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS_SQL = ", ".join(RECORD_KEYS)
+# Ключи дубликатов (см. duplicate_index): уникальность обеспечивает сама база
+_DEDUP_KEYS = ['passport_key', 'person_key']
+_PLACEHOLDERS_SQL = ", ".join("?" for _ in RECORD_KEYS + _DEDUP_KEYS)
+# Один и тот же текст запроса - sqlite3 переиспользует подготовленный statement
+_INSERT_SQL = f"INSERT INTO passports ({_COLUMNS_SQL}, {', '.join(_DEDUP_KEYS)}) VALUES ({_PLACEHOLDERS_SQL})"
+_IMPORT_SQL = _INSERT_SQL.replace("INSERT INTO", "INSERT OR IGNORE INTO", 1)
+
+_SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS passports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    {", ".join(f"{key} TEXT NOT NULL DEFAULT ''" for key in RECORD_KEYS)},
+    {", ".join(f"{key} TEXT" for key in _DEDUP_KEYS)}
+);
+CREATE INDEX IF NOT EXISTS idx_passports_user_id ON passports (user_id);
+CREATE INDEX IF NOT EXISTS idx_passports_series_number ON passports (passport_series, passport_number);
+CREATE INDEX IF NOT EXISTS idx_passports_added_at ON passports (added_at);
+CREATE TABLE IF NOT EXISTS csv_imports (
+    csv_path TEXT PRIMARY KEY,
+    records INTEGER NOT NULL,
+    imported_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+class SQLiteManager:
+    """Хранилище паспортных данных в SQLite (WAL, индексы, безопасная запись из нескольких процессов)"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or Config.SQLITE_DB_PATH
+        self._local = threading.local()
+        self._create_schema()
+        # Счетчик записей: COUNT(*) - полный проход по таблице, считаем один раз при старте
+        self._count_lock = threading.Lock()
+        self._records_count = self._count_records()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Отдельное соединение на поток - sqlite3 не разделяет их между потоками"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # WAL: читатели не блокируют писателя, писатели из разных процессов ждут друг друга
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        try:
+            with self._connection() as conn:
+                conn.executescript(_SCHEMA_SQL)
+                self._migrate_dedup_keys(conn)
+                for key in _DEDUP_KEYS:
+                    conn.execute(
+                        f"CREATE UNIQUE INDEX IF NOT EXISTS idx_passports_{key} ON passports ({key}) "
+                        f"WHERE {key} IS NOT NULL"
+                    )
+            logger.info(f"✅ SQLite база готова: {self.db_path}")
+        except Exception as e:
+            logger.error(f"❌ Ошибка создания SQLite базы: {e}")
+
+    @staticmethod
+    def _migrate_dedup_keys(conn: sqlite3.Connection):
+        """Один раз для базы без ключей дубликатов: добавляет колонки и заполняет их"""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(passports)")}
+        if set(_DEDUP_KEYS) <= columns:
+            return
+        for key in _DEDUP_KEYS:
+            if key not in columns:
+                conn.execute(f"ALTER TABLE passports ADD COLUMN {key} TEXT")
+        seen = set()
+        updates = []
+        for row in conn.execute(f"SELECT id, {_COLUMNS_SQL} FROM passports ORDER BY id"):
+            record = dict(row)
+            keys = []
+            # Уже сохраненные дубликаты остаются, ключ получает только первая запись
+            for key in (passport_key(record), person_key(record)):
+                keys.append(key if key and key not in seen else None)
+                seen.add(key)
+            updates.append(keys + [record['id']])
+        conn.executemany(
+            f"UPDATE passports SET {', '.join(f'{key} = ?' for key in _DEDUP_KEYS)} WHERE id = ?", updates
+        )
+        logger.info(f"✅ Ключи дубликатов заполнены для {len(updates)} записей")
+
+    def save_passport_data(self, passport_data: dict, user_info: dict, unique: bool = True) -> bool:
+        """
+        Сохраняет данные паспорта в SQLite. unique=True: такой же паспорт -
+        DuplicateRecordError (уникальный индекс, в том числе при гонке
+        процессов); unique=False - запись сохраняется все равно.
+        """
+        try:
+            record = build_record(passport_data, user_info)
+            keys = [passport_key(record), person_key(record)]
+            with self._connection() as conn:
+                try:
+                    conn.execute(_INSERT_SQL, record_to_row(record) + keys)
+                except sqlite3.IntegrityError:
+                    if unique:
+                        raise DuplicateRecordError(self.find_duplicate(record) or '')
+                    # Дубликаты разрешены: копия сохраняется без ключей
+                    conn.execute(_INSERT_SQL, record_to_row(record) + [None, None])
+            with self._count_lock:
+                self._records_count += 1
+            logger.info(f"✅ Данные сохранены в SQLite: {record['full_name'] or 'Unknown'}")
+            return True
+        except DuplicateRecordError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения в SQLite: {e}")
+            return False
+
+    async def save_passport_data_async(self, passport_data: dict, user_info: dict, unique: bool = True) -> bool:
+        # Транзакция SQLite (WAL) короткая, но блокирующая - выполняем в потоке
+        return await asyncio.to_thread(self.save_passport_data, passport_data, user_info, unique)
+
+    def find_duplicate(self, record: dict) -> Optional[str]:
+        """Дата добавления такого же паспорта (поиск по уникальным индексам) или None"""
+        row = self._connection().execute(
+            "SELECT added_at FROM passports WHERE passport_key = ? OR person_key = ? LIMIT 1",
+            (passport_key(record), person_key(record))
+        ).fetchone()
+        return row[0] if row else None
+
+    async def find_duplicate_async(self, record: dict) -> Optional[str]:
+        return await asyncio.to_thread(self.find_duplicate, record)
+    
+    def _count_records(self) -> int:
+        try:
+            return self._connection().execute("SELECT COUNT(*) FROM passports").fetchone()[0]
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения SQLite: {e}")
+            return 0
+
+    def get_records_count(self) -> int:
+        """Число записей без запроса к базе (записи других процессов учтутся после перезапуска)"""
+        return self._records_count
+
+    def get_last_records(self, limit: int = 5) -> list:
+        """Последние записи в формате CSV (заголовки на русском), от старых к новым"""
+        try:
+            rows = self._connection().execute(
+                f"SELECT {_COLUMNS_SQL} FROM passports ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+            return [record_to_csv_dict(dict(row)) for row in reversed(rows)]
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения SQLite: {e}")
+            return []
+
+    def find_by_passport(self, series: str, number: str) -> list:
+        rows = self._connection().execute(
+            f"SELECT {_COLUMNS_SQL} FROM passports WHERE passport_series = ? AND passport_number = ?",
+            (series, number)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def find_by_user(self, user_id) -> list:
+        rows = self._connection().execute(
+            f"SELECT {_COLUMNS_SQL} FROM passports WHERE user_id = ? ORDER BY id", (str(user_id),)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_records(self, batch_size: int = 1000, date_from: str = None, date_to: str = None,
+                     user_id: str = None):
+        """
+        Потоково отдает записи (dict с ключами RECORD_KEYS) порциями через курсор.
+        Фильтры по added_at ('ГГГГ-ММ-ДД ЧЧ:ММ:СС' сравнивается как строка)
+        и user_id выполняются в SQL по индексам.
+        """
+        conditions, params = [], []
+        if date_from:
+            conditions.append("added_at >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("added_at < ?")
+            params.append(date_to)
+        if user_id:
+            conditions.append("user_id = ?")
+            params.append(str(user_id))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self._connection().execute(
+            f"SELECT {_COLUMNS_SQL} FROM passports{where} ORDER BY id", params
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+
+    def merge_passport_data(self, passport_data: dict, user_info: dict) -> bool:
+        """
+        Дополняет уже сохраненную запись того же паспорта (или того же
+        ФИО + даты рождения) полями, которые в ней не распознаны
+        """
+        try:
+            record = build_record(passport_data, user_info)
+            fields = [key for key in RECORD_KEYS if key not in ('user_id', 'username', 'added_at')]
+            assignments = ", ".join(
+                f"{key} = CASE WHEN {key} IN ('', 'не распознано') THEN ? ELSE {key} END" for key in fields
+            )
+            if record['passport_series'] and record['passport_number']:
+                where, params = "passport_series = ? AND passport_number = ?", (
+                    record['passport_series'], record['passport_number']
+                )
+            else:
+                where, params = "full_name = ? AND birth_date = ?", (record['full_name'], record['birth_date'])
+            # Дополненная запись получает ключи дубликатов, которых у нее не было
+            assignments += ", " + ", ".join(f"{key} = COALESCE({key}, ?)" for key in _DEDUP_KEYS)
+            with self._connection() as conn:
+                updated = conn.execute(
+                    f"UPDATE passports SET {assignments} WHERE {where}",
+                    [record[key] for key in fields] + [passport_key(record), person_key(record)] + list(params)
+                ).rowcount
+            logger.info(f"✅ Запись дополнена в SQLite: {updated} строк")
+            return updated > 0
+        except Exception as e:
+            logger.error(f"❌ Ошибка объединения записи в SQLite: {e}")
+            return False
+
+    async def merge_passport_data_async(self, passport_data: dict, user_info: dict) -> bool:
+        return await asyncio.to_thread(self.merge_passport_data, passport_data, user_info)
+
+    def import_from_csv(self, csv_path: str = None) -> int:
+        """
+        Однократный перенос данных из CSV. Повторный запуск для того же
+        файла ничего не делает. Возвращает число перенесенных записей.
+        """
+        csv_path = os.path.abspath(csv_path or Config.CSV_FILE_PATH)
+        conn = self._connection()
+        if conn.execute("SELECT 1 FROM csv_imports WHERE csv_path = ?", (csv_path,)).fetchone():
+            logger.info(f"CSV уже импортирован: {csv_path}")
+            return 0
+
+        with open(csv_path, 'r', encoding='utf-8', newline='') as file, conn:
+            records = (
+                {key: row.get(header) or '' for key, header in RECORD_COLUMNS}
+                for row in csv.DictReader(file)
+            )
+            rows = (record_to_row(record) + [passport_key(record), person_key(record)] for record in records)
+            # Файл читается потоково, вся вставка - одна транзакция; дубликаты пропускаются
+            imported = conn.executemany(_IMPORT_SQL, rows).rowcount
+            conn.execute(
+                "INSERT INTO csv_imports (csv_path, records) VALUES (?, ?)", (csv_path, imported)
+            )
+        with self._count_lock:
+            self._records_count += imported
+        logger.info(f"✅ Импортировано из CSV: {imported} записей")
+        return imported
+
+    async def close(self):
+        pass
+
+    def get_db_file(self) -> str:
+        return self.db_path if os.path.exists(self.db_path) else ""
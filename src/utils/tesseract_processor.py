@@ -1,5 +1,7 @@
 # src/utils/tesseract_processor.py
 import logging
+from src.utils.image_preprocessor import preprocess_for_ocr
+from src.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -13,14 +15,15 @@ class TesseractOCRProcessor:
             logger.error("❌ pytesseract не установлен")
             self.pytesseract = None
 
-    def extract_text_from_image(self, image_path: str):
+    def extract_text_from_image(self, image_source):
         if not self.pytesseract:
             return "Ошибка: Tesseract не установлен"
         
         try:
-            from PIL import Image
-            image = Image.open(image_path)
-            text = self.pytesseract.image_to_string(image, lang='rus+eng')
+            with metrics.timer('preprocess'):
+                image = preprocess_for_ocr(image_source)
+            with metrics.timer('ocr', 'tesseract'):
+                text = self.pytesseract.image_to_string(image, lang='rus+eng')
             logger.info(f"📝 Tesseract распознал текст: {len(text)} символов")
             return text if text.strip() else "Текст не распознан"
         except Exception as e:
@@ -1,74 +1,42 @@
-import os
 import logging
-from config import Config
+from src.utils.document_processor import get_ocr_processor, get_fallback_processor
 
 logger = logging.getLogger(__name__)
 
 class UniversalOCR:
+    """
+    Текст документа от доступных OCR движков: сначала быстрый (Tesseract),
+    EasyOCR - только если быстрый не справился. Для данных паспорта
+    используйте DocumentProcessor - там каскад решает по оценке разбора.
+    """
+
     def __init__(self):
-        self.current_processor = self._initialize_processor()
-    
-    def _initialize_processor(self):
-        """Инициализирует доступный OCR процессор"""
-        try:
-            # Пробуем Tesseract
-            try:
-                from src.utils.tesseract_processor import TesseractProcessor
-                processor = TesseractProcessor()
-                logger.info("✅ Tesseract OCR инициализирован")
-                return processor
-            except Exception as e:
-                logger.warning(f"❌ Tesseract не доступен: {e}")
-            
-            # Все OCR не доступны - используем тестовые данные
-            logger.warning("⚠️ Все OCR не доступны, используем тестовые данные")
-            return None
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка инициализации OCR: {e}")
-            return None
-    
-    def extract_text(self, image_path: str) -> str:
+        self.current_processor = get_ocr_processor()
+
+    def extract_text(self, image_source) -> str:
         """
-        Извлекает текст с помощью доступного OCR
+        Извлекает текст с помощью доступного OCR; image_source - путь, байты, PIL Image или NumPy массив
         """
+        text = ""
         try:
-            if not os.path.exists(image_path):
-                return "❌ Файл не найден"
-            
-            # Если есть OCR процессор, используем его
-            if self.current_processor and hasattr(self.current_processor, 'extract_text'):
-                logger.info(f"🔍 OCR обрабатывает: {image_path}")
-                text = self.current_processor.extract_text_with_confidence(image_path, min_confidence=30)
-                
-                if text and "❌" not in text and len(text) > 10:
+            if self.current_processor:
+                logger.info("🔍 OCR обрабатывает изображение")
+                text = self.current_processor.extract_text_from_image(image_source)
+                if self._is_recognized(text):
                     logger.info(f"✅ OCR распознал {len(text)} символов")
                     return text
-                else:
-                    logger.warning("❌ OCR не справился, используем тестовые данные")
-                    return self._get_test_data()
-            else:
-                # Нет OCR - используем тестовые данные
-                logger.info("🔍 OCR не доступен, используем тестовые данные")
-                return self._get_test_data()
-                
+
+            fallback = get_fallback_processor()
+            if fallback:
+                logger.warning("❌ Быстрый OCR не справился, пробуем EasyOCR")
+                text = fallback.extract_text_from_image(image_source)
+
         except Exception as e:
             logger.error(f"❌ Ошибка OCR: {e}")
-            return self._get_test_data()
-    
-    def _get_test_data(self) -> str:
-        """Возвращает реалистичные тестовые данные"""
-        test_data = """
-        ОТДЕЛОМ УФМС РОССИИ ПО КРАСНОДАРСКОМУ КРАЮ В КУРГАНИНСКОМ РАЙОНЕ
-        Дата выдачи: 18.11.2009
-        Код подразделения: 230-040
-        
-        Фамилия: БУДНИКОВ
-        Имя: АЛЕКСАНДР  
-        Отчество: АЛЕКСАНДРОВИЧ
-        Дата рождения: 16.10.1989
-        Место рождения: ГОР. КУРГАНИНСК КРАСНОДАРСКОГО КРАЯ РСФСР
-        Серия паспорта: 03 09
-        Номер паспорта: 348954
-        """
-        return test_data.strip()
\ No newline at end of file
+            return f"Ошибка распознавания: {e}"
+
+        return text or "Ошибка: OCR процессор не инициализирован"
+
+    @staticmethod
+    def _is_recognized(text: str) -> bool:
+        return bool(text) and not text.startswith(("Ошибка", "Текст не распознан")) and len(text.strip()) > 10
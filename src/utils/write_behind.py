@@ -0,0 +1,117 @@
+# src/utils/write_behind.py
+import asyncio
+import logging
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindWriter:
+    """
+    Асинхронная очередь отложенной записи: строки копятся и сбрасываются
+    одной операцией при достижении batch_size или по истечении flush_interval.
+    Сама запись выполняется в отдельном потоке и не блокирует event loop.
+    Неудачная пачка записывается повторно (retries раз с растущей паузой);
+    каждая строка получает future с итогом: True - строка на диске.
+    """
+
+    def __init__(self, flush_func: Callable[[list], None], batch_size: int, flush_interval: float,
+                 retries: int = 3, retry_delay: float = 0.5):
+        self.flush_func = flush_func
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._queue = None
+        self._task = None
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def put(self, row) -> asyncio.Future:
+        """Ставит строку в очередь; future завершится True после записи пачки или False при ошибке"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            # Ждем остальные строки пачки не дольше flush_interval
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        rows = [row for row, _ in batch]
+        success = False
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    await asyncio.to_thread(self.flush_func, rows)
+                    success = True
+                    break
+                except Exception as e:
+                    if attempt == self.retries:
+                        logger.error(f"❌ Ошибка отложенной записи ({len(rows)} строк), попыток: {attempt + 1}: {e}")
+                    else:
+                        logger.warning(f"Ошибка отложенной записи ({len(rows)} строк), повтор: {e}")
+                        await asyncio.sleep(self.retry_delay * 2 ** attempt)
+            if success:
+                self.flushes += 1
+                self.flushed_rows += len(rows)
+            else:
+                self.failed_rows += len(rows)
+        finally:
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+            for _, future in batch:
+                # Обработчик мог не дождаться (отмена) - future уже завершен
+                if not future.done():
+                    future.set_result(success)
+                self._queue.task_done()
+
+    async def flush(self):
+        """Ждет, пока все поставленные в очередь строки окажутся на диске"""
+        if self._task is not None:
+            await self._queue.join()
+
+    async def close(self):
+        """Дописывает все, что осталось в очереди, и останавливает writer"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"Отложенная запись остановлена, записано строк: {self.flushed_rows}")
+
+    def stats(self) -> dict:
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'flushes': self.flushes,
+            'flushed_rows': self.flushed_rows,
+            'failed_rows': self.failed_rows,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+            'max_flush_ms': round(self.max_flush_ms, 2),
+        }
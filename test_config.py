@@ -7,4 +7,5 @@ print(f"YANDEX_VISION_API_KEY: {Config.YANDEX_VISION_API_KEY}")
 print(f"YANDEX_FOLDER_ID: {Config.YANDEX_FOLDER_ID}")
 print(f"DATA_STORAGE_TYPE: {Config.DATA_STORAGE_TYPE}")
 print(f"CSV_FILE_PATH: {Config.CSV_FILE_PATH}")
+print(f"SQLITE_DB_PATH: {Config.SQLITE_DB_PATH}")
 print("✅ Конфигурация загружена успешно!")
\ No newline at end of file
@@ -1,33 +1,35 @@
 # test_easyocr.py
+import os
+import sys
 import logging
 from src.utils.easyocr_processor import EasyOCRProcessor
+from bench_ocr import synthetic_photo
 
 logging.basicConfig(level=logging.INFO)
 
-def test_easyocr():
+def test_easyocr(image_path: str = None):
     processor = EasyOCRProcessor()
     
-    # Укажите путь к вашему тестовому изображению
-    image_path = "test_photo.jpg"
+    # Без своего фото используется синтетический паспорт с известными полями
+    if image_path and os.path.exists(image_path):
+        image_source, expected = image_path, None
+    else:
+        expected, image_source = synthetic_photo()
     
     print("🧪 Тестируем EasyOCR...")
     print("=" * 50)
     
-    # Тест обычного распознавания
-    text = processor.extract_text(image_path)
-    print("📄 Обычное распознавание:")
+    text = processor.extract_text_from_image(image_source)
+    print("📄 Распознанный текст:")
     print(text)
-    print()
     
-    # Тест с фильтрацией по уверенности
-    print("📊 Распознавание с фильтрацией:")
-    text_confident = processor.extract_text_with_confidence(image_path, min_confidence=0.6)
-    print(text_confident)
-    
-    print("=" * 50)
-    print(f"📊 Сравнение:")
-    print(f"Обычное: {len(text)} символов")
-    print(f"С фильтром: {len(text_confident)} символов")
+    if expected:
+        print("=" * 50)
+        print("📊 Ожидаемые поля:")
+        for field, value in expected.items():
+            mark = "✅" if value in text.upper() else "❌"
+            print(f"{mark} {field}: {value}")
 
 if __name__ == "__main__":
-    test_easyocr()
\ No newline at end of file
+    # Укажите путь к вашему тестовому изображению (необязательно)
+    test_easyocr(sys.argv[1] if len(sys.argv) > 1 else "test_photo.jpg")